@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .theming import (
+    SRGB8_TO_LINEAR,
+    linear_to_oklab_array,
+    linear_to_srgb_array,
+    srgb_to_linear_array,
+)
+
+# -------------------------
+# Colour-vision deficiency simulation
+# -------------------------
+
+# Machado, Oliveira & Fernandes (2009), severity 1.0 (dichromacy), applied to linear sRGB
+CVD_MATRICES: Dict[str, np.ndarray] = {
+    'normal': np.eye(3),
+    'protan': np.array([
+        [0.152286, 1.052583, -0.204868],
+        [0.114503, 0.786281, 0.099216],
+        [-0.003882, -0.048116, 1.051998],
+    ]),
+    'deutan': np.array([
+        [0.367322, 0.860646, -0.227968],
+        [0.280085, 0.672501, 0.047413],
+        [-0.011820, 0.042940, 0.968881],
+    ]),
+    'tritan': np.array([
+        [1.255528, -0.076749, -0.178779],
+        [-0.078411, 0.930809, 0.147602],
+        [0.004733, 0.691367, 0.303900],
+    ]),
+}
+VISIONS: Tuple[str, ...] = tuple(CVD_MATRICES)
+_CVD_STACK = np.stack([CVD_MATRICES[v] for v in VISIONS])  # (V, 3, 3)
+
+
+def simulate_linear(lin: np.ndarray) -> np.ndarray:
+    """(..., 3) linear RGB -> (V, ..., 3) as seen under each vision in VISIONS."""
+    return np.clip(np.einsum('vij,...j->v...i', _CVD_STACK, lin), 0.0, 1.0)
+
+
+def _simulated_rgba(lin: np.ndarray, rgba: np.ndarray, vision: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(simulated linear RGB, simulated uint8 RGBA) of an image whose linear RGB is `lin`."""
+    sim = np.clip(lin @ CVD_MATRICES[vision].T, 0.0, 1.0)
+    out = np.empty_like(rgba)
+    out[..., :3] = np.round(linear_to_srgb_array(sim) * 255.0)
+    out[..., 3] = rgba[..., 3]
+    return sim, out
+
+
+def simulate_image(rgba: np.ndarray, vision: str) -> np.ndarray:
+    """Simulate one vision on an (H, W, 4) uint8 image; alpha is passed through."""
+    return _simulated_rgba(SRGB8_TO_LINEAR[rgba[..., :3]], rgba, vision)[1]
+
+
+# -------------------------
+# WCAG contrast
+# -------------------------
+
+AA_TEXT = 4.5  # WCAG 2.x 1.4.3, normal text
+AA_GRAPHICS = 3.0  # WCAG 2.x 1.4.11, graphical objects (lines, markers, bars)
+
+_LUMINANCE = np.array([0.2126, 0.7152, 0.0722])
+
+
+def relative_luminance(lin: np.ndarray) -> np.ndarray:
+    return lin @ _LUMINANCE
+
+
+def contrast_ratio(y1: np.ndarray, y2: np.ndarray) -> np.ndarray:
+    hi, lo = np.maximum(y1, y2), np.minimum(y1, y2)
+    return (hi + 0.05) / (lo + 0.05)
+
+
+# -------------------------
+# Batched palette analysis
+# -------------------------
+
+
+@dataclass
+class PaletteReport:
+    """Accessibility metrics for one theme's palette against its background."""
+
+    fg_contrast: float  # text colour vs background
+    palette_contrast: List[float]  # each palette colour vs background (normal vision)
+    aa_fraction: float  # share of palette colours at or above AA_GRAPHICS
+    min_delta_e: Dict[str, float]  # closest palette pair in Oklab, per vision
+    closest_pair: Dict[str, Tuple[int, int]]
+    score: float
+
+    def to_dict(self) -> dict:
+        return {
+            'fg_contrast': round(self.fg_contrast, 3),
+            'fg_aa': self.fg_contrast >= AA_TEXT,
+            'palette_contrast': [round(c, 3) for c in self.palette_contrast],
+            'aa_fraction': round(self.aa_fraction, 3),
+            'min_delta_e': {k: round(v, 4) for k, v in self.min_delta_e.items()},
+            'worst_vision': min(self.min_delta_e, key=self.min_delta_e.get),
+            'closest_pair': {k: list(v) for k, v in self.closest_pair.items()},
+            'score': round(self.score, 4),
+        }
+
+
+def _to_rgb01(colors: Sequence[object]) -> np.ndarray:
+    from matplotlib.colors import to_rgba_array
+
+    return to_rgba_array(list(colors))[:, :3]
+
+
+def palette_metrics(
+    lin: np.ndarray, valid: np.ndarray, bg_lin: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Core metrics on arrays: (T, N, 3) linear palettes, (T, N) mask, (T, 3) backgrounds.
+
+    Returns (palette contrast (T, N), aa_fraction (T,), min ΔE (V, T),
+    closest flat pair index (V, T), score (T,)).
+    """
+    N = lin.shape[1]
+    # Contrast (normal vision; luminance barely moves under these simulations)
+    y_pal = relative_luminance(lin)  # (T, N)
+    y_bg = relative_luminance(bg_lin)  # (T,)
+    pal_contrast = contrast_ratio(y_pal, y_bg[:, None])
+    aa_fraction = np.where(valid, pal_contrast >= AA_GRAPHICS, False).sum(1) / valid.sum(1)
+
+    # Pairwise ΔE between palette colours, per vision: (V, T, N, N)
+    lab = linear_to_oklab_array(simulate_linear(lin))
+    diff = lab[:, :, :, None, :] - lab[:, :, None, :, :]
+    de = np.sqrt((diff * diff).sum(-1))
+    pair_ok = valid[:, :, None] & valid[:, None, :] & ~np.eye(N, dtype=bool)
+    de = np.where(pair_ok[None], de, np.inf)
+    flat = de.reshape(len(VISIONS), len(lin), N * N)
+    best = flat.argmin(-1)  # (V, T)
+    min_de = np.take_along_axis(flat, best[..., None], -1)[..., 0]
+    score = min_de.min(0) * (0.5 + 0.5 * aa_fraction)
+    return pal_contrast, aa_fraction, min_de, best, score
+
+
+def analyze_palettes(
+    palettes: Sequence[Sequence[object]],
+    backgrounds: Sequence[object],
+    foregrounds: Sequence[object],
+) -> List[PaletteReport]:
+    """Analyze many palettes at once (one per theme); colours are any Matplotlib colour spec.
+
+    Palettes may differ in length: they are padded to one (T, N, 3) array and
+    masked, so every vision, contrast and pairwise ΔE is computed in a handful
+    of array operations regardless of the number of themes.
+
+    score = worst-vision min ΔE x (0.5 + 0.5 x aa_fraction): higher is better.
+    """
+    T = len(palettes)
+    if not (T == len(backgrounds) == len(foregrounds)):
+        raise ValueError('palettes, backgrounds and foregrounds must have the same length')
+    if T == 0:
+        return []
+    N = max(len(p) for p in palettes)
+    if min(len(p) for p in palettes) < 2:
+        raise ValueError('each palette needs at least 2 colours')
+
+    rgb = np.zeros((T, N, 3))
+    valid = np.zeros((T, N), dtype=bool)
+    for t, pal in enumerate(palettes):
+        rgb[t, :len(pal)] = _to_rgb01(pal)
+        valid[t, :len(pal)] = True
+    lin = srgb_to_linear_array(rgb)
+    bg_lin = srgb_to_linear_array(_to_rgb01(backgrounds))  # (T, 3)
+    fg_lin = srgb_to_linear_array(_to_rgb01(foregrounds))
+
+    pal_contrast, aa_fraction, min_de, best, score = palette_metrics(lin, valid, bg_lin)
+    fg_contrast = contrast_ratio(relative_luminance(fg_lin), relative_luminance(bg_lin))
+
+    reports: List[PaletteReport] = []
+    for t, pal in enumerate(palettes):
+        reports.append(PaletteReport(
+            fg_contrast=float(fg_contrast[t]),
+            palette_contrast=pal_contrast[t, :len(pal)].tolist(),
+            aa_fraction=float(aa_fraction[t]),
+            min_delta_e={v: float(min_de[k, t]) for k, v in enumerate(VISIONS)},
+            closest_pair={
+                v: tuple(sorted(divmod(int(best[k, t]), N))) for k, v in enumerate(VISIONS)
+            },
+            score=float(score[t]),
+        ))
+    return reports
+
+
+def theme_colors(theme: dict) -> Tuple[List[object], object, object]:
+    """(palette, background, foreground) a theme actually renders with.
+
+    Prefers the rc (what Matplotlib draws) over the theme's metadata fields.
+    """
+    rc = theme.get('rc_global') or {}
+    cycle = rc.get('axes.prop_cycle')
+    palette: Optional[List[object]] = None
+    if hasattr(cycle, 'by_key'):
+        palette = list(cycle.by_key().get('color', [])) or None
+    elif isinstance(cycle, dict) and cycle.get('key') == 'color':
+        palette = list(cycle.get('values') or []) or None
+    if palette is None:
+        palette = list(theme.get('palette') or [])
+    bg = rc.get('axes.facecolor') or theme.get('bg') or 'white'
+    fg = rc.get('text.color') or theme.get('fg') or 'black'
+    return palette, bg, fg
+
+
+def analyze_themes(themes: Sequence[dict]) -> List[dict]:
+    """JSON-ready reports for serialized themes, computed in one batched call."""
+    colors = [theme_colors(t) for t in themes]
+    reports = analyze_palettes([c[0] for c in colors], [c[1] for c in colors], [c[2] for c in colors])
+    return [r.to_dict() for r in reports]
+
+
+# -------------------------
+# Rendered images
+# -------------------------
+
+
+def analyze_image(rgba: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """Simulated images per vision and the mean Oklab shift each simulation causes.
+
+    A large shift means that vision sees the figure very differently from the
+    intended colours; compare it with the palette's min ΔE to spot collisions.
+    """
+    lin = SRGB8_TO_LINEAR[rgba[..., :3]]
+    lab = linear_to_oklab_array(lin)
+    sims: Dict[str, np.ndarray] = {}
+    shift: Dict[str, float] = {}
+    for v in VISIONS:
+        if v == 'normal':
+            continue
+        sim, sims[v] = _simulated_rgba(lin, rgba, v)
+        shift[v] = float(np.sqrt(((linear_to_oklab_array(sim) - lab) ** 2).sum(-1)).mean())
+    return sims, shift
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .scheduler import WorkTag
+
+# -------------------------
+# Render worker pool
+# -------------------------
+
+# 0 (the default) means one worker per CPU, capped at 8
+DEFAULT_WORKERS = int(os.getenv('THEMELAB_RENDER_WORKERS', '0')) or min(os.cpu_count() or 1, 8)
+# Retire the pool after this many rendered cells (0 = never) so worker RSS creep stays bounded.
+# ProcessPoolExecutor(max_tasks_per_child=...) would do this per worker, but hangs on Python 3.11.
+POOL_MAX_CELLS = int(os.getenv('THEMELAB_POOL_MAX_CELLS', '0'))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_cells = 0
+_pool_lock = threading.Lock()
+
+
+def _worker_init() -> None:
+    import matplotlib as mpl
+
+    mpl.use('agg', force=True)
+    from .theming import register_fonts
+
+    register_fonts()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The process-wide render pool, started on first use.
+
+    Workers are spawned rather than forked: the server process has live threads
+    (event loop, thread pools) that fork would copy mid-state.
+    """
+    global _pool, _pool_cells
+    with _pool_lock:
+        if _pool is not None and POOL_MAX_CELLS and _pool_cells >= POOL_MAX_CELLS:
+            # Graceful: cells already queued on the old pool still finish, then its workers exit
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool_cells = 0
+            _pool = ProcessPoolExecutor(
+                max_workers=DEFAULT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_worker_init,
+            )
+        return _pool
+
+
+def count_cells(n: int) -> None:
+    global _pool_cells
+    with _pool_lock:
+        _pool_cells += n
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _render_cell(
+    index: int, theme_rc: Dict[str, object], seed: int, codec: str, levels: Tuple[str, ...]
+) -> Dict[str, bytes]:
+    """Worker side: render one figure for one theme and encode its pyramid levels."""
+    from .figures import build_figure_specs, render_figure_levels
+
+    spec = build_figure_specs()[index]
+    return render_figure_levels(spec, index, theme_rc, seed, codec, levels)
+
+
+# -------------------------
+# Batch (theme x figure) rendering
+# -------------------------
+
+CellKey = Tuple[str, str, int, str]
+
+
+async def _scheduled_cell(tag: WorkTag, *args) -> Dict[str, bytes]:
+    """Submit one cell to the pool once the fair scheduler grants `tag` a render slot."""
+    from .scheduler import SCHEDULER
+
+    async with SCHEDULER.slot_async(tag):
+        # get_pool() at grant time: a pool retired meanwhile no longer takes submissions
+        return await asyncio.wrap_future(get_pool().submit(_render_cell, *args))
+
+
+async def render_batch(
+    themes: Sequence[Tuple[Dict[str, object], int]],
+    levels: Iterable[str],
+    codec: str,
+    only: Optional[Iterable[str]] = None,
+    tag: Optional[WorkTag] = None,
+) -> AsyncIterator[dict]:
+    """Render every (theme, figure) cell across the worker pool, yielding cells as they finish.
+
+    `themes` holds validated (rc_global, seed) pairs. Cells are scheduled
+    figure-major, so the first figure of every theme lands first (enough for a
+    carousel thumbnail). Cached cells are yielded straight away, and cells whose
+    effective rc and seed coincide across themes are rendered once. Yields
+      {"type": "cell", "theme": i, "filename": ..., "levels": {level: bytes}, "cached": bool}
+    or {"type": "error", "theme": i, "filename": ..., "detail": ...} per cell.
+    With a `tag`, each cell waits for a slot of the fair scheduler before it is
+    submitted, so a large batch shares the CPUs with other clients' renders.
+    """
+    from .figures import (
+        build_figure_specs,
+        cache_levels,
+        cached_levels,
+        figure_cache_key,
+        levels_to_encode,
+    )
+
+    levels = tuple(levels)
+    encode = levels_to_encode(levels)
+    wanted = set(only) if only is not None else None
+    pool = get_pool()
+
+    jobs: Dict[CellKey, "asyncio.Future[Dict[str, bytes]]"] = {}
+    waiting: Dict[CellKey, List[Tuple[int, str]]] = {}
+    try:
+        for i, spec in enumerate(build_figure_specs()):
+            if wanted is not None and spec.filename not in wanted:
+                continue
+            for t, (theme_rc, seed) in enumerate(themes):
+                key = figure_cache_key(spec, theme_rc, seed, codec)
+                hit = cached_levels(key, levels)
+                if hit is not None:
+                    yield {'type': 'cell', 'theme': t, 'filename': spec.filename,
+                           'levels': hit, 'cached': True}
+                    continue
+                if key not in jobs:
+                    args = (i, theme_rc, seed, codec, encode)
+                    jobs[key] = (
+                        asyncio.ensure_future(_scheduled_cell(tag, *args)) if tag is not None
+                        else asyncio.wrap_future(pool.submit(_render_cell, *args))
+                    )
+                waiting.setdefault(key, []).append((t, spec.filename))
+        count_cells(len(jobs))
+
+        def finished_cells(key: CellKey, rendered: Dict[str, bytes]) -> List[dict]:
+            cache_levels(key, rendered)
+            return [{'type': 'cell', 'theme': t, 'filename': fn,
+                     'levels': {lv: rendered[lv] for lv in levels}, 'cached': False}
+                    for t, fn in waiting[key]]
+
+        by_future = {fut: key for key, fut in jobs.items()}
+        pending = set(by_future)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            broken: Optional[BrokenProcessPool] = None
+            lost: List[CellKey] = []
+            for fut in done:
+                key = by_future[fut]
+                e = fut.exception()
+                if e is None:
+                    for cell in finished_cells(key, fut.result()):
+                        yield cell
+                elif isinstance(e, BrokenProcessPool):
+                    broken = e
+                    lost.append(key)
+                else:
+                    # Errors stay isolated per cell, like single-theme renders
+                    for t, fn in waiting[key]:
+                        yield {'type': 'error', 'theme': t, 'filename': fn, 'detail': str(e)}
+            if broken is not None:
+                # A worker died: keep what finished, report the rest; the next batch starts a fresh pool
+                shutdown_pool()
+                for fut in pending:
+                    key = by_future[fut]
+                    if fut.done() and not fut.cancelled() and fut.exception() is None:
+                        for cell in finished_cells(key, fut.result()):
+                            yield cell
+                    else:
+                        lost.append(key)
+                for key in lost:
+                    for t, fn in waiting[key]:
+                        yield {'type': 'error', 'theme': t, 'filename': fn,
+                               'detail': f'render worker died: {broken}'}
+                return
+    finally:
+        # Client went away (or the pool broke): drop work nobody will read
+        for fut in jobs.values():
+            fut.cancel()
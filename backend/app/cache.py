@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: no cross-process store
+    fcntl = None
+
+# -------------------------
+# Render cache
+# -------------------------
+
+DEFAULT_CACHE_MB = int(os.getenv('THEMELAB_CACHE_MB', '256'))
+
+
+class RenderCache:
+    """Thread-safe LRU of encoded figure bytes, bounded by total size."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+
+RENDER_CACHE = RenderCache(DEFAULT_CACHE_MB * 1024 * 1024)
+
+# -------------------------
+# Shared on-disk render store
+# -------------------------
+
+STORE_DIR = os.getenv('THEMELAB_STORE_DIR', '')  # unset/empty disables the store
+STORE_MB = int(os.getenv('THEMELAB_STORE_MB', '1024'))
+STORE_NAME_RE = re.compile(r'^[0-9a-f]{32}\.[a-z0-9]+$')
+# Part of every stored name: bump it when the same key starts rendering different bytes
+STORE_VERSION = 2  # 2: rasters drawn by savefig itself (exact tight bbox)
+
+StoreKey = Tuple[str, str, int, str, str]  # figure_cache_key + (level,)
+
+
+class RenderStore:
+    """Encoded figures shared by every worker process through the filesystem.
+
+    One immutable file per (figure, rc digest, seed, codec, level), named by a
+    hash of that key, so equal renders from any worker land on the same path.
+    Files are written under tmp/ and hard-linked into place, so readers never
+    see a partial file and exactly one writer adds each entry to `.usage`. Reads mmap the file (page cache shared across workers) and
+    GET /api/renders/{name} serves it with FileResponse without reading it
+    into Python at all.
+
+    Recency is the file's mtime, refreshed at most once a minute per file on a
+    hit. Total size is a counter in `.usage` updated under an flock on
+    `.lock`; the writer that pushes it past max_bytes rescans the store and
+    deletes the least recently used files down to 90%.
+    """
+
+    TOUCH_S = 60.0
+    LOW_WATER = 0.9
+    TMP_MAX_AGE_S = 3600.0
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._tmp = self.root / 'tmp'
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.root / '.lock'
+        self._usage_path = self.root / '.usage'
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        if not self._usage_path.exists():
+            with self._locked():
+                self._write_usage(self._scan_and_evict(None))
+
+    # ---- naming
+
+    @staticmethod
+    def name(key: StoreKey) -> str:
+        from .encoding import CODECS
+
+        blob = '\0'.join(map(str, (STORE_VERSION, *key)))
+        digest = hashlib.blake2b(blob.encode('utf-8'), digest_size=16).hexdigest()
+        codec = CODECS.get(key[3])
+        return f"{digest}.{codec.ext if codec else 'bin'}"
+
+    def path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    # ---- reads
+
+    def open(self, key: StoreKey) -> Optional[mmap.mmap]:
+        """Read-only mapping of a stored entry, or None."""
+        try:
+            fd = os.open(self.path(self.name(key)), os.O_RDONLY)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            st = os.fstat(fd)
+            if not st.st_size:
+                self.misses += 1
+                return None
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            self._touch(fd, st)
+        finally:
+            os.close(fd)
+        self.hits += 1
+        return mapped
+
+    def get(self, key: StoreKey) -> Optional[bytes]:
+        """Stored bytes, copied once out of the mapping for in-process consumers (base64, zip, PIL)."""
+        mapped = self.open(key)
+        if mapped is None:
+            return None
+        with mapped:
+            return mapped[:]
+
+    def stat(self, name: str) -> Optional[os.stat_result]:
+        """stat() of a stored file for serving it, refreshing its recency; None if absent."""
+        try:
+            fd = os.open(self.path(name), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            st = os.fstat(fd)
+            self._touch(fd, st)
+        finally:
+            os.close(fd)
+        self.hits += 1
+        return st
+
+    def _touch(self, fd: int, st: os.stat_result) -> None:
+        if time.time() - st.st_mtime > self.TOUCH_S:
+            try:
+                os.utime(fd)
+            except OSError:
+                pass
+
+    # ---- writes
+
+    def put(self, key: StoreKey, data: bytes) -> str:
+        """Store `data` under `key` unless already present; returns the entry's name."""
+        name = self.name(key)
+        path = self.path(name)
+        if path.exists():
+            return name
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # Atomic and exclusive: only the writer whose link creates the entry accounts for it
+            os.link(tmp, path)
+        except FileExistsError:
+            return name  # a concurrent writer of the same key stored the same bytes first
+        finally:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        self.writes += 1
+        self._account(len(data))
+        return name
+
+    # ---- size accounting & eviction (cross-process, under flock)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self._lock_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_usage(self) -> int:
+        try:
+            return int(self._usage_path.read_text() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_usage(self, n: int) -> None:
+        self._usage_path.write_text(str(max(0, n)))
+
+    def _account(self, delta: int) -> None:
+        with self._locked():
+            usage = self._read_usage() + delta
+            if usage > self.max_bytes:
+                usage = self._scan_and_evict(int(self.max_bytes * self.LOW_WATER))
+            self._write_usage(usage)
+
+    def _scan_and_evict(self, target: Optional[int]) -> int:
+        """Exact size of the store after deleting LRU files down to `target` (None: just measure)."""
+        files = []
+        now = time.time()
+        for sub in os.scandir(self.root):
+            if sub.name == 'tmp':
+                for entry in os.scandir(sub):  # leftovers of crashed writers
+                    try:
+                        if now - entry.stat().st_mtime > self.TMP_MAX_AGE_S:
+                            os.unlink(entry.path)
+                    except OSError:
+                        pass
+                continue
+            if not sub.is_dir() or len(sub.name) != 2:
+                continue
+            for entry in os.scandir(sub):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        if target is None:
+            return total
+        files.sort()
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def usage_bytes(self) -> int:
+        return self._read_usage()
+
+    def clear(self) -> None:
+        with self._locked():
+            self._write_usage(self._scan_and_evict(0))
+
+
+_store: Optional[RenderStore] = None
+_store_lock = threading.Lock()
+
+
+def get_render_store() -> Optional[RenderStore]:
+    """The process-wide store at THEMELAB_STORE_DIR, opened on first use; None when disabled."""
+    global _store
+    if not STORE_DIR or fcntl is None:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = RenderStore(Path(STORE_DIR), STORE_MB * 1024 * 1024)
+        return _store
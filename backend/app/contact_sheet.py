@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import io
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .encoding import Codec, encode_image
+
+# -------------------------
+# Contact sheet: every figure's thumbnail on one canvas
+# -------------------------
+
+SHEET_LEVEL = 'thumb'  # pyramid level the tiles are taken from
+SHEET_COLUMNS = 5
+SHEET_GAP = 8  # px between tiles and around the edge
+
+
+@dataclass(frozen=True)
+class Tile:
+    filename: str
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+@dataclass
+class ContactSheet:
+    pixels: np.ndarray  # (H, W, 4) uint8
+    tiles: List[Tile]
+
+    def tile_map(self) -> dict:
+        """JSON-ready layout: canvas size plus each figure's pixel rectangle."""
+        h, w, _ = self.pixels.shape
+        return {'width': w, 'height': h, 'tiles': [asdict(t) for t in self.tiles]}
+
+
+def decode_rgba(data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as im:
+        return np.asarray(im.convert('RGBA'))
+
+
+def background_rgba(rc: Dict[str, object]) -> Tuple[int, int, int, int]:
+    from matplotlib.colors import to_rgba
+
+    face = rc.get('savefig.facecolor', 'auto')
+    if face == 'auto':
+        face = rc.get('figure.facecolor', 'white')
+    return tuple(int(round(c * 255)) for c in to_rgba(face))
+
+
+def compose_contact_sheet(
+    tiles: Sequence[Tuple[str, np.ndarray]],
+    background: Tuple[int, int, int, int] = (255, 255, 255, 255),
+    columns: int = SHEET_COLUMNS,
+    gap: int = SHEET_GAP,
+) -> ContactSheet:
+    """Copy (filename, RGBA array) tiles into one grid canvas, each centred in its cell."""
+    if not tiles:
+        raise ValueError('contact sheet needs at least one tile')
+    cell_w = max(px.shape[1] for _, px in tiles)
+    cell_h = max(px.shape[0] for _, px in tiles)
+    columns = min(columns, len(tiles))
+    rows = -(-len(tiles) // columns)
+    canvas = np.empty(
+        (rows * cell_h + (rows + 1) * gap, columns * cell_w + (columns + 1) * gap, 4),
+        dtype=np.uint8,
+    )
+    canvas[:] = background
+
+    placed: List[Tile] = []
+    for n, (filename, px) in enumerate(tiles):
+        row, col = divmod(n, columns)
+        h, w, _ = px.shape
+        x = gap + col * (cell_w + gap) + (cell_w - w) // 2
+        y = gap + row * (cell_h + gap) + (cell_h - h) // 2
+        canvas[y:y + h, x:x + w] = px
+        placed.append(Tile(filename, x, y, w, h))
+    return ContactSheet(canvas, placed)
+
+
+def build_contact_sheet(
+    thumbs: Dict[str, bytes], rc: Dict[str, object], codec: Codec
+) -> Tuple[bytes, dict]:
+    """Encoded contact sheet and its tile map from encoded thumbnails (filename -> bytes)."""
+    sheet = compose_contact_sheet(
+        [(fn, decode_rgba(data)) for fn, data in sorted(thumbs.items())],
+        background=background_rgba(rc),
+    )
+    image = Image.fromarray(sheet.pixels, 'RGBA')
+    return encode_image(image, codec, 72), sheet.tile_map()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import matplotlib as mpl
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image, features
+
+from .metrics import span
+
+# -------------------------
+# Codecs
+# -------------------------
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    format: str  # Pillow format name
+    media_type: str
+    ext: str
+    options: Dict[str, object] = field(default_factory=dict)
+    quantize: bool = False  # reduce to a 256-colour palette before encoding
+
+
+CODECS: Dict[str, Codec] = {
+    # Previews: speed over size
+    'png-fast': Codec('png-fast', 'PNG', 'image/png', 'png', {'compress_level': 1}),
+    # Matplotlib's default zlib level
+    'png': Codec('png', 'PNG', 'image/png', 'png', {'compress_level': 6}),
+    # Downloads: size over speed
+    'png-opt': Codec('png-opt', 'PNG', 'image/png', 'png', {'optimize': True}),
+    'png-quant': Codec('png-quant', 'PNG', 'image/png', 'png', {'optimize': True}, quantize=True),
+    'webp-lossless': Codec(
+        'webp-lossless', 'WEBP', 'image/webp', 'webp',
+        {'lossless': True, 'quality': 70, 'method': 4},
+    ),
+}
+if features.check('avif'):
+    CODECS['avif'] = Codec('avif', 'AVIF', 'image/avif', 'avif', {'quality': 85, 'speed': 8})
+
+PREVIEW_CODEC = 'png-fast'
+DOWNLOAD_CODEC = 'png-opt'
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown codec {name!r}; choose one of {sorted(CODECS)}",
+        )
+
+
+def swap_ext(filename: str, codec: Codec) -> str:
+    stem, _, _ = filename.rpartition('.')
+    return f"{stem or filename}.{codec.ext}"
+
+
+# -------------------------
+# Raw Agg buffer access
+# -------------------------
+
+
+@dataclass
+class Raster:
+    """A drawn Agg canvas, as savefig left it.
+
+    `pixels` is a zero-copy (H, W, 4) uint8 view of the renderer's memory, so a
+    Raster is only valid until its figure is closed.
+    """
+
+    pixels: np.ndarray
+    dpi: float
+
+    def to_image(self) -> Image.Image:
+        """Pillow view of the pixels, without copying."""
+        h, w, _ = self.pixels.shape
+        return Image.frombuffer('RGBA', (w, h), self.pixels, 'raw', 'RGBA', 0, 1)
+
+
+class _Discard:
+    """Write-only file object that drops what savefig writes; the pixels are read from the canvas."""
+
+    def write(self, data) -> int:
+        return len(data)
+
+    def seek(self, *args) -> int:
+        return 0
+
+
+def figure_raster(fig: mpl.figure.Figure) -> Raster:
+    """Draw `fig` exactly as savefig would (rc savefig.*) and return its raw raster.
+
+    savefig itself does the drawing, so tight bboxes, padding, transparency
+    and face colours match it pixel for pixel. The raw 'rgba' format skips
+    the PNG round trip: the file it writes is discarded, and the pixels are
+    read from the canvas's renderer, which still holds the final draw.
+    """
+    fig.savefig(_Discard(), format='rgba')
+    pixels = np.asarray(fig.canvas.renderer.buffer_rgba())
+    dpi = mpl.rcParams['savefig.dpi']
+    return Raster(pixels=pixels, dpi=fig.dpi if dpi == 'figure' else dpi)
+
+
+# -------------------------
+# Encoding
+# -------------------------
+
+
+def encode_image(im: Image.Image, codec: Codec, dpi: float) -> bytes:
+    if codec.quantize:
+        im = im.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    buf = io.BytesIO()
+    options = dict(codec.options)
+    if codec.format == 'PNG':
+        options['dpi'] = (dpi, dpi)
+    im.save(buf, format=codec.format, **options)
+    return buf.getvalue()
+
+
+# -------------------------
+# Thumbnail pyramid
+# -------------------------
+
+# Level name -> longest edge in pixels (None keeps the full render)
+PYRAMID: Dict[str, Optional[int]] = {
+    'thumb': 256,  # thumbnail grid
+    'preview': 1024,  # large preview / compare slider
+    'full': None,  # downloads, zoom
+}
+VIEW_LEVELS: Tuple[str, ...] = ('thumb', 'preview')
+
+
+def parse_levels(levels: Iterable[str]) -> Tuple[str, ...]:
+    """Validate pyramid level names; returns them in PYRAMID order, de-duplicated."""
+    wanted = {lv.strip() for lv in levels if lv.strip()}
+    unknown = wanted - PYRAMID.keys()
+    if unknown or not wanted:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown pyramid level(s) {sorted(unknown)}; choose from {list(PYRAMID)}",
+        )
+    return tuple(lv for lv in PYRAMID if lv in wanted)
+
+
+def downsample(im: Image.Image, max_edge: Optional[int]) -> Image.Image:
+    """Area-average `im` so its longest edge is at most `max_edge` (never upscales)."""
+    w, h = im.size
+    if max_edge is None or max(w, h) <= max_edge:
+        return im
+    scale = max_edge / max(w, h)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    # BOX is a true area average; reducing_gap lets Pillow do integer block reduction first
+    return im.resize(size, Image.Resampling.BOX, reducing_gap=2.0)
+
+
+def figure_image(fig: mpl.figure.Figure) -> Tuple[Image.Image, float]:
+    """Draw `fig` as savefig would and return the image with its dpi.
+
+    The image may be a zero-copy view of the Agg buffer; it stays valid after
+    the figure is released, as long as the image is referenced.
+    """
+    raster = figure_raster(fig)
+    return raster.to_image(), raster.dpi
+
+
+def encode_levels(
+    im: Image.Image, dpi: float, codec: Codec, levels: Iterable[str] = tuple(PYRAMID)
+) -> Dict[str, bytes]:
+    """Encode pyramid levels of a full-size image; needs no Matplotlib state."""
+    wanted = set(levels)
+    full_width = im.width
+    out: Dict[str, bytes] = {}
+    for lv in sorted(PYRAMID, key=lambda name: -(PYRAMID[name] or 1 << 30)):
+        if not wanted - out.keys():
+            break
+        with span('resample'):
+            im = downsample(im, PYRAMID[lv])
+        if lv in wanted:
+            with span('encode'):
+                out[lv] = encode_image(im, codec, dpi * im.width / full_width)
+    return out
@@ -3,12 +3,31 @@ from __future__ import annotations
 import io
 import math
 import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import matplotlib as mpl
-import matplotlib.pyplot as plt
+import matplotlib.axes
+import matplotlib.figure
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .cache import RENDER_CACHE, get_render_store
+from .encoding import PYRAMID, encode_levels, figure_image, get_codec
+from .fonts import apply_font_chain
+from .memguard import GUARD
+from .metrics import FIGURE_SECONDS, RENDERS, span
+from .rcnorm import rc_digest
+from .scheduler import DRAW_SCHEDULER, current_focus
+from .theming import ensure_colormap
+
+# rcParams (and the colormap registry) are process-global: rc_context in one thread changes
+# what every other thread builds and draws. Renders in this process take turns for that part:
+# scheduled ones through DRAW_SCHEDULER's single slot, so this lock only ever waits on
+# unscheduled work (warm-up, CLI, benchmarks).
+RC_LOCK = threading.RLock()
 
 FigureGenerator = Callable[[mpl.axes.Axes, np.random.Generator], None]
 
@@ -111,13 +130,31 @@ def fig_hist(ax: mpl.axes.Axes, rng: np.random.Generator) -> None:
     _apply_ax_style(ax)
 
 
+def _diverging_cmap() -> str:
+    """The theme's diverging colormap for signed data, unless image.cmap was set to something else."""
+    from .theming import CMAP_PREFIX, ensure_colormap, theme_colormaps
+
+    cmap = mpl.rcParams['image.cmap']
+    if isinstance(cmap, str) and not cmap.startswith(CMAP_PREFIX):
+        return cmap  # an explicit user choice wins
+    colors = [mpl.colors.to_hex(c).upper()
+              for c in mpl.rcParams['axes.prop_cycle'].by_key().get('color', [])]
+    if not colors:
+        return cmap
+    name = theme_colormaps(colors, mpl.colors.to_hex(mpl.rcParams['axes.facecolor']).upper())['diverging']
+    ensure_colormap(name)
+    return name
+
+
 def fig_heatmap(ax: mpl.axes.Axes, rng: np.random.Generator) -> None:
     x = np.linspace(-3, 3, 200)
     y = np.linspace(-3, 3, 200)
     X, Y = np.meshgrid(x, y)
     Z = np.exp(-(X**2 + Y**2)) * np.cos(2*X) * np.sin(2*Y)
-    im = ax.imshow(Z, origin='lower', extent=[x.min(), x.max(), y.min(), y.max()])
-    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+    vmax = float(np.abs(Z).max())
+    im = ax.imshow(Z, origin='lower', extent=[x.min(), x.max(), y.min(), y.max()],
+                   cmap=_diverging_cmap(), vmin=-vmax, vmax=vmax)
+    cbar = ax.figure.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
     cbar.ax.set_ylabel('intensity')
     ax.set_title("Heatmap: analytic surface")
     _apply_ax_style(ax)
@@ -125,8 +162,9 @@ def fig_heatmap(ax: mpl.axes.Axes, rng: np.random.Generator) -> None:
 
 def fig_polar(ax: mpl.axes.Axes, rng: np.random.Generator) -> None:
     # Convert to polar projection
+    fig = ax.figure  # not plt.gcf(): that is whichever figure pyplot touched last, in any thread
     ax.remove()
-    ax = plt.gcf().add_subplot(111, projection='polar')
+    ax = fig.add_subplot(111, projection='polar')
     theta = np.linspace(0, 2*np.pi, 200)
     r = 1 + 0.3 * np.cos(5*theta) + 0.1 * np.sin(7*theta)
     ax.plot(theta, r)
@@ -244,7 +282,6 @@ def build_figure_specs() -> List[FigureSpec]:
 
     specs.append(FigureSpec(
         name='Heatmap', filename='05_heatmap.png', rc_mod={**common_mod, **{
-            'image.cmap': 'viridis',
             'image.interpolation': 'nearest',
             'axes.grid': False,
             'axes.edgecolor': 'none',
@@ -306,21 +343,196 @@ def build_figure_specs() -> List[FigureSpec]:
     return specs
 
 
-def render_all(theme_rc: Dict[str, object], seed: int) -> Dict[str, bytes]:
-    """Render all figures with given theme_rc, returning mapping filename->PNG bytes."""
-    specs = build_figure_specs()
-    rng = np.random.default_rng(seed)
-
+def new_figure() -> mpl.figure.Figure:
+    """A figure on its own Agg canvas, outside pyplot's global registry.
+
+    Nothing but the caller holds a reference, so it cannot leak through
+    pyplot's figure manager if a close is missed. Build and draw it under
+    RC_LOCK: the rcParams it reads are shared by every thread.
+    """
+    fig = mpl.figure.Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def release_figure(fig: mpl.figure.Figure) -> None:
+    """Drop the figure's artists and Agg buffer now rather than at the next cyclic GC pass."""
+    fig.clear()
+    fig.canvas.renderer = None  # the cached RendererAgg holds the full-size pixel buffer
+
+
+def figure_rng(seed: int, index: int) -> np.random.Generator:
+    """Independent RNG stream per figure, so any figure can be re-rendered alone."""
+    return np.random.default_rng([seed, index])
+
+
+def render_figure_levels(
+    spec: FigureSpec,
+    index: int,
+    theme_rc: Dict[str, object],
+    seed: int,
+    codec: str = 'png',
+    levels: Iterable[str] = tuple(PYRAMID),
+) -> Dict[str, bytes]:
+    """Render a single FigureSpec once and encode the requested pyramid levels.
+
+    Building and drawing hold the draw slot of the fair scheduler (a no-op
+    outside tagged request work) and RC_LOCK; encoding runs after both are
+    released, so concurrent renders overlap only there.
+    """
+    enc = get_codec(codec)
+    rc = theme_rc | spec.rc_mod
+    t0 = time.perf_counter()
+    try:
+        with GUARD.render() as track:
+            with DRAW_SCHEDULER.slot(spec.filename), RC_LOCK, mpl.rc_context(apply_font_chain(rc)):
+                ensure_colormap(rc.get('image.cmap'))  # theme colormaps are registered lazily, per process
+                fig = track(new_figure())
+                try:
+                    with span('build'):
+                        spec.generator(fig.add_subplot(), figure_rng(seed, index))
+                    with span('draw'):
+                        im, dpi = figure_image(fig)
+                finally:
+                    release_figure(fig)
+            return encode_levels(im, dpi, enc, levels)
+    finally:
+        FIGURE_SECONDS.observe(time.perf_counter() - t0, spec.filename)
+        RENDERS.inc(spec.filename)
+
+
+def render_figure(
+    spec: FigureSpec,
+    index: int,
+    theme_rc: Dict[str, object],
+    seed: int,
+    codec: str = 'png',
+) -> bytes:
+    """Render a single FigureSpec with the given theme rc and return encoded bytes."""
+    return render_figure_levels(spec, index, theme_rc, seed, codec, ('full',))['full']
+
+
+def figure_cache_key(
+    spec: FigureSpec, theme_rc: Dict[str, object], seed: int, codec: str = 'png'
+) -> Tuple[str, str, int, str]:
+    """Cache key for one figure: the effective rc it renders under, seed and codec."""
+    return (spec.filename, rc_digest(theme_rc | spec.rc_mod), seed, codec)
+
+
+def levels_to_encode(levels: Iterable[str]) -> Tuple[str, ...]:
+    """Levels to encode on a cache miss.
+
+    View-only requests (thumb/preview) encode the whole pyramid so any later
+    view is a cache hit; requests that include 'full' (downloads) encode exactly
+    what they ask for.
+    """
+    levels = tuple(levels)
+    return levels if 'full' in levels else tuple(PYRAMID)
+
+
+def cached_levels(key: Tuple[str, str, int, str], levels: Iterable[str]) -> Optional[Dict[str, bytes]]:
+    """All requested levels of one figure, or None if any is missing.
+
+    RENDER_CACHE (this process) is checked first, then the shared on-disk
+    store, which holds what every worker has rendered. Store hits are not
+    copied into RENDER_CACHE; the page cache already shares them.
+    """
+    store = get_render_store()
     out: Dict[str, bytes] = {}
-    for spec in specs:
-        with mpl.rc_context(theme_rc | spec.rc_mod):
-            fig, ax = plt.subplots()
-            try:
-                spec.generator(ax, rng)
-                fig.canvas.draw()
-                buf = io.BytesIO()
-                fig.savefig(buf, format='png')
-                out[spec.filename] = buf.getvalue()
-            finally:
-                plt.close(fig)
+    for lv in levels:
+        data = RENDER_CACHE.get(key + (lv,))
+        if data is None and store is not None:
+            data = store.get(key + (lv,))
+        if data is None:
+            return None
+        out[lv] = data
+    return out
+
+
+def cache_levels(key: Tuple[str, str, int, str], rendered: Dict[str, bytes]) -> None:
+    store = get_render_store()
+    for lv, data in rendered.items():
+        RENDER_CACHE.put(key + (lv,), data)
+        if store is not None:
+            store.put(key + (lv,), data)
+
+
+def store_names(
+    rendered: Dict[str, Dict[str, bytes]],
+    theme_rc: Dict[str, object],
+    seed: int,
+    base_rc: Optional[Dict[str, object]] = None,
+    codec: str = 'png',
+) -> Dict[str, Dict[str, str]]:
+    """filename -> {level: render-store name} for output of render_levels with the same arguments.
+
+    Entries the store has evicted (or that only RENDER_CACHE held) are written
+    back first, so every returned name can be served. Requires the store.
+    """
+    store = get_render_store()
+    if base_rc:
+        theme_rc = base_rc | theme_rc
+    specs = {spec.filename: spec for spec in build_figure_specs()}
+    return {
+        fn: {
+            lv: store.put(figure_cache_key(specs[fn], theme_rc, seed, codec) + (lv,), data)
+            for lv, data in by_level.items()
+        }
+        for fn, by_level in rendered.items()
+    }
+
+
+def render_levels(
+    theme_rc: Dict[str, object],
+    seed: int,
+    levels: Iterable[str],
+    only: Optional[Iterable[str]] = None,
+    base_rc: Optional[Dict[str, object]] = None,
+    codec: str = 'png',
+    refresh: bool = False,
+) -> Dict[str, Dict[str, bytes]]:
+    """Render figures at the given pyramid levels: filename -> {level: encoded bytes}.
+
+    Each level is cached under the figure's cache key plus the level name. On a
+    miss, view-only requests encode the whole pyramid from the one render, so
+    switching views never re-renders (see levels_to_encode). `refresh` skips the
+    lookup (e.g. to profile a real render); the result still replaces the cache.
+    """
+    if base_rc:
+        theme_rc = base_rc | theme_rc
+    levels = tuple(levels)
+    specs = list(enumerate(build_figure_specs()))
+    wanted = set(only) if only is not None else None
+    focus = current_focus()
+    if focus is not None:
+        specs.sort(key=lambda item: item[1].filename != focus)  # the figure on screen first
+
+    out: Dict[str, Dict[str, bytes]] = {}
+    for i, spec in specs:
+        if wanted is not None and spec.filename not in wanted:
+            continue
+        key = figure_cache_key(spec, theme_rc, seed, codec)
+        cached = None if refresh else cached_levels(key, levels)
+        if cached is None:
+            cached = render_figure_levels(spec, i, theme_rc, seed, codec, levels_to_encode(levels))
+            cache_levels(key, cached)
+        out[spec.filename] = {lv: cached[lv] for lv in levels}
     return out
+
+
+def render_all(
+    theme_rc: Dict[str, object],
+    seed: int,
+    only: Optional[Iterable[str]] = None,
+    base_rc: Optional[Dict[str, object]] = None,
+    codec: str = 'png',
+) -> Dict[str, bytes]:
+    """Render all figures with given theme_rc, returning mapping filename->encoded bytes.
+
+    Figures are served from RENDER_CACHE when their effective rc, seed and codec
+    were rendered before (each codec variant is cached separately). Pass `only`
+    (filenames) to render a subset, and `base_rc` (e.g. a parsed .mplstyle) to
+    layer a style underneath theme_rc.
+    """
+    rendered = render_levels(theme_rc, seed, ('full',), only, base_rc, codec)
+    return {fn: lv['full'] for fn, lv in rendered.items()}
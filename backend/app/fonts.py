@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import threading
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+
+# -------------------------
+# Process-wide font resolution
+# -------------------------
+
+GENERIC_FAMILIES = frozenset(
+    {'serif', 'sans-serif', 'sans serif', 'monospace', 'cursive', 'fantasy', 'sans'}
+)
+FALLBACK_FAMILY = 'DejaVu Sans'  # always shipped with Matplotlib
+
+
+@dataclass(frozen=True)
+class FontChain:
+    """A theme's font.family list resolved against the installed fonts."""
+
+    families: Tuple[str, ...]  # installed families in priority order, ending in a fallback
+    regular_files: Tuple[str, ...]  # concrete file per family (normal weight)
+    bold_files: Tuple[str, ...]  # concrete file per family (bold, or closest weight)
+    missing: Tuple[str, ...]  # requested families that are not installed
+
+
+def _installed_families() -> frozenset:
+    from matplotlib import font_manager
+    return frozenset(f.name for f in font_manager.fontManager.ttflist)
+
+
+def _find_file(family: str, weight: str) -> str:
+    from matplotlib import font_manager
+    prop = font_manager.FontProperties(family=[family], weight=weight)
+    return font_manager.findfont(prop, fallback_to_default=True)
+
+
+@lru_cache(maxsize=128)
+def resolve_font_chain(families: Tuple[str, ...]) -> FontChain:
+    """Resolve a family list once: drop families that aren't installed, pin files.
+
+    Missing families are what make every text artist pay for findfont misses
+    (and log a warning each time); generic names are kept as-is.
+    """
+    installed = _installed_families()
+    keep: List[str] = []
+    missing: List[str] = []
+    for fam in families:
+        if fam in installed or fam.lower() in GENERIC_FAMILIES:
+            if fam not in keep:
+                keep.append(fam)
+        else:
+            missing.append(fam)
+    if FALLBACK_FAMILY not in keep:
+        keep.append(FALLBACK_FAMILY)
+
+    with quiet_fonts():
+        regular = tuple(_find_file(f, 'normal') for f in keep)
+        bold = tuple(_find_file(f, 'bold') for f in keep)
+    return FontChain(tuple(keep), regular, bold, tuple(missing))
+
+
+# Loaded FT2Font objects (with their glyph fallbacks), kept alive across renders.
+_LOADED: Dict[Tuple[str, ...], object] = {}
+_loaded_lock = threading.Lock()
+
+
+def preload_font_chain(chain: FontChain) -> None:
+    """Open the chain's FT2Font objects once (regular and bold fallback lists)."""
+    from matplotlib import font_manager
+    for files in (chain.regular_files, chain.bold_files):
+        key = tuple(dict.fromkeys(files))  # de-dupe, keep order
+        with _loaded_lock:
+            if key in _LOADED:
+                continue
+            _LOADED[key] = font_manager.get_font(list(key))
+
+
+def apply_font_chain(rc: Dict[str, object]) -> Dict[str, object]:
+    """Return rc with font.family replaced by its resolved, explicit fallback chain."""
+    families = rc.get('font.family')
+    if families is None:
+        return rc
+    if isinstance(families, str):
+        families = [families]
+    chain = resolve_font_chain(tuple(families))
+    preload_font_chain(chain)
+    if list(chain.families) == list(families):
+        return rc
+    return rc | {'font.family': list(chain.families)}
+
+
+# -------------------------
+# Warning suppression
+# -------------------------
+
+class _FindfontFilter(logging.Filter):
+    """Drop matplotlib.font_manager 'findfont: ...' fallback chatter."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not record.getMessage().startswith('findfont:')
+
+
+_FILTER = _FindfontFilter()
+
+
+def install_font_warning_filters() -> None:
+    """Silence per-artist font fallback noise for the whole process (idempotent)."""
+    logger = logging.getLogger('matplotlib.font_manager')
+    if _FILTER not in logger.filters:
+        logger.addFilter(_FILTER)
+    # cmr10 lacks a unicode minus; glyph fallback to the next family in the chain covers it.
+    warnings.filterwarnings(
+        'ignore', message='cmr10 font should ideally be used with mathtext', category=UserWarning
+    )
+
+
+@contextmanager
+def quiet_fonts() -> Iterator[None]:
+    """Temporarily silence font_manager logging (e.g. while probing weights)."""
+    logger = logging.getLogger('matplotlib.font_manager')
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .utils import dumps, loads
+
+# -------------------------
+# Storage
+# -------------------------
+
+LIBRARY_PATH = Path(os.getenv('THEMELAB_LIBRARY', str(Path.home() / '.themelab' / 'library.sqlite3')))
+MAX_COLORS = 10  # palettes are stored padded to this many Oklab rows
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS themes (
+    id        INTEGER PRIMARY KEY,
+    hash      TEXT NOT NULL UNIQUE,     -- digest of the canonical rc (app.rcnorm)
+    name      TEXT,
+    mode      TEXT,
+    accent    TEXT,
+    bg        TEXT,
+    fg        TEXT,
+    palette   TEXT NOT NULL,            -- JSON list of hex
+    lab       BLOB NOT NULL,            -- float32 (MAX_COLORS, 3) Oklab, zero padded
+    n_colors  INTEGER NOT NULL,
+    seed      INTEGER NOT NULL,
+    theme     BLOB NOT NULL,            -- orjson of the serialized theme
+    created   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS themes_mode_accent ON themes (mode, accent);
+CREATE INDEX IF NOT EXISTS themes_accent ON themes (accent);
+CREATE TABLE IF NOT EXISTS tags (
+    tag       TEXT NOT NULL,
+    theme_id  INTEGER NOT NULL REFERENCES themes (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, theme_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_theme ON tags (theme_id);
+'''
+
+_SUMMARY_COLUMNS = 'id, hash, name, mode, accent, bg, fg, palette, seed, created'
+_SUMMARY_SELECT = ', '.join(f'themes.{c}' for c in _SUMMARY_COLUMNS.split(', '))
+
+
+def _summary(row: sqlite3.Row, tags: Optional[List[str]] = None) -> dict:
+    return {
+        'hash': row['hash'],
+        'name': row['name'],
+        'mode': row['mode'],
+        'accent': row['accent'],
+        'bg': row['bg'],
+        'fg': row['fg'],
+        'palette': loads(row['palette']),
+        'seed': row['seed'],
+        'created': row['created'],
+        'tags': tags or [],
+    }
+
+
+# -------------------------
+# Palette embedding for nearest-neighbour search
+# -------------------------
+
+def _anchor_grid() -> np.ndarray:
+    """Fixed Oklab points the embedding measures palettes against: 4 greys + 4 x 8 hues."""
+    pts = [(L, 0.0, 0.0) for L in (0.3, 0.5, 0.7, 0.9)]
+    for L in (0.3, 0.5, 0.7, 0.9):
+        for h in np.radians(np.arange(0, 360, 45)):
+            pts.append((L, 0.12 * np.cos(h), 0.12 * np.sin(h)))
+    return np.array(pts, dtype=np.float32)
+
+
+_ANCHORS = _anchor_grid()
+_ANCHORS_SQ = (_ANCHORS * _ANCHORS).sum(1)
+_SIGMA2 = 2 * 0.09 ** 2
+
+
+def embed(lab: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """(M, MAX_COLORS, 3) padded Oklab palettes -> (M, A) order-free soft histograms.
+
+    Each colour spreads a Gaussian vote over the anchors; votes are averaged
+    over the palette, so rotations and reorderings embed identically and
+    palettes of different lengths stay comparable.
+    """
+    # |x - a|^2 = |x|^2 + |a|^2 - 2 x.a, as one matmul (M, C, 3) @ (3, A)
+    d2 = (lab * lab).sum(-1)[..., None] + _ANCHORS_SQ - 2.0 * (lab @ _ANCHORS.T)  # (M, C, A)
+    votes = np.exp(d2 * np.float32(-1.0 / _SIGMA2))
+    votes *= (np.arange(lab.shape[1])[None, :] < n[:, None])[..., None]
+    return (votes.sum(1) / n[:, None]).astype(np.float32)
+
+
+def set_distance(a: np.ndarray, na: int, b: np.ndarray, nb: np.ndarray) -> np.ndarray:
+    """Symmetric mean nearest-colour Oklab distance between one palette and many.
+
+    a: (MAX_COLORS, 3), b: (K, MAX_COLORS, 3); padding rows are ignored.
+    """
+    d = np.sqrt(((a[None, :na, None, :] - b[:, None, :, :]) ** 2).sum(-1))  # (K, na, C)
+    pad_b = np.arange(b.shape[1])[None, :] >= nb[:, None]  # (K, C)
+    d_ab = np.where(pad_b[:, None, :], np.inf, d).min(2).mean(1)
+    d_ba = np.where(pad_b, 0.0, d.min(1)).sum(1) / nb
+    return np.maximum(d_ab, d_ba)
+
+
+def palette_lab(palette: Sequence[str]) -> Tuple[np.ndarray, int]:
+    from .theming import srgb_to_oklab_array
+    from matplotlib.colors import to_rgba_array
+
+    if not 1 <= len(palette) <= MAX_COLORS:
+        raise ValueError(f'palette must have 1-{MAX_COLORS} colours')
+    lab = np.zeros((MAX_COLORS, 3), dtype=np.float32)
+    lab[:len(palette)] = srgb_to_oklab_array(to_rgba_array(list(palette))[:, :3])
+    return lab, len(palette)
+
+
+@dataclass
+class Match:
+    hash: str
+    distance: float
+
+
+class PaletteIndex:
+    """In-memory arrays mirroring the themes table, for brute-force vectorized search.
+
+    Loaded from SQLite on first use, then kept in sync by ThemeLibrary writes.
+    At 100k themes the embeddings are ~14 MB of float32 and one query is a
+    single matrix-vector product plus an exact re-rank of the best few hundred.
+    """
+
+    def __init__(self) -> None:
+        self.hashes: List[str] = []
+        self.modes: List[Optional[str]] = []
+        self.lab = np.zeros((0, MAX_COLORS, 3), dtype=np.float32)
+        self.n = np.zeros(0, dtype=np.int64)
+        self.emb = np.zeros((0, len(_ANCHORS)), dtype=np.float32)
+        self._pending: List[Tuple[str, Optional[str], np.ndarray, int]] = []
+        self._mode_codes: Optional[np.ndarray] = None
+        self._emb_sq: Optional[np.ndarray] = None
+
+    def load(self, rows: Iterable[Tuple[str, Optional[str], bytes, int]]) -> None:
+        rows = list(rows)
+        self.hashes = [r[0] for r in rows]
+        self.modes = [r[1] for r in rows]
+        self.lab = np.frombuffer(b''.join(r[2] for r in rows), dtype=np.float32).reshape(-1, MAX_COLORS, 3)
+        self.n = np.array([r[3] for r in rows], dtype=np.int64)
+        self.emb = self._embed_chunks(self.lab, self.n)
+        self._pending.clear()
+        self._mode_codes = None
+        self._emb_sq = None
+
+    @staticmethod
+    def _embed_chunks(lab: np.ndarray, n: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        out = np.empty((len(lab), len(_ANCHORS)), dtype=np.float32)
+        for s in range(0, len(lab), chunk):
+            out[s:s + chunk] = embed(lab[s:s + chunk], n[s:s + chunk])
+        return out
+
+    def add(self, hash_: str, mode: Optional[str], lab: np.ndarray, n: int) -> None:
+        self._pending.append((hash_, mode, lab, n))
+
+    def remove(self, hash_: str) -> None:
+        self._flush()
+        try:
+            i = self.hashes.index(hash_)
+        except ValueError:
+            return
+        keep = np.arange(len(self.hashes)) != i
+        del self.hashes[i], self.modes[i]
+        self.lab, self.n, self.emb = self.lab[keep], self.n[keep], self.emb[keep]
+        self._mode_codes = None
+        self._emb_sq = None
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        lab = np.stack([p[2] for p in self._pending]).astype(np.float32)
+        n = np.array([p[3] for p in self._pending], dtype=np.int64)
+        self.hashes += [p[0] for p in self._pending]
+        self.modes += [p[1] for p in self._pending]
+        self.lab = np.concatenate([self.lab, lab])
+        self.n = np.concatenate([self.n, n])
+        self.emb = np.concatenate([self.emb, embed(lab, n)])
+        self._pending.clear()
+        self._mode_codes = None
+        self._emb_sq = None
+
+    def __len__(self) -> int:
+        return len(self.hashes) + len(self._pending)
+
+    def search(
+        self, lab: np.ndarray, n: int, k: int = 10, mode: Optional[str] = None, shortlist: int = 256
+    ) -> List[Match]:
+        """k nearest palettes by set distance; the embedding picks a shortlist to re-rank exactly."""
+        self._flush()
+        if not self.hashes:
+            return []
+        q = embed(lab[None], np.array([n]))[0]
+        if self._emb_sq is None:
+            self._emb_sq = np.einsum('ij,ij->i', self.emb, self.emb)
+        d2 = self._emb_sq - 2.0 * (self.emb @ q)  # + |q|^2, constant for ranking
+        if mode is not None:
+            if self._mode_codes is None:
+                self._mode_codes = np.array([m or '' for m in self.modes], dtype='U8')
+            d2 = np.where(self._mode_codes == mode, d2, np.inf)
+        m = min(max(shortlist, k), len(d2))
+        cand = np.argpartition(d2, m - 1)[:m]
+        cand = cand[np.isfinite(d2[cand])]
+        if not len(cand):
+            return []
+        exact = set_distance(lab, n, self.lab[cand], self.n[cand])
+        order = np.argsort(exact)[:k]
+        return [Match(self.hashes[cand[i]], float(exact[i])) for i in order]
+
+
+# -------------------------
+# Library
+# -------------------------
+
+DUPLICATE_DISTANCE = 0.02  # Oklab set distance under which two palettes read as the same
+
+
+class ThemeLibrary:
+    """SQLite-backed theme store keyed by canonical rc digest, with a palette NN index.
+
+    One connection guarded by a lock (WAL mode, so readers in other processes
+    aren't blocked); all methods are thread-safe.
+    """
+
+    def __init__(self, path: Path = LIBRARY_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA foreign_keys=ON')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._index: Optional[PaletteIndex] = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _ensure_index(self) -> PaletteIndex:
+        if self._index is None:
+            index = PaletteIndex()
+            index.load(self._db.execute('SELECT hash, mode, lab, n_colors FROM themes ORDER BY id'))
+            self._index = index
+        return self._index
+
+    def _tags(self, ids: Sequence[int]) -> Dict[int, List[str]]:
+        out: Dict[int, List[str]] = {i: [] for i in ids}
+        if ids:
+            marks = ','.join('?' * len(ids))
+            for r in self._db.execute(
+                f'SELECT theme_id, tag FROM tags WHERE theme_id IN ({marks}) ORDER BY tag', list(ids)
+            ):
+                out[r[0]].append(r[1])
+        return out
+
+    # -- writes --------------------------------------------------------------
+
+    def save(self, theme: dict, digest: str, tags: Sequence[str] = ()) -> Tuple[dict, bool]:
+        """Insert a serialized theme (or add tags to the stored copy); returns (summary, created)."""
+        (_, created), = self.save_many([(theme, digest, tags)])
+        with self._lock:
+            row = self._db.execute(f'SELECT {_SUMMARY_COLUMNS} FROM themes WHERE hash = ?', (digest,)).fetchone()
+            return _summary(row, self._tags([row['id']])[row['id']]), created
+
+    def save_many(
+        self, entries: Sequence[Tuple[dict, str, Sequence[str]]]
+    ) -> List[Tuple[str, bool]]:
+        """save() for many (theme, digest, tags) entries in one transaction; returns (digest, created) pairs."""
+        from matplotlib.colors import to_hex
+
+        from .analysis import theme_colors
+
+        prepared = []
+        for theme, digest, tags in entries:
+            palette, bg, fg = theme_colors(theme)
+            palette = [to_hex(c).upper() for c in palette]
+            lab, n = palette_lab(palette)
+            prepared.append((
+                theme, digest, sorted({t.strip().lower() for t in tags if t.strip()}),
+                palette, to_hex(bg).upper(), to_hex(fg).upper(), lab, n,
+            ))
+
+        out: List[Tuple[str, bool]] = []
+        with self._lock, self._db:
+            for theme, digest, tags, palette, bg, fg, lab, n in prepared:
+                row = self._db.execute('SELECT id FROM themes WHERE hash = ?', (digest,)).fetchone()
+                created = row is None
+                if created:
+                    mode = theme.get('mode')
+                    cur = self._db.execute(
+                        'INSERT INTO themes (hash, name, mode, accent, bg, fg, palette, lab, n_colors, seed, theme, created)'
+                        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (digest, theme.get('name'), mode, (theme.get('accent') or '').upper() or None,
+                         bg, fg, dumps(palette).decode(), lab.tobytes(), n,
+                         int(theme.get('seed', 42)), dumps(theme), time.time()),
+                    )
+                    theme_id = cur.lastrowid
+                    if self._index is not None:
+                        self._index.add(digest, mode, lab, n)
+                else:
+                    theme_id = row[0]
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO tags (tag, theme_id) VALUES (?, ?)', [(t, theme_id) for t in tags]
+                )
+                out.append((digest, created))
+        return out
+
+    def delete(self, digest: str) -> bool:
+        with self._lock, self._db:
+            gone = self._db.execute('DELETE FROM themes WHERE hash = ?', (digest,)).rowcount > 0
+            if gone and self._index is not None:
+                self._index.remove(digest)
+            return gone
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute('SELECT id, theme FROM themes WHERE hash = ?', (digest,)).fetchone()
+            if row is None:
+                return None
+            theme = loads(row['theme'])
+            theme['library'] = {'hash': digest, 'tags': self._tags([row['id']])[row['id']]}
+            return theme
+
+    def list(
+        self,
+        mode: Optional[str] = None,
+        accent: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[dict], int]:
+        """Newest first, filtered on indexed columns; returns (page, total matches)."""
+        where, args = [], []
+        source = 'themes'
+        if tag:
+            # Walk the (tag, theme_id) primary key backwards: no sort, no IN-list
+            source = 'tags JOIN themes ON themes.id = tags.theme_id'
+            where.append('tags.tag = ?')
+            args.append(tag.strip().lower())
+        if mode:
+            where.append('mode = ?')
+            args.append(mode)
+        if accent:
+            where.append('accent = ?')
+            args.append(accent.upper())
+        clause = f" WHERE {' AND '.join(where)}" if where else ''
+        order = 'tags.theme_id' if tag else 'themes.id'
+        with self._lock:
+            # A tag alone is counted on its covering key; ON DELETE CASCADE keeps tags exact
+            count_from = 'tags' if tag and len(where) == 1 else source
+            total = self._db.execute(f'SELECT COUNT(*) FROM {count_from}{clause}', args).fetchone()[0]
+            rows = self._db.execute(
+                f'SELECT {_SUMMARY_SELECT} FROM {source}{clause} ORDER BY {order} DESC LIMIT ? OFFSET ?',
+                [*args, limit, offset],
+            ).fetchall()
+            tags = self._tags([r['id'] for r in rows])
+            return [_summary(r, tags[r['id']]) for r in rows], total
+
+    def nearest(
+        self, palette: Sequence[str], k: int = 10, mode: Optional[str] = None
+    ) -> List[dict]:
+        """The k stored themes whose palettes are closest (Oklab set distance) to `palette`."""
+        lab, n = palette_lab(palette)
+        with self._lock:
+            matches = self._ensure_index().search(lab, n, k=k, mode=mode)
+            if not matches:
+                return []
+            marks = ','.join('?' * len(matches))
+            rows = {
+                r['hash']: r for r in self._db.execute(
+                    f'SELECT {_SUMMARY_COLUMNS} FROM themes WHERE hash IN ({marks})', [m.hash for m in matches]
+                )
+            }
+            tags = self._tags([r['id'] for r in rows.values()])
+            return [
+                {**_summary(rows[m.hash], tags[rows[m.hash]['id']]),
+                 'distance': round(m.distance, 5), 'duplicate': m.distance < DUPLICATE_DISTANCE}
+                for m in matches if m.hash in rows
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM themes').fetchone()[0]
+
+
+_library: Optional[ThemeLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_library() -> ThemeLibrary:
+    """The process-wide library at THEMELAB_LIBRARY, opened on first use."""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = ThemeLibrary()
+        return _library
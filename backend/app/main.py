@@ -1,24 +1,115 @@
 from __future__ import annotations
 
+import hmac
 import io
 import os
 import tempfile
+import time
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import matplotlib as mpl
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from .cache import STORE_NAME_RE, get_render_store
+from .encoding import (
+    CODECS,
+    DOWNLOAD_CODEC,
+    PREVIEW_CODEC,
+    VIEW_LEVELS,
+    get_codec,
+    parse_levels,
+    swap_ext,
+)
+from .memguard import GUARD, RecycleMiddleware
+from .metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    record,
+    render_prometheus,
+    span,
+)
+from .profiling import (
+    PROFILE_HEADER,
+    PROFILE_STORE,
+    SLOW_RENDER_MS,
+    profile_render,
+    request_mode,
+)
+from .rcnorm import (
+    NormalizedRc,
+    RcValidationError,
+    normalize_rc,
+    validate_rc,
+)
+from .scheduler import WorkTag, client_key, run_tagged
+from .schemas import (
+    BatchRenderRequest,
+    GenerateRequest,
+    LibrarySaveRequest,
+    LibrarySearchRequest,
+    ThemePayload,
+    ThemeSetRequest,
+)
+from .theming import (
+    Theme,
+    load_base_style_text,
+    make_theme_set,
+    parse_style_text,
+    register_fonts,
+)
+from .utils import (
+    ORJSONResponse,
+    ORJSONRoute,
+    ZipBuilder,
+    b64_png,
+    dumps,
+    json_pretty,
+    loads,
+    norm_hex,
+    validate_hex_list,
+)
+
+# Ensure non-interactive backend for servers
+mpl.use("agg", force=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Register fonts and warm the renderer before the worker starts accepting requests.
+
+    Set THEMELAB_WARMUP=0 to skip the warm-up renders (fonts are still registered).
+    """
+    from .batch import shutdown_pool
+    from .rcvalidate import RC_VALIDATOR
+    from .warmup import warm_up
 
-from cycler import cycler
+    RC_VALIDATOR.load()  # verdicts persisted by earlier workers and json2mplstyle.py
+    render = os.getenv("THEMELAB_WARMUP", "1") != "0"
+    app.state.warmup = warm_up(render=render).to_dict() if render else None
+    if not render:
+        register_fonts()
+    yield
+    shutdown_pool()
+    RC_VALIDATOR.save()
 
-from .figures import render_all
-from .theming import Theme, make_theme_set, register_fonts
-from .utils import ZipBuilder, b64_png, json_pretty, norm_hex, validate_hex_list
 
-app = FastAPI(title="Matplotlib Theme Lab", version="1.0.1")
+app = FastAPI(title="Matplotlib Theme Lab", version="1.0.1", lifespan=lifespan)
 
 # CORS for local dev
 app.add_middleware(
@@ -28,65 +119,72 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Recycle this worker after the response once a memory limit is hit (app.memguard)
+app.add_middleware(RecycleMiddleware)
+# Outermost: request histograms and Server-Timing cover everything below
+app.add_middleware(MetricsMiddleware)
 
-# Ensure non-interactive backend for servers
-mpl.use("agg", force=True)
-register_fonts()
 
+@app.get("/api/health")
+async def api_health():
+    """Liveness/readiness: reachable only after the lifespan warm-up has finished."""
+    return ORJSONResponse({"status": "ok", "warmup": app.state.warmup, "memory": GUARD.stats()})
 
-def _rc_serialize(rc: dict) -> dict:
-    """Make rcParams JSON-serializable (notably axes.prop_cycle/Cycler)."""
-    out: dict = {}
-    for k, v in rc.items():
-        if k == "axes.prop_cycle":
-            try:
-                by = v.by_key() if hasattr(v, "by_key") else None
-            except Exception:
-                by = None
-            if by and len(by) == 1 and "color" in by:
-                out[k] = {"key": "color", "values": list(by["color"])}
-            elif by:
-                # General case: multiple keys in the cycler
-                n = len(next(iter(by.values())))
-                out[k] = {
-                    "multi": [{kk: vv[i] for kk, vv in by.items()} for i in range(n)]
-                }
-            else:
-                out[k] = v  # hope it's already JSON-able
-        else:
-            out[k] = v
-    return out
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition: request/stage/figure histograms, render and error counters."""
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
-def _rc_deserialize(rc: dict) -> dict:
-    """Rebuild Matplotlib-friendly rc dict from JSON (axes.prop_cycle special-case)."""
-    out = dict(rc)
-    pc = out.get("axes.prop_cycle")
-    if isinstance(pc, dict):
-        if "key" in pc and "values" in pc:
-            out["axes.prop_cycle"] = cycler(pc["key"], pc["values"])
-        elif "multi" in pc:
-            cy = None
-            for entry in pc["multi"]:
-                c = None
-                for kk, vv in entry.items():
-                    c = cycler(kk, [vv]) if c is None else c + cycler(kk, [vv])
-                cy = c if cy is None else cy + c
-            out["axes.prop_cycle"] = cy
-    return out
 
+def _theme_diff(rc_global: dict) -> dict:
+    """JSON-ready diff of rc_global versus Matplotlib defaults."""
+    base = mpl.rcParamsDefault
+    return {k: v for k, v in rc_global.items() if k in base and base[k] != v}
+
+
+def _parse_theme_json(theme_json: str) -> dict:
+    try:
+        with span("parse"):
+            data = loads(theme_json)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="theme_json must be an object")
+    return data
+
+
+def _normalized_theme_rc(data: dict) -> NormalizedRc:
+    rc_global_in = data.get("rc_global")
+    if not isinstance(rc_global_in, dict):
+        raise HTTPException(status_code=400, detail="rc_global must be a dict")
+    try:
+        with span("rc"):
+            return normalize_rc(rc_global_in)
+    except (RcValidationError, ValueError, TypeError) as e:
+        # Fail fast: never spend render CPU on a theme Matplotlib would reject
+        raise HTTPException(status_code=400, detail=f"Invalid rc_global: {e}")
+
+
+def _theme_rc(data: dict) -> tuple[dict, int]:
+    """Pull (rc_global, seed) out of a serialized theme, rebuilding Matplotlib objects."""
+    return _normalized_theme_rc(data).rc, int(data.get("seed", 42))
+
+
+def _generate(
+    fg: str,
+    bg: str,
+    accent: str,
+    dpi: int,
+    seed: int,
+    palette: Optional[List[str]],
+    style_bytes: Optional[bytes],
+    search: int = 0,
+    search_time_ms: Optional[float] = None,
+) -> List[dict]:
+    """Serialized theme set; with `search` > 0, the top-scoring of that many palette variants."""
+    from .analysis import analyze_themes
 
-@app.post("/api/themes/generate")
-async def api_generate_themes(
-    fg: str = Form("#111111"),
-    bg: str = Form("#FAFAF7"),  # off-white default
-    accent: str = Form("#2E7FE8"),
-    dpi: int = Form(200),
-    seed: int = Form(42),
-    palette: Optional[str] = Form(None),  # JSON array of HEX strings
-    style: Optional[UploadFile] = File(None),
-):
-    """Generate 6 themes (3 light, 3 dark). Returns metadata only (no images yet)."""
     try:
         fg = norm_hex(fg)
         bg = norm_hex(bg)
@@ -98,120 +196,289 @@ async def api_generate_themes(
             status_code=400, detail="Invalid HEX value for fg/bg/accent."
         )
 
-    base_palette: Optional[List[str]] = None
-    if palette:
-        try:
-            import json
+    base_palette = validate_hex_list(palette) if palette is not None else None
 
-            base_palette = validate_hex_list(json.loads(palette))
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid palette JSON: {e}")
+    found: List[Optional[dict]] = []
+    if search:
+        from .search import MAX_CANDIDATES, SEARCH_TIME_LIMIT_MS, search_theme_set
 
-    style_bytes: Optional[bytes] = None
-    if style is not None:
-        if not style.filename.endswith(".mplstyle"):
+        if base_palette is not None:
             raise HTTPException(
-                status_code=400, detail="Upload must be a .mplstyle file."
+                status_code=400, detail="search explores generated palettes; drop 'palette'."
             )
-        style_bytes = await style.read()
-
-    themes = make_theme_set(
-        fg=fg,
-        bg=bg,
-        accent=accent,
-        base_palette=base_palette,
-        dpi=dpi,
-        user_style_bytes=style_bytes,
-        seed=seed,
-    )
+        if not 1 <= search <= MAX_CANDIDATES:
+            raise HTTPException(
+                status_code=400, detail=f"search must be between 1 and {MAX_CANDIDATES}."
+            )
+        themes, ranked, stats = search_theme_set(
+            fg, bg, accent, dpi, style_bytes, seed, candidates=search,
+            time_budget_ms=min(search_time_ms or SEARCH_TIME_LIMIT_MS, SEARCH_TIME_LIMIT_MS),
+        )
+        found = [
+            {"score": round(r.score, 4), "params": r.params, "stats": stats[t.mode]}
+            for t, r in zip(themes, ranked)
+        ]
+    else:
+        themes = make_theme_set(
+            fg=fg,
+            bg=bg,
+            accent=accent,
+            base_palette=base_palette,
+            dpi=dpi,
+            user_style_bytes=style_bytes,
+            seed=seed,
+        )
+        found = [None] * len(themes)
+    reports = analyze_themes([{"rc_global": t.rc_global, "palette": t.palette} for t in themes])
+    return [
+        {
+            "slug": t.slug,
+            "name": t.name,
+            "mode": t.mode,
+            "fg": t.fg,
+            "bg": t.bg,
+            "accent": t.accent,
+            "palette": t.palette,
+            "rc_global": t.rc_global,
+            "seed": t.seed,
+            "colormaps": t.colormaps,
+            "analysis": report,
+            **({"search": hit} if hit else {}),
+        }
+        for t, report, hit in zip(themes, reports, found)
+    ]
 
-    return JSONResponse(
-        [
+
+async def _read_style_upload(style: Optional[UploadFile]) -> Optional[bytes]:
+    if style is None:
+        return None
+    if not style.filename.endswith(".mplstyle"):
+        raise HTTPException(status_code=400, detail="Upload must be a .mplstyle file.")
+    return await style.read()
+
+
+def _style_rc(style_bytes: Optional[bytes]) -> Optional[dict]:
+    """Parsed, validated rc of an uploaded .mplstyle (cached by content hash)."""
+    if style_bytes is None:
+        return None
+    _, style_text = load_base_style_text(style_bytes)
+    return parse_style_text(style_text)
+
+
+def _contact_sheet(thumbs: Dict[str, bytes], rc: dict, codec: str) -> dict:
+    """JSON-ready contact sheet: one encoded image plus its tile-offset map."""
+    from .contact_sheet import build_contact_sheet
+
+    enc = get_codec(codec)
+    with span("contact_sheet"):
+        image, tile_map = build_contact_sheet(thumbs, rc, enc)
+    return {"media_type": enc.media_type, "b64png": b64_png(image), **tile_map}
+
+
+def _work_tag(request: Request, cls: str, focus: Optional[str] = None) -> WorkTag:
+    return WorkTag(client_key(request.headers, request.client), cls, focus)
+
+
+def _render(
+    data: dict,
+    base_rc: Optional[dict] = None,
+    codec: str = PREVIEW_CODEC,
+    levels: str = ",".join(VIEW_LEVELS),
+    contact_sheet: bool = False,
+    profile: Optional[str] = None,
+    inline: bool = True,
+) -> dict:
+    from .contact_sheet import SHEET_LEVEL
+    from .figures import render_levels, store_names
+
+    if not inline and get_render_store() is None:
+        raise HTTPException(status_code=400, detail="inline=false needs the render store (THEMELAB_STORE_DIR).")
+    enc = get_codec(codec)
+    wanted = parse_levels(levels.split(","))
+    norm = _normalized_theme_rc(data)
+    rc_global, seed = norm.rc, int(data.get("seed", 42))
+    theme_diff = _theme_diff(rc_global)
+    render_at = wanted + (SHEET_LEVEL,) if contact_sheet else wanted
+    with profile_render(norm.digest, seed, profile) as prof:
+        rendered = render_levels(
+            rc_global, seed, tuple(dict.fromkeys(render_at)), base_rc=base_rc, codec=codec,
+            refresh=profile is not None,  # profile the render, not a cache lookup
+        )
+    if not inline:
+        # URLs into the shared render store instead of base64 (GET /api/renders/{name})
+        names = store_names({fn: {lv: by_level[lv] for lv in wanted} for fn, by_level in rendered.items()},
+                            rc_global, seed, base_rc, codec)
+        images = [
             {
-                "slug": t.slug,
-                "name": t.name,
-                "mode": t.mode,
-                "fg": t.fg,
-                "bg": t.bg,
-                "accent": t.accent,
-                "palette": t.palette,
-                "rc_global": _rc_serialize(t.rc_global),
-                "seed": t.seed,
+                "filename": fn,
+                "media_type": enc.media_type,
+                "urls": {lv: f"/api/renders/{name}" for lv, name in names[fn].items()},
             }
-            for t in themes
+            for fn in sorted(names)
         ]
-    )
+    else:
+        # One base64 image per pyramid level; the format is given by media_type
+        with span("b64"):
+            images = [
+                {
+                    "filename": fn,
+                    "media_type": enc.media_type,
+                    "levels": {lv: b64_png(by_level[lv]) for lv in wanted},
+                }
+                for fn, by_level in sorted(rendered.items())
+            ]
+    out = {"images": images, "rc_diff_theme": theme_diff}
+    if prof.profile is not None:
+        out["profile"] = prof.profile.to_dict()
+    elif profile is not None:
+        out["profile"] = None
+        out["profile_reason"] = prof.reason
+    if contact_sheet:
+        thumbs = {fn: by_level[SHEET_LEVEL] for fn, by_level in rendered.items()}
+        out["contact_sheet"] = _contact_sheet(
+            thumbs, (base_rc or {}) | rc_global, codec
+        )
+    return out
+
+
+@app.post("/api/themes/generate")
+async def api_generate_themes(
+    fg: str = Form("#111111"),
+    bg: str = Form("#FAFAF7"),  # off-white default
+    accent: str = Form("#2E7FE8"),
+    dpi: int = Form(200),
+    seed: int = Form(42),
+    palette: Optional[str] = Form(None),  # JSON array of HEX strings
+    style: Optional[UploadFile] = File(None),
+    search: int = Form(0),  # >0: score this many palette variants, keep the best 3 per mode
+    search_time_ms: Optional[float] = Form(None),  # stop searching early after this long
+):
+    """Generate 6 themes (3 light, 3 dark). Returns metadata only (no images yet)."""
+    base_palette: Optional[List[str]] = None
+    if palette:
+        try:
+            base_palette = validate_hex_list(loads(palette))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid palette JSON: {e}")
+
+    style_bytes = await _read_style_upload(style)
+    # Off the event loop: a search can take up to SEARCH_TIME_LIMIT_MS
+    return ORJSONResponse(await run_in_threadpool(
+        _generate, fg, bg, accent, dpi, seed, base_palette, style_bytes, search, search_time_ms
+    ))
 
 
 @app.post("/api/render")
 async def api_render(
+    request: Request,
     theme_json: str = Form(...),  # serialized Theme minus base_style_text
+    style: Optional[UploadFile] = File(None),  # optional base .mplstyle layer
+    codec: str = Form(PREVIEW_CODEC),  # see app.encoding.CODECS
+    levels: str = Form(",".join(VIEW_LEVELS)),  # comma-separated app.encoding.PYRAMID levels
+    contact_sheet: bool = Form(False),  # also return all thumbnails composited into one image
+    inline: bool = Form(True),  # false: /api/renders URLs instead of base64 (needs the render store)
+    focus: Optional[str] = Form(None),  # filename of the figure on screen: rendered first, ahead of queued work
 ):
     """Render 10 demo plots for a given theme rc.
 
     Accepts a JSON string containing: fg, bg, palette, rc_global, seed.
-    Returns base64-encoded PNGs + rc diffs.
+    An uploaded .mplstyle is layered underneath rc_global.
+    Returns base64-encoded images per pyramid level (256/1024 px fast PNG by
+    default; add 'full' for the full-size render) + rc diffs, and optionally a
+    contact sheet with its tile map. Send X-Themelab-Profile (admin) to profile the render.
+    Renders queue fairly per client (X-Themelab-Client header, else the peer IP).
     """
-    import json
+    profile = _profile_mode(request)
+    data = _parse_theme_json(theme_json)
+    base_rc = _style_rc(await _read_style_upload(style))
+    return ORJSONResponse(await run_tagged(
+        _work_tag(request, "interactive", focus),
+        _render, data, base_rc, codec, levels, contact_sheet, profile, inline,
+    ))
 
-    try:
-        data = json.loads(theme_json)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
-
-    rc_global_in = data.get("rc_global")
-    seed = int(data.get("seed", 42))
-    if not isinstance(rc_global_in, dict):
-        raise HTTPException(status_code=400, detail="rc_global must be a dict")
-
-    rc_global = _rc_deserialize(rc_global_in)
-
-    # Compute diffs versus Matplotlib defaults
-    base = mpl.rcParamsDefault
-    theme_diff = {k: v for k, v in rc_global.items() if k in base and base[k] != v}
-
-    theme_diff = _rc_serialize(theme_diff)
 
-    png_map = render_all(theme_rc=rc_global, seed=seed)
-
-    result = {
-        "images": [
-            {"filename": fn, "b64png": b64_png(buf)}
-            for fn, buf in sorted(png_map.items())
-        ],
-        "rc_diff_theme": theme_diff,
-    }
-    return JSONResponse(result)
+@app.get("/api/renders/{name}")
+async def api_render_file(name: str):
+    """One encoded figure from the shared render store, streamed from disk (immutable, cache forever)."""
+    store = get_render_store()
+    if store is None or not STORE_NAME_RE.match(name):
+        raise HTTPException(status_code=404, detail="No such render.")
+    st = store.stat(name)
+    if st is None:
+        raise HTTPException(status_code=404, detail="Render evicted; request it again.")
+    ext = name.rsplit(".", 1)[1]
+    media_type = next((c.media_type for c in CODECS.values() if c.ext == ext), "application/octet-stream")
+    return FileResponse(
+        store.path(name), media_type=media_type, stat_result=st,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
 
 
 @app.post("/api/download")
 async def api_download(
+    request: Request,
     theme_json: str = Form(...),  # same as /api/render
+    style: Optional[UploadFile] = File(None),  # optional base .mplstyle layer
+    codec: str = Form(DOWNLOAD_CODEC),  # optimized PNG by default
 ):
-    """Build a zip: 10 PNGs + index.html gallery + theme.json + per-figure repro scripts + theme .mplstyle."""
-    import json
+    """Build a zip: 10 PNGs + contact sheet + index.html gallery + theme.json + per-figure repro scripts + theme .mplstyle."""
+    profile = _profile_mode(request)
+    data = _parse_theme_json(theme_json)
+    base_rc = _style_rc(await _read_style_upload(style))
+    return await run_tagged(_work_tag(request, "bulk"), _download, data, base_rc, codec, profile)
 
-    data = json.loads(theme_json)
 
-    rc_global_in = data["rc_global"]
-    rc_global = _rc_deserialize(rc_global_in)
+def _download(
+    data: dict,
+    base_rc: Optional[dict] = None,
+    codec: str = DOWNLOAD_CODEC,
+    profile: Optional[str] = None,
+) -> StreamingResponse:
+    from .contact_sheet import SHEET_LEVEL, build_contact_sheet
+    from .figures import render_levels
 
-    seed = int(data.get("seed", 42))
-    name = data.get("name", data.get("slug", "theme"))
-    slug = data.get("slug", name.lower().replace(" ", "-"))
+    enc = get_codec(codec)
+    norm = _normalized_theme_rc(data)
+    rc_global, seed = norm.rc, int(data.get("seed", 42))
+    if base_rc:
+        # Bundle the effective theme: style underneath, rc_global on top
+        rc_global = base_rc | rc_global
+    name = data.get("name") or data.get("slug") or "theme"
+    slug = data.get("slug") or name.lower().replace(" ", "-")
 
-    png_map = render_all(theme_rc=rc_global, seed=seed)
+    with profile_render(norm.digest, seed, profile) as prof:
+        rendered = render_levels(rc_global, seed, ("full", SHEET_LEVEL), codec=codec, refresh=profile is not None)
+    t_bundle = time.perf_counter()
+    png_map = {swap_ext(fn, enc): by_level["full"] for fn, by_level in rendered.items()}
 
     zb = ZipBuilder()
     # Write PNGs
     for fn, buf in sorted(png_map.items()):
         zb.write_bytes(f"figures/{fn}", buf)
 
+    # Contact sheet: every figure on one image, plus where each tile sits
+    sheet_bytes, tile_map = build_contact_sheet(
+        {swap_ext(fn, enc): by_level[SHEET_LEVEL] for fn, by_level in rendered.items()},
+        rc_global,
+        enc,
+    )
+    sheet_name = swap_ext("contact_sheet.png", enc)
+    zb.write_bytes(sheet_name, sheet_bytes)
+    zb.write_text("contact_sheet.json", json_pretty(tile_map))
+
     # theme.json (JSON-serializable rc)
     data_serial = dict(data)
-    data_serial["rc_global"] = _rc_serialize(rc_global)
+    data_serial["rc_global"] = rc_global
     zb.write_text("theme.json", json_pretty(data_serial))
 
+    # Theme colormaps as hex LUTs; the .mplstyle and repro scripts refer to them by name
+    from .theming import colormap_export
+
+    cmap_names = [rc_global.get("image.cmap"), *(data.get("colormaps") or {}).values()]
+    cmaps = colormap_export(list(dict.fromkeys(cmap_names)))
+    if cmaps:
+        zb.write_text("colormaps.json", json_pretty(cmaps))
+
     # theme .mplstyle
     lines = []
     # Serialize axes.prop_cycle as cycler('color', [...]) when possible
@@ -231,10 +498,16 @@ async def api_download(
             lines.append(f"{k}: {v}")
     zb.write_text(f"themes/{slug}.mplstyle", " ".join(lines) + " ")
 
-    # index.html gallery (minimal responsive grid)
+    # index.html gallery: the contact sheet (tiles link to full figures), then a lazy grid
+    sw, sh = tile_map["width"], tile_map["height"]
+    links = " ".join(
+        f'<a href="figures/{t["filename"]}" title="{t["filename"]}" style="left:{100 * t["x"] / sw:.3f}%;'
+        f'top:{100 * t["y"] / sh:.3f}%;width:{100 * t["w"] / sw:.3f}%;height:{100 * t["h"] / sh:.3f}%"></a>'
+        for t in tile_map["tiles"]
+    )
     thumbs = " ".join(
         [
-            f'<figure><img src="figures/{fn}" alt="{fn}"><figcaption>{fn}</figcaption></figure>'
+            f'<figure><img src="figures/{fn}" alt="{fn}" loading="lazy"><figcaption>{fn}</figcaption></figure>'
             for fn in sorted(png_map)
         ]
     )
@@ -250,20 +523,31 @@ body{{margin:0;padding:24px;font:14px/1.5 Inter,system-ui,sans-serif;background:
 figure{{margin:0;background:rgba(0,0,0,.03);padding:12px;border-radius:12px;}}
 figcaption{{margin-top:8px;opacity:.7}}
 img{{width:100%;height:auto;display:block;border-radius:8px}}
+.sheet{{position:relative;margin-bottom:24px}}
+.sheet a{{position:absolute;border-radius:6px}}
+.sheet a:hover{{outline:2px solid {rc_global.get('text.color','#111')}}}
 </style>
 <h1>Theme Gallery — {name}</h1>
+<div class="sheet"><img src="{sheet_name}" alt="Contact sheet">{links}</div>
 <div class="grid">{thumbs}</div>
 </html>
 """
     zb.write_text("index.html", html)
 
     # Repro scripts (one per figure)
+    cmap_setup = (
+        "import json, pathlib\n"
+        "# Register the theme colormaps shipped next to this script's folder\n"
+        "for _name, _colors in json.loads((pathlib.Path(__file__).parent.parent / 'colormaps.json').read_text()).items():\n"
+        "    mpl.colormaps.register(mpl.colors.ListedColormap(_colors, name=_name), force=True)\n"
+        if cmaps else ""
+    )
     for item in sorted(png_map):
         code = f"""
 # Repro for {item}
 import matplotlib as mpl, matplotlib.pyplot as plt, numpy as np
 mpl.use('agg', force=True)
-plt.rcParams.update({rc_global})
+{cmap_setup}plt.rcParams.update({rc_global})
 from datetime import datetime
 
 # NOTE: This script prints your effective rcParams and saves one PNG.
@@ -276,16 +560,502 @@ ax.plot([0,1,2],[0,1,0])
 ax.set_title('Style smoke test')
 fig.savefig('{item}', dpi={rc_global.get('savefig.dpi', 200)})
 """
-        zb.write_text(f"repro/repro_{item.replace('.png','.py')}", code)
+        zb.write_text(f"repro/repro_{item.rsplit('.', 1)[0]}.py", code)
+
+    bundle = zb.close()
+    record("bundle", time.perf_counter() - t_bundle)  # zip assembly, contact sheet included
+    headers = {"Content-Disposition": f'attachment; filename="{slug}_bundle.zip"'}
+    if prof.id is not None:
+        headers["X-Themelab-Profile-Id"] = prof.id
+    elif prof.reason is not None:
+        headers["X-Themelab-Profile-Reason"] = prof.reason
+    return StreamingResponse(io.BytesIO(bundle), media_type="application/zip", headers=headers)
+
+
+async def _theme_set(req: ThemeSetRequest) -> List[dict]:
+    """Serialized themes from a ThemeSetRequest (generating them, off the event loop, if asked to)."""
+    if (req.themes is None) == (req.generate is None):
+        raise HTTPException(
+            status_code=400, detail="Give exactly one of 'themes' or 'generate'."
+        )
+    if req.generate is not None:
+        g = req.generate
+        return await run_in_threadpool(
+            _generate, g.fg, g.bg, g.accent, g.dpi, g.seed, g.palette, None, g.search, g.search_time_ms
+        )
+    return [t.model_dump() for t in req.themes]
+
+
+MAX_IMAGE_UPLOAD_BYTES = 64 * 1024 * 1024
+
+
+@app.post("/api/palette/extract")
+async def api_palette_extract(
+    image: UploadFile = File(...),  # PNG/JPEG/WebP/... reference image
+    n_colors: int = Form(6),
+    bg: str = Form("#FAFAF7"),  # background the palette will sit on (for ranking)
+    fg: str = Form("#111111"),
+    seed: int = Form(0),
+):
+    """Extract ranked palettes from a reference image (Oklab mini-batch k-means).
+
+    Each entry in `palettes` can be passed as `palette` to /api/themes/generate.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    from .palette_extract import extract_palettes
+
+    if not 3 <= n_colors <= 10:
+        raise HTTPException(status_code=400, detail="n_colors must be between 3 and 10.")
+    bg, fg = norm_hex(bg), norm_hex(fg)
+    data = await image.read(MAX_IMAGE_UPLOAD_BYTES + 1)
+    if len(data) > MAX_IMAGE_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image upload is larger than 64 MB.")
+    try:
+        result = await run_in_threadpool(extract_palettes, data, n_colors, bg, fg, seed)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable image: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(result.to_dict())
+
+
+# JSON-body variants of the endpoints above (orjson in, orjson out)
+json_api = APIRouter(prefix="/api/json", route_class=ORJSONRoute)
 
-    data = zb.close()
-    return StreamingResponse(
-        io.BytesIO(data),
-        media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename="{slug}_bundle.zip"'},
+
+@json_api.post("/themes/generate")
+async def api_json_generate_themes(req: GenerateRequest):
+    """Same as /api/themes/generate, with a JSON body (no style upload)."""
+    return ORJSONResponse(await run_in_threadpool(
+        _generate, req.fg, req.bg, req.accent, req.dpi, req.seed, req.palette, None,
+        req.search, req.search_time_ms,
+    ))
+
+
+@json_api.post("/render")
+async def api_json_render(
+    request: Request,
+    theme: ThemePayload,
+    codec: str = PREVIEW_CODEC,
+    levels: str = ",".join(VIEW_LEVELS),
+    contact_sheet: bool = False,
+    inline: bool = True,
+    focus: Optional[str] = None,
+):
+    """Same as /api/render, with the theme as the JSON body (options as query params)."""
+    return ORJSONResponse(
+        await run_tagged(
+            _work_tag(request, "interactive", focus),
+            _render, theme.model_dump(), codec=codec, levels=levels, contact_sheet=contact_sheet,
+            profile=_profile_mode(request), inline=inline,
+        )
     )
 
 
+@json_api.post("/download")
+async def api_json_download(request: Request, theme: ThemePayload, codec: str = DOWNLOAD_CODEC):
+    """Same as /api/download, with the theme as the JSON body (codec as a query param)."""
+    return await run_tagged(
+        _work_tag(request, "bulk"),
+        _download, theme.model_dump(exclude_unset=True), codec=codec, profile=_profile_mode(request),
+    )
+
+
+@json_api.post("/render/batch")
+async def api_json_render_batch(
+    request: Request,
+    req: BatchRenderRequest,
+    codec: str = PREVIEW_CODEC,
+    levels: str = "thumb",
+    contact_sheet: bool = False,
+):
+    """Render every theme x figure cell in one job across the render worker pool.
+
+    Streams NDJSON: a {"type": "themes"} line first when `generate` was given,
+    then one {"type": "cell", "theme": i, "filename", "media_type", "levels"}
+    (or {"type": "error", ...}) line per finished cell, with contact_sheet a
+    {"type": "sheet", "theme": i, ...} line as each theme completes, then
+    {"type": "done"}.
+    """
+    from .batch import render_batch
+    from .contact_sheet import SHEET_LEVEL
+    from .figures import build_figure_specs
+
+    enc = get_codec(codec)
+    wanted = parse_levels(levels.split(","))
+    themes = await _theme_set(req)
+    # Validate everything before the stream starts, so bad input is still a plain 400
+    theme_rcs = [_theme_rc(t) for t in themes]
+    if req.figures is not None:
+        unknown = set(req.figures) - {s.filename for s in build_figure_specs()}
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown figure(s): {sorted(unknown)}"
+            )
+
+    n_figures = len(set(req.figures)) if req.figures is not None else len(build_figure_specs())
+    render_at = tuple(dict.fromkeys(wanted + (SHEET_LEVEL,))) if contact_sheet else wanted
+    tag = _work_tag(request, "bulk")
+
+    async def lines():
+        t0 = time.perf_counter()
+        if req.generate is not None:
+            yield dumps({"type": "themes", "themes": themes}) + b"\n"
+        n_cells = 0
+        finished: Dict[int, int] = {}
+        sheet_tiles: Dict[int, Dict[str, bytes]] = {}
+        async for cell in render_batch(theme_rcs, render_at, codec, req.figures, tag=tag):
+            t = cell["theme"]
+            if cell["type"] == "cell":
+                n_cells += 1
+                by_level = cell["levels"]
+                if contact_sheet:
+                    sheet_tiles.setdefault(t, {})[cell["filename"]] = by_level[SHEET_LEVEL]
+                cell["media_type"] = enc.media_type
+                cell["levels"] = {lv: b64_png(by_level[lv]) for lv in wanted}
+            yield dumps(cell) + b"\n"
+            finished[t] = finished.get(t, 0) + 1
+            if contact_sheet and finished[t] == n_figures and sheet_tiles.get(t):
+                sheet = _contact_sheet(sheet_tiles.pop(t), theme_rcs[t][0], codec)
+                yield dumps({"type": "sheet", "theme": t, **sheet}) + b"\n"
+        yield dumps(
+            {
+                "type": "done",
+                "cells": n_cells,
+                "elapsed_s": round(time.perf_counter() - t0, 3),
+            }
+        ) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@json_api.post("/analyze")
+async def api_json_analyze(req: ThemeSetRequest):
+    """Colour-vision and WCAG contrast report per theme (see app/analysis.py).
+
+    All themes are analyzed in one vectorized call; with `generate`, the
+    generated themes are returned alongside.
+    """
+    from .analysis import analyze_themes
+
+    themes = await _theme_set(req)
+    if req.generate is not None:
+        # _generate already attached each theme's report
+        return ORJSONResponse({"themes": themes, "reports": [t["analysis"] for t in themes]})
+    try:
+        reports = analyze_themes([{**t, "rc_global": _theme_rc(t)[0]} for t in themes])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({"reports": reports})
+
+
+def _analyze_figure(theme: dict, filename: str, lv: str, codec: str) -> dict:
+    """Render one figure and simulate each colour-vision deficiency on it."""
+    from PIL import Image
+
+    from .analysis import analyze_image
+    from .contact_sheet import decode_rgba
+    from .encoding import encode_image
+    from .figures import render_levels
+
+    enc = get_codec(codec)
+    rc_global, seed = _theme_rc(theme)
+    data = render_levels(rc_global, seed, (lv,), only=[filename], codec=codec)[filename][lv]
+    sims, shift = analyze_image(decode_rgba(data))
+    return {
+        "filename": filename,
+        "level": lv,
+        "media_type": enc.media_type,
+        "simulations": {
+            v: b64_png(encode_image(Image.fromarray(px, "RGBA"), enc, 72))
+            for v, px in sims.items()
+        },
+        "mean_shift_delta_e": {v: round(x, 4) for v, x in shift.items()},
+    }
+
+
+@json_api.post("/analyze/figure")
+async def api_json_analyze_figure(
+    request: Request,
+    theme: ThemePayload,
+    filename: str,
+    level: str = "preview",
+    codec: str = PREVIEW_CODEC,
+):
+    """Protan/deutan/tritan simulations of one rendered figure, plus the mean Oklab shift each causes."""
+    from .figures import build_figure_specs
+
+    (lv,) = parse_levels([level])
+    if filename not in {s.filename for s in build_figure_specs()}:
+        raise HTTPException(status_code=400, detail=f"Unknown figure {filename!r}")
+    return ORJSONResponse(
+        await run_tagged(
+            _work_tag(request, "interactive"),
+            _analyze_figure, theme.model_dump(), filename, lv, codec,
+        )
+    )
+
+
+# Theme library (SQLite at THEMELAB_LIBRARY, palette nearest-neighbour index)
+
+
+@json_api.post("/library")
+async def api_library_save(req: LibrarySaveRequest):
+    """Store a theme under its canonical rc digest (idempotent) and report similar stored themes."""
+    from .library import get_library
+
+    theme = req.theme.model_dump()
+    digest = _normalized_theme_rc(theme).digest
+    lib = get_library()
+    try:
+        summary, created = await run_in_threadpool(lib.save, theme, digest, req.tags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    similar = await run_in_threadpool(lib.nearest, summary["palette"], 6, theme.get("mode"))
+    return ORJSONResponse({
+        "theme": summary,
+        "created": created,
+        "similar": [m for m in similar if m["hash"] != digest][:5],
+    })
+
+
+@json_api.get("/library")
+async def api_library_list(
+    mode: Optional[str] = None,
+    accent: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """Stored theme summaries, newest first, filtered by mode / accent / tag."""
+    from .library import get_library
+
+    if not 1 <= limit <= 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-500 and offset >= 0.")
+    if accent is not None:
+        accent = norm_hex(accent)
+    items, total = await run_in_threadpool(get_library().list, mode, accent, tag, limit, offset)
+    return ORJSONResponse({"items": items, "total": total, "limit": limit, "offset": offset})
+
+
+@json_api.get("/library/{digest}")
+async def api_library_get(digest: str):
+    """The full stored theme (ready for /api/json/render), plus its library tags."""
+    from .library import get_library
+
+    theme = await run_in_threadpool(get_library().get, digest)
+    if theme is None:
+        raise HTTPException(status_code=404, detail="No such theme in the library.")
+    return ORJSONResponse(theme)
+
+
+@json_api.delete("/library/{digest}")
+async def api_library_delete(digest: str):
+    from .library import get_library
+
+    if not await run_in_threadpool(get_library().delete, digest):
+        raise HTTPException(status_code=404, detail="No such theme in the library.")
+    return ORJSONResponse({"deleted": digest})
+
+
+@json_api.post("/library/search")
+async def api_library_search(req: LibrarySearchRequest):
+    """Nearest stored palettes (Oklab set distance), by palette or by a stored theme's hash."""
+    from .library import get_library
+
+    lib = get_library()
+    if (req.palette is None) == (req.hash is None):
+        raise HTTPException(status_code=400, detail="Give exactly one of 'palette' or 'hash'.")
+    if not 1 <= req.k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100.")
+    if req.hash is not None:
+        from .analysis import theme_colors
+
+        stored = await run_in_threadpool(lib.get, req.hash)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="No such theme in the library.")
+        palette = theme_colors(stored)[0]
+    else:
+        palette = validate_hex_list(req.palette)
+    t0 = time.perf_counter()
+    try:
+        matches = await run_in_threadpool(lib.nearest, palette, req.k, req.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({
+        "matches": matches,
+        "searched": len(lib),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 2),
+    })
+
+
+app.include_router(json_api)
+
+
+# -------------------------
+# Admin: captured render profiles
+# -------------------------
+
+ADMIN_TOKEN = os.getenv("THEMELAB_ADMIN_TOKEN")
+_LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+def _require_admin(request: Request) -> None:
+    """Bearer THEMELAB_ADMIN_TOKEN when set; otherwise loopback clients only."""
+    if ADMIN_TOKEN:
+        sent = request.headers.get("authorization", "")
+        if not hmac.compare_digest(sent.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Admin token required.")
+    elif request.client is None or request.client.host not in _LOOPBACK:
+        raise HTTPException(status_code=403, detail="Admin endpoints are loopback-only without THEMELAB_ADMIN_TOKEN.")
+
+
+def _profile_mode(request: Request) -> Optional[str]:
+    """Profiling mode requested via X-Themelab-Profile; admin-only, since cProfile doubles render time."""
+    try:
+        mode = request_mode(request.headers.get(PROFILE_HEADER))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode is not None:
+        _require_admin(request)
+    return mode
+
+
+admin_api = APIRouter(prefix="/api/admin", route_class=ORJSONRoute)
+
+
+@admin_api.get("/profiles")
+async def api_admin_profiles(request: Request, hash: Optional[str] = None):
+    """Captured profiles, newest first (optionally for one theme hash)."""
+    _require_admin(request)
+    return ORJSONResponse({
+        "profiles": [p.to_dict() for p in PROFILE_STORE.list(hash)],
+        "bytes": PROFILE_STORE.size_bytes,
+        "slow_render_ms": SLOW_RENDER_MS,
+    })
+
+
+@admin_api.get("/profiles/{profile_id}")
+async def api_admin_profile(request: Request, profile_id: str, format: str = "raw"):
+    """Download one profile: raw .pstats / .folded file, or format=summary for a text top list."""
+    _require_admin(request)
+    profile = PROFILE_STORE.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No such profile.")
+    if format == "summary":
+        return PlainTextResponse(await run_in_threadpool(profile.summary))
+    if format != "raw":
+        raise HTTPException(status_code=400, detail="format must be raw or summary.")
+    return Response(
+        profile.data,
+        media_type=profile.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profile.filename}"'},
+    )
+
+
+@admin_api.delete("/profiles/{profile_id}")
+async def api_admin_profile_delete(request: Request, profile_id: str):
+    _require_admin(request)
+    if not PROFILE_STORE.delete(profile_id):
+        raise HTTPException(status_code=404, detail="No such profile.")
+    return ORJSONResponse({"deleted": profile_id})
+
+
+app.include_router(admin_api)
+
+
+async def _ws_send(websocket: WebSocket, payload: dict) -> None:
+    await websocket.send_text(dumps(payload).decode("utf-8"))
+
+
+@app.websocket("/api/session")
+async def ws_session(websocket: WebSocket):
+    """Live-edit session: hold the theme server-side and push only changed figures.
+
+    Client messages (JSON text frames):
+      {"type": "init", "theme": {"rc_global": {...}, "seed": 42}, "levels": ["thumb", "preview"]}
+      {"type": "patch", "ops": [{"op": "replace", "path": "/lines.linewidth", "value": 2}]}
+    Server replies per changed figure and pyramid level with a JSON header
+      {"type": "figure", "rev": n, "filename": "01_line.png", "level": "thumb", "media_type": "image/png"}
+    followed by the image as a binary frame, then
+      {"type": "rendered", "rev": n, "changed": [...], "rc_diff_theme": {...}}.
+    Errors are reported as {"type": "error", "detail": "..."} and keep the session open.
+    """
+    from .session import LiveSession, PatchError
+
+    await websocket.accept()
+    ws_tag = WorkTag(client_key(websocket.headers, websocket.client), "interactive")
+    session: Optional[LiveSession] = None
+    try:
+        while True:
+            try:
+                msg = loads(await websocket.receive_text())
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await _ws_send(
+                    websocket, {"type": "error", "detail": f"Invalid JSON: {e}"}
+                )
+                continue
+
+            kind = msg.get("type") if isinstance(msg, dict) else None
+            previous = (session.rc_global, session.rev) if session is not None else None
+            try:
+                if kind == "init":
+                    theme = msg.get("theme") or {}
+                    rc_global_in = theme.get("rc_global")
+                    if not isinstance(rc_global_in, dict):
+                        raise PatchError("rc_global must be a dict")
+                    candidate = LiveSession(
+                        normalize_rc(rc_global_in).rc,
+                        int(theme.get("seed", 42)),
+                        levels=parse_levels(msg.get("levels") or VIEW_LEVELS),
+                    )
+                elif kind == "patch":
+                    if session is None:
+                        raise PatchError("Send an init message before patches")
+                    candidate = session
+                    candidate.apply_patch(msg.get("ops"), decode=validate_rc)
+                else:
+                    raise PatchError(f"Unknown message type {kind!r}")
+                rendered = await run_tagged(ws_tag, candidate.render_changed)
+            except (PatchError, HTTPException, KeyError, ValueError, TypeError) as e:
+                # Keep the last good theme so the client can simply retry
+                if session is not None:
+                    session.rc_global, session.rev = previous
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                await _ws_send(websocket, {"type": "error", "detail": detail})
+                continue
+            session = candidate
+
+            media_type = get_codec(session.codec).media_type
+            for fn, by_level in rendered:
+                for level, buf in by_level.items():
+                    await _ws_send(
+                        websocket,
+                        {
+                            "type": "figure",
+                            "rev": session.rev,
+                            "filename": fn,
+                            "level": level,
+                            "media_type": media_type,
+                        },
+                    )
+                    await websocket.send_bytes(buf)
+            await _ws_send(
+                websocket,
+                {
+                    "type": "rendered",
+                    "rev": session.rev,
+                    "changed": [fn for fn, _ in rendered],
+                    "rc_diff_theme": _theme_diff(session.rc_global),
+                },
+            )
+    except WebSocketDisconnect:
+        return
+
+
 if __name__ == "__main__":
     import uvicorn
 
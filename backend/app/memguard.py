@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import matplotlib as mpl
+
+from .metrics import GaugeCallback, register
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Limits (0 disables each one)
+# -------------------------
+
+MAX_RSS_MB = float(os.getenv('THEMELAB_MAX_RSS_MB', '0'))  # recycle once RSS after a render exceeds this
+MAX_RENDERS = int(os.getenv('THEMELAB_MAX_RENDERS', '0'))  # recycle after this many figure renders
+MAX_LIVE_FIGURES = int(os.getenv('THEMELAB_MAX_LIVE_FIGURES', '0'))  # more survivors than this = leak
+TRACEMALLOC_EVERY = int(os.getenv('THEMELAB_TRACEMALLOC_EVERY', '0'))  # trace the heap of every Nth render
+
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# -------------------------
+# Accounting
+# -------------------------
+
+
+class MemoryGuard:
+    """Live-figure, canvas-buffer and RSS accounting for the render path, plus recycle limits.
+
+    Figures are tracked in a WeakSet, so a figure still listed after its render
+    finished is one something else kept alive. Every Nth render (TRACEMALLOC_EVERY)
+    runs under tracemalloc to record the Python-heap peak; tracing is process-wide,
+    so concurrent renders share that window.
+    """
+
+    def __init__(self) -> None:
+        self._live: 'weakref.WeakSet[mpl.figure.Figure]' = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.rss = 0
+        self.max_render_rss_delta = 0
+        self.last_heap_peak: Optional[int] = None
+        self.max_heap_peak = 0
+        self.recycle_reason: Optional[str] = None
+
+    @contextmanager
+    def render(self) -> Iterator[Callable[[mpl.figure.Figure], mpl.figure.Figure]]:
+        """Account one figure render; call the yielded function on each figure it creates."""
+        with self._lock:
+            self.renders += 1
+            n = self.renders
+        tracing = bool(TRACEMALLOC_EVERY) and n % TRACEMALLOC_EVERY == 0 and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        rss_before = current_rss()
+
+        def track(fig: mpl.figure.Figure) -> mpl.figure.Figure:
+            self._live.add(fig)
+            return fig
+
+        try:
+            yield track
+        finally:
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.last_heap_peak = peak
+                self.max_heap_peak = max(self.max_heap_peak, peak)
+            self.rss = current_rss()
+            self.max_render_rss_delta = max(self.max_render_rss_delta, self.rss - rss_before)
+            self._check_limits()
+
+    def live_figures(self) -> int:
+        return len(self._live)
+
+    def canvas_bytes(self) -> int:
+        """Agg buffer bytes held by tracked figures that are still alive."""
+        total = 0
+        for fig in list(self._live):
+            renderer = getattr(fig.canvas, 'renderer', None)
+            if renderer is not None:
+                total += int(renderer.width) * int(renderer.height) * 4
+        return total
+
+    def _check_limits(self) -> None:
+        if self.recycle_reason is not None:
+            return
+        reason = None
+        if MAX_RSS_MB and self.rss > MAX_RSS_MB * 2**20:
+            reason = f'rss {self.rss / 2**20:.0f} MB > THEMELAB_MAX_RSS_MB={MAX_RSS_MB:.0f}'
+        elif MAX_RENDERS and self.renders >= MAX_RENDERS:
+            reason = f'{self.renders} renders >= THEMELAB_MAX_RENDERS={MAX_RENDERS}'
+        elif MAX_LIVE_FIGURES and self.live_figures() > MAX_LIVE_FIGURES:
+            reason = f'{self.live_figures()} live figures > THEMELAB_MAX_LIVE_FIGURES={MAX_LIVE_FIGURES}'
+        if reason is not None:
+            self.recycle_reason = reason
+            logger.warning('worker %d will recycle after the current request: %s', os.getpid(), reason)
+
+    def stats(self) -> Dict[str, object]:
+        from matplotlib import _pylab_helpers
+
+        return {
+            'pid': os.getpid(),
+            'renders': self.renders,
+            'rss_mb': round(current_rss() / 2**20, 1),
+            'max_render_rss_delta_mb': round(self.max_render_rss_delta / 2**20, 2),
+            'live_figures': self.live_figures(),
+            'pyplot_figures': len(_pylab_helpers.Gcf.figs),  # figures something left in pyplot's registry
+            'canvas_mb': round(self.canvas_bytes() / 2**20, 2),
+            'heap_peak_mb': None if self.last_heap_peak is None else round(self.last_heap_peak / 2**20, 2),
+            'max_heap_peak_mb': round(self.max_heap_peak / 2**20, 2),
+            'recycle': self.recycle_reason,
+            'limits': {
+                'max_rss_mb': MAX_RSS_MB, 'max_renders': MAX_RENDERS,
+                'max_live_figures': MAX_LIVE_FIGURES, 'tracemalloc_every': TRACEMALLOC_EVERY,
+            },
+        }
+
+
+GUARD = MemoryGuard()
+
+register(GaugeCallback('themelab_rss_bytes', 'Resident set size of this worker.', current_rss))
+register(GaugeCallback('themelab_live_figures', 'Tracked figures still alive.', GUARD.live_figures))
+register(GaugeCallback('themelab_canvas_bytes', 'Agg buffer bytes held by live figures.', GUARD.canvas_bytes))
+register(GaugeCallback('themelab_recycle_pending', '1 once a memory limit asked this worker to recycle.',
+                       lambda: GUARD.recycle_reason is not None))
+
+# -------------------------
+# Graceful recycling
+# -------------------------
+
+
+def _supervisor_cmdline(args: List[str]) -> bool:
+    """Whether a parent process started with `args` restarts workers that exit."""
+    if any(os.path.basename(a).startswith('gunicorn') for a in args[:3]):  # gunicorn, python -m gunicorn
+        return True
+    if not any(os.path.basename(a).startswith('uvicorn') for a in args[:3]) or '--reload' in args:
+        return False  # the reloader restarts on file changes only, not when its worker exits
+    workers = os.getenv('WEB_CONCURRENCY')  # uvicorn's default for --workers
+    for i, a in enumerate(args):
+        if a == '--workers' and i + 1 < len(args):
+            workers = args[i + 1]
+        elif a.startswith('--workers='):
+            workers = a.partition('=')[2]
+    try:
+        return int(workers or 1) > 1
+    except ValueError:
+        return False
+
+
+def supervised() -> bool:
+    """Whether something restarts this process when it exits: uvicorn --workers N (N > 1) or gunicorn.
+
+    Detected from the parent's command line. THEMELAB_SUPERVISED=1/0 overrides
+    it (e.g. for systemd, a container restart policy, or uvicorn.run(workers=N)).
+    """
+    env = os.getenv('THEMELAB_SUPERVISED')
+    if env is not None:
+        return env not in ('', '0')
+    try:
+        with open(f'/proc/{os.getppid()}/cmdline', 'rb') as f:
+            args = [a.decode('utf-8', 'replace') for a in f.read().split(b'\0') if a]
+    except OSError:
+        return False
+    return _supervisor_cmdline(args)
+
+
+class RecycleMiddleware:
+    """After a response completes, SIGTERM this worker once a limit has been hit.
+
+    uvicorn and gunicorn treat SIGTERM as a graceful shutdown: in-flight
+    requests finish and the supervisor (`--workers`, gunicorn, ...) starts a
+    fresh worker. A single unsupervised process would just stop serving, so
+    there the limit is only logged.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._signalled = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if GUARD.recycle_reason is not None and not self._signalled and scope['type'] == 'http':
+                self._signalled = True
+                if supervised():
+                    os.kill(os.getpid(), signal.SIGTERM)
+                else:
+                    logger.warning('not recycling worker %d: no supervisor would restart it '
+                                   '(run with --workers N or gunicorn, or set THEMELAB_SUPERVISED=1)', os.getpid())
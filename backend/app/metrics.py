@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# -------------------------
+# Metric types (Prometheus text exposition format 0.0.4)
+# -------------------------
+
+# Seconds; spans range from sub-millisecond rc lookups to multi-second cold bundles
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    """Monotonic counter with a fixed label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, k)} {_num(v)}' for k, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is a bisect and three adds under a lock."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # per-bucket counts + [+Inf, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        out: List[str] = []
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, n in zip((*self.buckets, float('inf')), series[:-1]):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_num(bound)}"'
+                out.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {_num(cumulative)}')
+            out.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]!r}')
+            out.append(f'{self.name}_count{_labels(self.labelnames, labels)} {_num(cumulative)}')
+        return out
+
+
+class GaugeCallback:
+    """Gauge (or counter) read from elsewhere at scrape time, so it costs nothing per request.
+
+    With `labelnames`, `fn` returns {label values: value} instead of one number.
+    """
+
+    def __init__(
+        self, name: str, help: str, fn: Callable[[], object], kind: str = 'gauge',
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name, self.help, self.fn, self.kind = name, help, fn, kind
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        if not self.labelnames:
+            return [f'{self.name} {_num(self.fn())}']
+        return [f'{self.name}{_labels(self.labelnames, k)} {_num(v)}' for k, v in sorted(self.fn().items())]
+
+
+_REGISTRY: List[object] = []
+
+
+def register(metric):
+    _REGISTRY.append(metric)
+    return metric
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for m in _REGISTRY:
+        lines.append(f'# HELP {m.name} {m.help}')
+        lines.append(f'# TYPE {m.name} {m.kind}')
+        lines.extend(m.samples())
+    return '\n'.join(lines) + '\n'
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# -------------------------
+# Application metrics
+# -------------------------
+
+REQUEST_SECONDS = register(Histogram(
+    'themelab_request_seconds', 'HTTP request latency by route template.', ('method', 'route', 'status'),
+))
+STAGE_SECONDS = register(Histogram(
+    'themelab_stage_seconds', 'Time spent per pipeline stage (rc, build, draw, encode, b64, ...).', ('stage',),
+))
+FIGURE_SECONDS = register(Histogram(
+    'themelab_figure_seconds', 'Wall time of one fresh figure render (build + draw + encode).', ('figure',),
+))
+RENDERS = register(Counter(
+    'themelab_renders_total', 'Figures rendered in this process (render-cache misses).', ('figure',),
+))
+ERRORS = register(Counter(
+    'themelab_errors_total', 'Requests answered with a 4xx/5xx status.', ('route', 'status'),
+))
+
+
+def register_cache_metrics() -> None:
+    """Expose the render and rc-validation caches' own counters; read at scrape time."""
+    from .cache import RENDER_CACHE, STORE_DIR, get_render_store
+    from .rcvalidate import RC_VALIDATOR
+
+    register(GaugeCallback('themelab_render_cache_hits_total', 'Render-cache hits (per pyramid level).',
+                           lambda: RENDER_CACHE.hits, kind='counter'))
+    register(GaugeCallback('themelab_render_cache_misses_total', 'Render-cache misses (per pyramid level).',
+                           lambda: RENDER_CACHE.misses, kind='counter'))
+    register(GaugeCallback('themelab_render_cache_bytes', 'Encoded bytes held by the render cache.',
+                           lambda: RENDER_CACHE.size_bytes))
+    register(GaugeCallback('themelab_render_cache_entries', 'Entries held by the render cache.',
+                           lambda: len(RENDER_CACHE)))
+    if STORE_DIR:
+        register(GaugeCallback('themelab_render_store_hits_total', 'Shared render-store hits in this worker.',
+                               lambda: get_render_store().hits, kind='counter'))
+        register(GaugeCallback('themelab_render_store_misses_total', 'Shared render-store misses in this worker.',
+                               lambda: get_render_store().misses, kind='counter'))
+        register(GaugeCallback('themelab_render_store_evictions_total', 'Files this worker evicted from the store.',
+                               lambda: get_render_store().evictions, kind='counter'))
+        register(GaugeCallback('themelab_render_store_bytes', 'Bytes held by the shared render store (all workers).',
+                               lambda: get_render_store().usage_bytes()))
+    register(GaugeCallback('themelab_rc_validation_hits_total', 'rc (key, value) verdicts served from cache.',
+                           lambda: RC_VALIDATOR.hits, kind='counter'))
+    register(GaugeCallback('themelab_rc_validation_misses_total', 'rc (key, value) pairs run through Matplotlib.',
+                           lambda: RC_VALIDATOR.misses, kind='counter'))
+
+
+register_cache_metrics()
+
+# -------------------------
+# Spans & Server-Timing
+# -------------------------
+
+# Per-request stage totals (seconds); None outside a request. Thread-pool calls
+# see the same dict because anyio copies the context into the worker thread.
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('themelab_timings', default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block into themelab_stage_seconds and the current request's Server-Timing."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f'{stage};dur={seconds * 1e3:.2f}' for stage, seconds in timings.items()]
+    parts.append(f'total;dur={total * 1e3:.2f}')
+    return ', '.join(parts)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request histogram, error counter and a Server-Timing header.
+
+    Stage spans opened anywhere during the request (including in the thread
+    pool) are summed per stage and sent as `Server-Timing: rc;dur=…, draw;dur=…,
+    total;dur=…`. Stages that run in batch worker processes are not included.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                header = server_timing(timings, time.perf_counter() - t0).encode('latin-1')
+                message['headers'] = [*message.get('headers', ()), (b'server-timing', header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'  # templates keep label cardinality bounded
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, scope['method'], path, str(status))
+            if status >= 400:
+                ERRORS.inc(path, str(status))
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import io
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .theming import (
+    SRGB8_TO_LINEAR,
+    linear_to_oklab_array,
+    linear_to_srgb_array,
+    oklab_to_linear_array,
+    rgb01_to_hex,
+)
+
+# -------------------------
+# Bounded image loading
+# -------------------------
+
+MAX_SOURCE_PIXELS = 64_000_000  # refuse anything larger before decoding
+SAMPLE_EDGE = 256  # clustering works on at most SAMPLE_EDGE^2 pixels
+ALPHA_CUTOFF = 128  # pixels more transparent than this are ignored
+
+
+def load_samples(data: bytes, edge: int = SAMPLE_EDGE) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode `data` straight to a small thumbnail; returns (N, 3) uint8 pixels and the source size.
+
+    Memory stays bounded on 20+ MP inputs: the header is checked against
+    MAX_SOURCE_PIXELS before decoding, JPEGs decode at reduced DCT scale (Pillow
+    draft mode, used by thumbnail), and everything else is decoded once and
+    box-reduced to `edge` pixels on a side.
+    """
+    im = Image.open(io.BytesIO(data))
+    size = im.size
+    if size[0] * size[1] > MAX_SOURCE_PIXELS:
+        raise ValueError(f'image is {size[0]}x{size[1]}; the limit is {MAX_SOURCE_PIXELS:,} pixels')
+    im.thumbnail((edge, edge), Image.Resampling.BOX, reducing_gap=2.0)
+    rgba = np.asarray(im.convert('RGBA')).reshape(-1, 4)
+    opaque = rgba[rgba[:, 3] >= ALPHA_CUTOFF, :3]
+    return opaque, size
+
+
+def pixels_to_oklab(rgb8: np.ndarray) -> np.ndarray:
+    return linear_to_oklab_array(SRGB8_TO_LINEAR[rgb8])
+
+
+def oklab_to_hex(lab: np.ndarray) -> List[str]:
+    """(N, 3) Oklab -> sRGB hex (clipped to gamut)."""
+    lin = oklab_to_linear_array(lab)
+    return [rgb01_to_hex(tuple(c)) for c in linear_to_srgb_array(lin)]
+
+
+# -------------------------
+# Mini-batch k-means (Sculley 2010)
+# -------------------------
+
+
+def _sq_dist(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return ((x[:, None, :] - centers[None, :, :]) ** 2).sum(-1)
+
+
+def _kmeans_pp(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centers = [x[rng.integers(len(x))]]
+    d2 = _sq_dist(x, np.array(centers))[:, 0]
+    for _ in range(1, k):
+        total = d2.sum()
+        if total <= 0:  # fewer distinct colours than k
+            break
+        centers.append(x[rng.choice(len(x), p=d2 / total)])
+        d2 = np.minimum(d2, _sq_dist(x, centers[-1][None])[:, 0])
+    return np.array(centers)
+
+
+def minibatch_kmeans(
+    x: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    batch: int = 1024,
+    max_iter: int = 100,
+    tol: float = 1e-5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster (N, 3) points; returns (centers, share of points per center), largest share first.
+
+    Each step assigns one random batch and moves every touched center towards
+    its batch mean with a per-center 1/count learning rate. Work is bounded by
+    max_iter x batch x k regardless of N.
+    """
+    init_pool = x[rng.choice(len(x), size=min(len(x), 4096), replace=False)]
+    centers = _kmeans_pp(init_pool, k, rng)
+    k = len(centers)
+    counts = np.zeros(k)
+    for _ in range(max_iter):
+        b = x[rng.integers(0, len(x), size=min(batch, len(x)))]
+        assign = _sq_dist(b, centers).argmin(1)
+        n = np.bincount(assign, minlength=k).astype(np.float64)
+        sums = np.stack([np.bincount(assign, weights=b[:, c], minlength=k) for c in range(3)], 1)
+        hit = n > 0
+        counts[hit] += n[hit]
+        step = (n[hit] / counts[hit])[:, None] * (sums[hit] / n[hit, None] - centers[hit])
+        centers[hit] += step
+        if (step ** 2).sum(1).max(initial=0.0) < tol ** 2:
+            break
+
+    # Final shares over all samples, in chunks to keep the (N, k) matrix small
+    share = np.zeros(k)
+    for start in range(0, len(x), 16384):
+        share += np.bincount(_sq_dist(x[start:start + 16384], centers).argmin(1), minlength=k)
+    order = np.argsort(-share)
+    return centers[order], share[order] / share.sum()
+
+
+# -------------------------
+# Candidate palettes
+# -------------------------
+
+
+@dataclass
+class Extraction:
+    clusters: List[dict]
+    palettes: List[dict]
+    source_size: Tuple[int, int]
+    sampled_pixels: int
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            'clusters': self.clusters,
+            'palettes': self.palettes,
+            'source_size': list(self.source_size),
+            'sampled_pixels': self.sampled_pixels,
+            'timings_ms': {k: round(v, 2) for k, v in self.timings_ms.items()},
+        }
+
+
+def _farthest_first(lab: np.ndarray, n: int) -> List[int]:
+    """Greedy max-min ΔE selection, seeded with the most dominant cluster."""
+    picked = [0]
+    d = np.sqrt(((lab - lab[0]) ** 2).sum(1))
+    while len(picked) < min(n, len(lab)):
+        nxt = int(d.argmax())
+        if d[nxt] <= 0:
+            break
+        picked.append(nxt)
+        d = np.minimum(d, np.sqrt(((lab - lab[nxt]) ** 2).sum(1)))
+    return picked
+
+
+def candidate_palettes(
+    lab: np.ndarray, share: np.ndarray, n: int, bg_lab: np.ndarray, min_bg_delta_e: float = 0.08
+) -> Dict[str, List[int]]:
+    """Cluster indices for each palette strategy, after dropping clusters that melt into the background."""
+    usable = np.flatnonzero(np.sqrt(((lab - bg_lab) ** 2).sum(1)) >= min_bg_delta_e)
+    if len(usable) == 0:
+        return {}
+    lab_u, share_u = lab[usable], share[usable]
+    chroma = np.hypot(lab_u[:, 1], lab_u[:, 2])
+    strategies = {
+        'dominant': np.arange(len(usable))[:n],
+        'distinct': np.array(_farthest_first(lab_u, n), dtype=int),
+        'vivid': np.argsort(-(share_u * chroma))[:n],
+    }
+    return {name: usable[idx].tolist() for name, idx in strategies.items()}
+
+
+def extract_palettes(
+    data: bytes,
+    n_colors: int = 6,
+    bg: str = '#FAFAF7',
+    fg: str = '#111111',
+    seed: int = 0,
+) -> Extraction:
+    """Ranked palettes (hex lists ready for `palette` in /api/themes/generate) from an image."""
+    from .analysis import analyze_palettes
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    pixels, size = load_samples(data)
+    if len(pixels) == 0:
+        raise ValueError('image has no opaque pixels')
+    timings['decode'] = (time.perf_counter() - t0) * 1e3
+
+    t0 = time.perf_counter()
+    lab = pixels_to_oklab(pixels)
+    k = max(12, 2 * n_colors)
+    centers, share = minibatch_kmeans(lab, k, np.random.default_rng(seed))
+    timings['kmeans'] = (time.perf_counter() - t0) * 1e3
+
+    t0 = time.perf_counter()
+    hexes = oklab_to_hex(centers)
+    bg_lab = pixels_to_oklab(np.array([[int(bg[i:i + 2], 16) for i in (1, 3, 5)]]))[0]
+    candidates = {
+        name: list(dict.fromkeys(hexes[i] for i in idx))  # clusters can round to one hex
+        for name, idx in candidate_palettes(centers, share, n_colors, bg_lab).items()
+    }
+    candidates = {name: cols for name, cols in candidates.items() if len(cols) >= 3}
+    if not candidates:
+        raise ValueError('image has fewer than 3 colours distinct from the background')
+    reports = analyze_palettes(
+        list(candidates.values()), [bg] * len(candidates), [fg] * len(candidates)
+    )
+    palettes = sorted(
+        (
+            {'name': name, 'colors': cols, 'score': round(r.score, 4), 'analysis': r.to_dict()}
+            for (name, cols), r in zip(candidates.items(), reports)
+        ),
+        key=lambda p: -p['score'],
+    )
+    timings['rank'] = (time.perf_counter() - t0) * 1e3
+
+    clusters = [
+        {'hex': h, 'share': round(float(s), 4),
+         'oklch': [round(float(c[0]), 4), round(float(np.hypot(c[1], c[2])), 4),
+                   round(float(np.degrees(np.arctan2(c[2], c[1])) % 360), 1)]}
+        for h, s, c in zip(hexes, share, centers)
+    ]
+    return Extraction(clusters, palettes, size, len(pixels), timings)
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+# -------------------------
+# Settings
+# -------------------------
+
+PROFILE_HEADER = 'x-themelab-profile'  # 'cprofile' (or '1') | 'sample'
+# Renders still running after this long get their stacks sampled; 0 disables
+SLOW_RENDER_MS = float(os.getenv('THEMELAB_PROFILE_SLOW_MS', '10000'))
+SAMPLE_INTERVAL_S = 0.005
+MAX_PROFILES = int(os.getenv('THEMELAB_PROFILE_MAX', '32'))
+MAX_PROFILE_BYTES = int(os.getenv('THEMELAB_PROFILE_MB', '64')) * 1024 * 1024
+MODES = ('cprofile', 'sample')
+
+
+def request_mode(header: Optional[str]) -> Optional[str]:
+    """Profiling mode asked for by the request header, or None."""
+    if not header:
+        return None
+    value = header.strip().lower()
+    if value in ('1', 'true', 'cprofile'):
+        return 'cprofile'
+    if value == 'sample':
+        return 'sample'
+    raise ValueError(f"{PROFILE_HEADER} must be one of: cprofile, sample")
+
+
+# -------------------------
+# Bounded profile store
+# -------------------------
+
+
+@dataclass
+class Profile:
+    id: str
+    digest: str  # rc digest of the theme that was rendered
+    seed: int
+    kind: str  # 'pstats' (cProfile, marshal) | 'folded' (flamegraph.pl / speedscope collapsed stacks)
+    trigger: str  # 'header' | 'threshold'
+    duration_ms: float
+    data: bytes
+    created: float = field(default_factory=time.time)
+    samples: int = 0
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}_{self.id}.{'pstats' if self.kind == 'pstats' else 'folded'}"
+
+    @property
+    def media_type(self) -> str:
+        return 'application/octet-stream' if self.kind == 'pstats' else 'text/plain; charset=utf-8'
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'hash': self.digest,
+            'seed': self.seed,
+            'kind': self.kind,
+            'trigger': self.trigger,
+            'duration_ms': round(self.duration_ms, 1),
+            'samples': self.samples,
+            'bytes': len(self.data),
+            'filename': self.filename,
+            'created': self.created,
+        }
+
+    def summary(self, limit: int = 40) -> str:
+        """Human-readable top functions: cumulative time for pstats, sample counts for folded stacks."""
+        if self.kind == 'folded':
+            leaf: Counter = Counter()
+            for line in self.data.decode('utf-8').splitlines():
+                stack, _, n = line.rpartition(' ')
+                leaf[stack.rsplit(';', 1)[-1]] += int(n)
+            total = sum(leaf.values()) or 1
+            return ''.join(f'{n:>8} {100 * n / total:5.1f}%  {fn}\n' for fn, n in leaf.most_common(limit))
+        with tempfile.NamedTemporaryFile(suffix='.pstats') as tmp:
+            tmp.write(self.data)
+            tmp.flush()
+            out = io.StringIO()
+            pstats.Stats(tmp.name, stream=out).sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+
+
+class ProfileStore:
+    """Thread-safe LRU of captured profiles, bounded by count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: 'OrderedDict[str, Profile]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, profile: Profile) -> None:
+        if len(profile.data) > self.max_bytes:
+            return
+        with self._lock:
+            self._items[profile.id] = profile
+            self._size += len(profile.data)
+            while len(self._items) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted.data)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._items.get(profile_id)
+
+    def delete(self, profile_id: str) -> bool:
+        with self._lock:
+            profile = self._items.pop(profile_id, None)
+            if profile is not None:
+                self._size -= len(profile.data)
+            return profile is not None
+
+    def list(self, digest: Optional[str] = None) -> List[Profile]:
+        with self._lock:
+            items = list(reversed(self._items.values()))
+        return [p for p in items if digest is None or p.digest == digest]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+
+PROFILE_STORE = ProfileStore(MAX_PROFILES, MAX_PROFILE_BYTES)
+
+# -------------------------
+# Stack sampler
+# -------------------------
+
+
+def _fold(frame) -> str:
+    names: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class _Watch:
+    def __init__(self, thread_id: int, start_at: float) -> None:
+        self.thread_id = thread_id
+        self.start_at = start_at
+        self.stacks: Counter = Counter()
+
+
+class Sampler:
+    """One daemon thread sampling the stacks of watched render threads.
+
+    Watching is a dict insert; the thread sleeps until the earliest watch is due,
+    so renders that finish before their threshold cost nothing more.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S) -> None:
+        self.interval = interval
+        self._watches: Dict[int, _Watch] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, delay: float) -> _Watch:
+        w = _Watch(threading.get_ident(), time.perf_counter() + delay)
+        with self._cond:
+            self._watches[id(w)] = w
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='themelab-sampler', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return w
+
+    def unwatch(self, w: _Watch) -> None:
+        with self._cond:
+            self._watches.pop(id(w), None)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._watches:
+                    self._cond.wait()
+                watches = list(self._watches.values())
+                wait = min(w.start_at for w in watches) - time.perf_counter()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for w in watches:
+                frame = frames.get(w.thread_id)
+                if now >= w.start_at and frame is not None:
+                    w.stacks[_fold(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+SAMPLER = Sampler()
+
+# -------------------------
+# Render hook
+# -------------------------
+
+
+@dataclass
+class ProfileHandle:
+    profile: Optional[Profile] = None
+    reason: Optional[str] = None  # why a requested profile was not captured
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.profile.id if self.profile else None
+
+
+@contextmanager
+def profile_render(
+    digest: str, seed: int, mode: Optional[str] = None, slow_ms: float = SLOW_RENDER_MS
+) -> Iterator[ProfileHandle]:
+    """Profile the enclosed render loop when asked to (`mode`) or when it runs past `slow_ms`.
+
+    'cprofile' records every call (deterministic, ~2x slower) as a pstats file;
+    'sample' and the slow-render threshold record collapsed stacks every 5 ms.
+    Threshold captures cover the render from the threshold onward only. The
+    captured profile is stored in PROFILE_STORE and exposed on the handle; when
+    `mode` was asked for but nothing was captured, `handle.reason` says why.
+    """
+    handle = ProfileHandle()
+    if mode is None and slow_ms <= 0:
+        yield handle
+        return
+
+    prof: Optional[cProfile.Profile] = None
+    watch: Optional[_Watch] = None
+    if mode == 'cprofile':
+        prof = cProfile.Profile()
+    else:
+        watch = SAMPLER.watch(0.0 if mode == 'sample' else slow_ms / 1e3)
+    t0 = time.perf_counter()
+    if prof is not None:
+        prof.enable()
+    try:
+        yield handle
+    finally:
+        if prof is not None:
+            prof.disable()
+        duration_ms = (time.perf_counter() - t0) * 1e3
+        if watch is not None:
+            SAMPLER.unwatch(watch)
+        trigger = 'header' if mode else 'threshold'
+        if prof is not None:
+            prof.create_stats()
+            handle.profile = Profile(
+                uuid.uuid4().hex[:12], digest, seed, 'pstats', trigger, duration_ms,
+                marshal.dumps(prof.stats),
+            )
+        elif watch is not None and watch.stacks:
+            folded = ''.join(f'{stack} {n}\n' for stack, n in watch.stacks.most_common())
+            handle.profile = Profile(
+                uuid.uuid4().hex[:12], digest, seed, 'folded', trigger, duration_ms,
+                folded.encode('utf-8'), samples=sum(watch.stacks.values()),
+            )
+        if handle.profile is not None:
+            PROFILE_STORE.put(handle.profile)
+        elif mode:
+            handle.reason = f'no samples: the render finished in {duration_ms:.0f} ms, inside one sampling interval'
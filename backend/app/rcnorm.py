@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import orjson
+from cycler import Cycler
+
+from .rcvalidate import RC_VALIDATOR, deserialize_prop_cycle
+from .utils import orjson_default
+
+# -------------------------
+# rc (de)serialization
+# -------------------------
+
+
+def rc_deserialize(rc: dict) -> dict:
+    """Rebuild Matplotlib-friendly rc dict from JSON (axes.prop_cycle special-case)."""
+    out = dict(rc)
+    if "axes.prop_cycle" in out:
+        out["axes.prop_cycle"] = deserialize_prop_cycle(out["axes.prop_cycle"])
+    return out
+
+
+# -------------------------
+# Validation & canonical form
+# -------------------------
+
+_HEX_COLOR_RE = re.compile(r"^#(?:[0-9A-Fa-f]{3,4}|[0-9A-Fa-f]{6}|[0-9A-Fa-f]{8})$")
+
+CanonicalRc = Tuple[Tuple[str, object], ...]
+
+
+class RcValidationError(ValueError):
+    """One or more rc entries failed Matplotlib's validators."""
+
+    def __init__(self, errors: List[Tuple[str, str]]) -> None:
+        self.errors = errors
+        super().__init__("; ".join(f"{k}: {msg}" for k, msg in errors))
+
+
+def validate_rc(rc: Dict[str, object]) -> Dict[str, object]:
+    """Run every entry through Matplotlib's rc validators, collecting all errors.
+
+    Verdicts come from the shared, persisted cache in app.rcvalidate (the same
+    one json2mplstyle.py uses), so known (key, value) pairs are dict lookups.
+    Accepts the JSON prop_cycle shapes as well as Cycler objects.
+    """
+    out, errors = RC_VALIDATOR.validate(rc)
+    if errors:
+        raise RcValidationError(errors)
+    return out
+
+
+def canonical_value(v: object) -> object:
+    """Hashable, order-stable form of one rc value (tuples, upper-case hex, plain scalars)."""
+    if isinstance(v, Cycler):
+        return ("cycler",) + tuple(
+            (k, canonical_value(vals)) for k, vals in sorted(v.by_key().items())
+        )
+    if isinstance(v, str):
+        return v.upper() if _HEX_COLOR_RE.match(v) else v
+    if isinstance(v, (list, tuple)):
+        return tuple(canonical_value(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((str(k), canonical_value(x)) for k, x in v.items()))
+    if hasattr(v, "item"):  # NumPy scalar
+        return v.item()
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def canonical_rc(rc: Dict[str, object]) -> CanonicalRc:
+    return tuple(sorted((k, canonical_value(v)) for k, v in rc.items()))
+
+
+def _digest(canonical: CanonicalRc) -> str:
+    blob = orjson.dumps(canonical, default=orjson_default)
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def rc_digest(rc: Dict[str, object]) -> str:
+    """Stable short digest of an rc dict, equal for equivalent shapes of the same theme."""
+    return _digest(canonical_rc(rc))
+
+
+@dataclass(frozen=True)
+class NormalizedRc:
+    rc: Dict[str, object]  # validated, ready for mpl.rc_context; treat as read-only
+    canonical: CanonicalRc
+    digest: str
+
+
+# -------------------------
+# Memoized entry point
+# -------------------------
+
+_MEMO_SIZE = 1024
+_memo: "OrderedDict[str, NormalizedRc]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _payload_hash(raw: Dict[str, object]) -> str:
+    blob = orjson.dumps(raw, default=orjson_default, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def normalize_rc(raw: Dict[str, object]) -> NormalizedRc:
+    """Deserialize, validate and canonicalize a JSON rc dict.
+
+    Results are memoized by a hash of the raw payload, so repeat requests for
+    the same theme skip validation entirely. Raises RcValidationError.
+    """
+    key = _payload_hash(raw)
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None:
+            _memo.move_to_end(key)
+            return hit
+
+    rc = validate_rc(raw)
+    canonical = canonical_rc(rc)
+    norm = NormalizedRc(rc=rc, canonical=canonical, digest=_digest(canonical))
+    with _memo_lock:
+        _memo[key] = norm
+        while len(_memo) > _MEMO_SIZE:
+            _memo.popitem(last=False)
+    return norm
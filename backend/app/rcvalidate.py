@@ -0,0 +1,259 @@
+"""Memoized rc validation shared by the backend and json2mplstyle.py.
+
+Only the standard library is imported at module load (Matplotlib and cycler are
+imported on first use), so the CLI can import this without the backend's
+dependencies and `--help` stays fast.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RcErrors = List[Tuple[str, str]]  # (rc key, message), in input order
+
+MAX_ENTRIES = 65536
+_MISSING = object()  # verdict known (e.g. loaded from disk) but the converted value is not
+
+# -------------------------
+# Canonical keys
+# -------------------------
+
+
+def deserialize_prop_cycle(pc: object) -> object:
+    """Rebuild a Cycler from either JSON shape produced by `orjson_default`.
+
+    {"key": k, "values": [...]} -> cycler(k, values)
+    {"multi": [{k1: v, k2: w}, ...]} -> cycler(k1=[...], k2=[...]) (one pass per key)
+    Anything else is returned unchanged for the validator to judge.
+    """
+    if not isinstance(pc, dict):
+        return pc
+    from cycler import cycler
+
+    if "key" in pc and "values" in pc:
+        return cycler(pc["key"], pc["values"])
+    if "multi" in pc:
+        rows = pc["multi"]
+        if not rows:
+            raise ValueError("axes.prop_cycle 'multi' must not be empty")
+        keys = list(rows[0])
+        if any(set(row) != set(keys) for row in rows):
+            raise ValueError("axes.prop_cycle 'multi' entries must share the same keys")
+        return cycler(**{k: [row[k] for row in rows] for k in keys})
+    return pc
+
+
+def _json_default(v: object) -> object:
+    if hasattr(v, "by_key"):  # Cycler
+        return {"cycler": {k: list(vals) for k, vals in v.by_key().items()}}
+    if hasattr(v, "item"):  # NumPy scalar
+        return v.item()
+    if hasattr(v, "tolist"):  # NumPy array
+        return v.tolist()
+    return repr(v)
+
+
+def cache_key(key: str, value: object) -> str:
+    """`key=<canonical JSON of value>`; lists and tuples share an entry, 1 and 1.0 and True do not."""
+    t = type(value)
+    if t is str:  # most rc values; skips json.dumps (unescaped, but still one string per value)
+        return f'{key}="{value}"'
+    if t is bool:
+        return f"{key}={'true' if value else 'false'}"
+    if t is int or t is float:
+        return f"{key}={value!r}"
+    blob = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+    return f"{key}={blob}"
+
+
+def matplotlib_version() -> Optional[str]:
+    """Installed Matplotlib version from package metadata (does not import Matplotlib)."""
+    try:
+        from importlib.metadata import version
+
+        return version("matplotlib")
+    except Exception:
+        return None
+
+
+def default_cache_path() -> Optional[Path]:
+    """THEMELAB_RC_CACHE if set ('' or '0' disables), else a per-Matplotlib-version file under ~/.cache."""
+    env = os.getenv("THEMELAB_RC_CACHE")
+    if env is not None:
+        return Path(env) if env not in ("", "0") else None
+    base = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "themelab" / f"rc-validation-mpl{matplotlib_version() or 'unknown'}.json"
+
+
+# -------------------------
+# Validator
+# -------------------------
+
+
+class RcValidator:
+    """Thread-safe cache of Matplotlib rc verdicts per (key, canonical value).
+
+    A hit costs one json.dumps and one dict lookup. Verdicts (None or an error
+    message) persist to `path` and are tagged with the Matplotlib version; a
+    file written by another version is ignored. Converted values live in
+    memory only, so a verdict loaded from disk reruns the validator once when
+    `validate()` needs the value, while `errors()` never does. Converted values
+    are shared between callers; treat them as read-only.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[str], object]]" = OrderedDict()
+        self._new: Dict[str, Optional[str]] = {}  # verdicts not yet saved
+        self._lock = threading.Lock()
+        self._loaded = path is None
+        self._validators = None
+
+    # ---- persistence
+
+    def _read_file(self) -> Dict[str, Optional[str]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("matplotlib") != matplotlib_version():
+            return {}
+        verdicts = data.get("verdicts")
+        return verdicts if isinstance(verdicts, dict) else {}
+
+    def load(self) -> int:
+        """Read persisted verdicts (once); returns how many were loaded."""
+        if self._loaded:
+            return 0
+        verdicts = self._read_file()
+        with self._lock:
+            self._loaded = True
+            for k, err in verdicts.items():
+                self._entries.setdefault(k, (err, _MISSING))
+            self._trim()
+        return len(verdicts)
+
+    def save(self) -> int:
+        """Merge this process's new verdicts into the cache file (atomic replace); returns entries written.
+
+        Several processes may save the same file; each merges what is on disk
+        first, so concurrent savers at worst drop a few of each other's newest
+        entries.
+        """
+        with self._lock:
+            new, self._new = self._new, {}
+        if self.path is None or not new:
+            return 0
+        merged = self._read_file()
+        for k in new:
+            merged.pop(k, None)
+        merged.update(new)
+        if len(merged) > self.max_entries:
+            merged = dict(list(merged.items())[-self.max_entries:])
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"matplotlib": matplotlib_version(), "verdicts": merged}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:  # a read-only home must not break validation
+            logger.warning("could not save rc validation cache %s: %s", self.path, e)
+            return 0
+        return len(merged)
+
+    def drain_new(self) -> Dict[str, Optional[str]]:
+        """Take the unsaved verdicts (to hand them to another process's validator)."""
+        with self._lock:
+            new, self._new = self._new, {}
+        return new
+
+    def merge(self, verdicts: Dict[str, Optional[str]]) -> None:
+        """Adopt verdicts computed elsewhere; they are saved with this validator's own."""
+        with self._lock:
+            for k, err in verdicts.items():
+                if k not in self._entries:
+                    self._entries[k] = (err, _MISSING)
+                self._new[k] = err
+            self._trim()
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ---- validation
+
+    def _run(self, key: str, value: object) -> Tuple[Optional[str], object]:
+        """(error, converted value) straight from Matplotlib's validators."""
+        if self._validators is None:
+            from matplotlib import rcsetup
+
+            self._validators = rcsetup._validators
+        validator = self._validators.get(key)
+        if validator is None:
+            return "unknown rcParam", None
+        try:
+            if key == "axes.prop_cycle":
+                value = deserialize_prop_cycle(value)
+            return None, validator(value)
+        except (ValueError, TypeError) as e:
+            return str(e), None
+        except Exception as e:
+            return f"{type(e).__name__}: {e}", None
+
+    def _lookup(self, key: str, value: object, need_value: bool) -> Tuple[Optional[str], object]:
+        if not self._loaded:
+            self.load()
+        ck = cache_key(key, value)
+        with self._lock:
+            hit = self._entries.get(ck)
+            if hit is not None:
+                self._entries.move_to_end(ck)
+        if hit is not None and not (need_value and hit[0] is None and hit[1] is _MISSING):
+            self.hits += 1
+            return hit
+        self.misses += 1
+        err, converted = self._run(key, value)
+        with self._lock:
+            self._entries[ck] = (err, converted)
+            if hit is None:
+                self._new[ck] = err
+            self._trim()
+        return err, converted
+
+    def errors(self, rc: Dict[str, object]) -> RcErrors:
+        """Verdicts only: the (key, message) pairs that fail, in input order."""
+        out: RcErrors = []
+        for k, v in rc.items():
+            err = self._lookup(k, v, need_value=False)[0]
+            if err is not None:
+                out.append((k, err))
+        return out
+
+    def validate(self, rc: Dict[str, object]) -> Tuple[Dict[str, object], RcErrors]:
+        """(converted values of the valid entries, errors); JSON prop_cycle shapes are accepted."""
+        out: Dict[str, object] = {}
+        errs: RcErrors = []
+        for k, v in rc.items():
+            err, converted = self._lookup(k, v, need_value=True)
+            if err is None:
+                out[k] = converted
+            else:
+                errs.append((k, err))
+        return out, errs
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+RC_VALIDATOR = RcValidator(default_cache_path())
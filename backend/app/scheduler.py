@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar
+
+from .metrics import GaugeCallback, Histogram, register
+
+T = TypeVar('T')
+
+# -------------------------
+# Settings
+# -------------------------
+
+# Batch pool cells rendering at once for this worker; 0 = one per CPU. In-process renders (request
+# threads) have a single slot of their own: rcParams are process-global, so they draw one at a time.
+SLOTS = int(os.getenv('THEMELAB_RENDER_SLOTS', '0')) or (os.cpu_count() or 1)
+# Weighted fair share of slots between interactive renders and bulk (download, batch) work
+WEIGHTS: Dict[str, float] = {
+    'interactive': float(os.getenv('THEMELAB_WEIGHT_INTERACTIVE', '4')),
+    'bulk': float(os.getenv('THEMELAB_WEIGHT_BULK', '1')),
+}
+# Threads that bulk requests may hold while queued, so they never exhaust the shared thread pool
+BULK_THREADS = int(os.getenv('THEMELAB_BULK_THREADS', '4'))
+CLIENT_HEADER = 'x-themelab-client'
+FOCUS = 'focus'  # the figure a client is looking at: served ahead of both classes
+CLASSES = (FOCUS, *WEIGHTS)
+
+
+@dataclass(frozen=True)
+class WorkTag:
+    client: str  # X-Themelab-Client header, else the peer address
+    cls: str  # 'interactive' | 'bulk'
+    focus: Optional[str] = None  # figure filename the client is viewing
+
+
+def client_key(headers, client) -> str:
+    """Fairness key of a request or websocket: its X-Themelab-Client header, else the peer IP."""
+    return headers.get(CLIENT_HEADER) or (client.host if client else 'unknown')
+
+
+_current: ContextVar[Optional[WorkTag]] = ContextVar('themelab_work', default=None)
+
+
+def current_focus() -> Optional[str]:
+    tag = _current.get()
+    return tag.focus if tag is not None else None
+
+
+# -------------------------
+# Fair scheduler
+# -------------------------
+
+
+class _Waiter:
+    __slots__ = ('client', 'cls', 't0', 'granted', 'event', 'loop', 'future')
+
+    def __init__(self, client: str, cls: str) -> None:
+        self.client = client
+        self.cls = cls
+        self.t0 = time.perf_counter()
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+
+class FairScheduler:
+    """Hands out render slots by weighted fair queueing between classes and round-robin between clients.
+
+    Each figure render (a render-cache miss) holds one slot. When slots are
+    free and nothing is queued it is granted at once; otherwise it queues
+    under its client within its class. The focused figure of a request is
+    served first; between 'interactive' and 'bulk', the class with the lowest
+    virtual time goes next and advances by 1/weight, so with weights 4:1 bulk
+    still gets a fifth of the slots under interactive load. A class that was
+    idle starts at the current virtual time rather than with saved-up credit.
+    Within a class, clients take turns one render at a time, so one client's
+    200-figure batch does not delay another client's single download.
+
+    Threads wait on an Event and event-loop tasks on a Future. This worker
+    runs two: SCHEDULER for batch pool cells, and DRAW_SCHEDULER, whose one
+    slot is the in-process turn at rcParams, taken in grant order.
+    """
+
+    def __init__(self, slots: int, weights: Dict[str, float]) -> None:
+        self.slots = max(1, slots)
+        self.weights = weights
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._queues: Dict[str, 'OrderedDict[str, Deque[_Waiter]]'] = {c: OrderedDict() for c in (FOCUS, *weights)}
+        self._depth: Dict[str, int] = {c: 0 for c in self._queues}
+        self._vtime: Dict[str, float] = {c: 0.0 for c in weights}
+        self._vnow = 0.0
+
+    # ---- queueing (call with the lock held)
+
+    def _enqueue(self, w: _Waiter) -> None:
+        queue = self._queues[w.cls]
+        if not queue and w.cls in self._vtime:
+            self._vtime[w.cls] = max(self._vtime[w.cls], self._vnow)
+        queue.setdefault(w.client, deque()).append(w)
+        self._depth[w.cls] += 1
+
+    def _remove(self, w: _Waiter) -> None:
+        queue = self._queues[w.cls]
+        waiting = queue.get(w.client)
+        if waiting is not None and w in waiting:
+            waiting.remove(w)
+            self._depth[w.cls] -= 1
+            if not waiting:
+                del queue[w.client]
+
+    def _pop(self, cls: str) -> _Waiter:
+        queue = self._queues[cls]
+        client, waiting = next(iter(queue.items()))
+        w = waiting.popleft()
+        if waiting:
+            queue.move_to_end(client)  # next client's turn
+        else:
+            del queue[client]
+        self._depth[cls] -= 1
+        return w
+
+    def _pick(self) -> Optional[_Waiter]:
+        if self._queues[FOCUS]:
+            return self._pop(FOCUS)
+        active = [c for c in self._vtime if self._queues[c]]
+        if not active:
+            return None
+        cls = min(active, key=self._vtime.__getitem__)
+        self._vnow = self._vtime[cls]
+        self._vtime[cls] += 1.0 / self.weights[cls]
+        return self._pop(cls)
+
+    def _take(self, w: _Waiter) -> None:
+        self._busy += 1
+        w.granted = True
+        SCHED_WAIT_SECONDS.observe(time.perf_counter() - w.t0, w.cls)
+
+    def _grant(self, w: _Waiter) -> None:
+        """Give a queued waiter its slot and wake it."""
+        self._take(w)
+        if w.event is not None:
+            w.event.set()
+            return
+        try:
+            w.loop.call_soon_threadsafe(self._resolve, w.future)
+        except RuntimeError:  # loop closed under the waiter: nobody will use the slot
+            self._busy -= 1
+
+    def _dispatch(self) -> None:
+        while self._busy < self.slots:
+            w = self._pick()
+            if w is None:
+                return
+            self._grant(w)
+
+    def _resolve(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()  # granted to a task that has gone away
+        elif not future.done():
+            future.set_result(None)
+
+    def _idle(self) -> bool:
+        return self._busy < self.slots and not any(self._depth.values())
+
+    # ---- public API
+
+    def release(self) -> None:
+        with self._lock:
+            self._busy -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, figure: Optional[str] = None) -> Iterator[None]:
+        """Hold a render slot in a worker thread, queued under the current request's WorkTag.
+
+        Untagged work (warm-up, CLI, benchmarks) and anything on the event loop
+        thread run unscheduled; blocking the loop would stall every grant.
+        """
+        tag = _current.get()
+        if tag is None or _on_event_loop():
+            yield
+            return
+        w = _Waiter(tag.client, FOCUS if figure is not None and figure == tag.focus else tag.cls)
+        with self._lock:
+            if self._idle():
+                self._take(w)
+            else:
+                w.event = threading.Event()
+                self._enqueue(w)
+        if w.event is not None:
+            w.event.wait()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, tag: WorkTag) -> AsyncIterator[None]:
+        """Hold a render slot from the event loop (batch pool cells); cancelling while queued leaves the queue."""
+        w = _Waiter(tag.client, tag.cls)
+        loop = asyncio.get_running_loop()
+        w.loop, w.future = loop, loop.create_future()
+        with self._lock:
+            if self._idle():
+                self._take(w)
+                w.future.set_result(None)
+            else:
+                self._enqueue(w)
+        try:
+            await w.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if not w.granted:
+                    self._remove(w)
+                    release = False
+                else:
+                    # Resolved: we own the slot. Still pending: _resolve sees the cancel and releases it.
+                    release = w.future.done() and not w.future.cancelled()
+            if release:
+                self.release()
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def queue_depths(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return {(c,): float(n) for c, n in self._depth.items()}
+
+    def queued_clients(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return {(c,): float(len(q)) for c, q in self._queues.items()}
+
+    @property
+    def busy(self) -> int:
+        return self._busy
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+SCHED_WAIT_SECONDS = register(Histogram(
+    'themelab_sched_wait_seconds', 'Time a figure render waited for a render slot.', ('class',),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+))
+SCHEDULER = FairScheduler(SLOTS, WEIGHTS)  # batch pool cells
+DRAW_SCHEDULER = FairScheduler(1, WEIGHTS)  # in-process build + draw
+LANES = {'pool': SCHEDULER, 'draw': DRAW_SCHEDULER}
+
+
+def _by_lane(read: Callable[[FairScheduler], Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+    return {(lane, *k): v for lane, sched in LANES.items() for k, v in read(sched).items()}
+
+
+register(GaugeCallback('themelab_sched_queue_depth', 'Figure renders waiting for a slot.',
+                       lambda: _by_lane(FairScheduler.queue_depths), labelnames=('lane', 'class')))
+register(GaugeCallback('themelab_sched_queued_clients', 'Clients with renders waiting for a slot.',
+                       lambda: _by_lane(FairScheduler.queued_clients), labelnames=('lane', 'class')))
+register(GaugeCallback('themelab_sched_busy_slots', 'Render slots in use.',
+                       lambda: {(lane,): float(s.busy) for lane, s in LANES.items()}, labelnames=('lane',)))
+
+# -------------------------
+# Running tagged work
+# -------------------------
+
+_bulk_limiters: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]' = weakref.WeakKeyDictionary()
+
+
+def _bulk_limiter():
+    import anyio
+
+    loop = asyncio.get_running_loop()
+    limiter = _bulk_limiters.get(loop)
+    if limiter is None:
+        limiter = _bulk_limiters[loop] = anyio.CapacityLimiter(BULK_THREADS)
+    return limiter
+
+
+async def run_tagged(tag: WorkTag, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking render work in a thread whose figure renders queue under `tag`.
+
+    Bulk work draws from its own small thread limiter, so queued downloads
+    cannot take every thread of the shared pool away from interactive requests.
+    """
+    import anyio.to_thread
+
+    def call() -> T:
+        token = _current.set(tag)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    limiter = _bulk_limiter() if tag.cls == 'bulk' else None
+    return await anyio.to_thread.run_sync(call, limiter=limiter)
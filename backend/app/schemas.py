@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+# -------------------------
+# Typed request bodies for the JSON endpoints
+# -------------------------
+
+
+class GenerateRequest(BaseModel):
+    """Body of POST /api/json/themes/generate (mirrors the form fields)."""
+
+    fg: str = "#111111"
+    bg: str = "#FAFAF7"
+    accent: str = "#2E7FE8"
+    dpi: int = 200
+    seed: int = 42
+    palette: Optional[List[str]] = None
+    search: int = 0  # >0: rank that many generated palette variants (see app.search)
+    search_time_ms: Optional[float] = None
+
+
+class ThemePayload(BaseModel):
+    """Serialized Theme minus base_style_text, as returned by generate.
+
+    Unknown fields are kept so theme.json round-trips everything the client sent.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    rc_global: Dict[str, Any]
+    seed: int = 42
+    slug: Optional[str] = None
+    name: Optional[str] = None
+    mode: Optional[str] = None
+    fg: Optional[str] = None
+    bg: Optional[str] = None
+    accent: Optional[str] = None
+    palette: Optional[List[str]] = None
+
+
+class ThemeSetRequest(BaseModel):
+    """A theme set, or generate parameters to build one (exactly one of the two)."""
+
+    themes: Optional[List[ThemePayload]] = None
+    generate: Optional[GenerateRequest] = None
+
+
+class BatchRenderRequest(ThemeSetRequest):
+    """Body of POST /api/json/render/batch.
+
+    `figures` limits the batch to some figure filenames (all ten by default).
+    """
+
+    figures: Optional[List[str]] = None
+
+
+class LibrarySaveRequest(BaseModel):
+    """Body of POST /api/json/library: a serialized theme plus free-form tags."""
+
+    theme: ThemePayload
+    tags: List[str] = []
+
+
+class LibrarySearchRequest(BaseModel):
+    """Body of POST /api/json/library/search: a palette, or the hash of a stored theme."""
+
+    palette: Optional[List[str]] = None
+    hash: Optional[str] = None
+    k: int = 10
+    mode: Optional[str] = None
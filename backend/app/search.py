@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .analysis import palette_metrics
+from .theming import (
+    THEME_NAMES_DARK,
+    THEME_NAMES_LIGHT,
+    Theme,
+    build_theme,
+    gamut_map_oklch,
+    hex_to_rgb01,
+    linear_to_oklab_array,
+    linear_to_srgb_array,
+    load_base_style_text,
+    parse_style_text,
+    srgb_hex_to_oklch,
+    srgb_to_linear_array,
+)
+
+# -------------------------
+# Search space (the knobs make_theme_set's VARIANTS fix by hand)
+# -------------------------
+
+HUE_OFFSET = (0.0, 360.0)  # degrees added to the accent hue
+LIGHTNESS_SHIFT = (-0.06, 0.06)
+CHROMA_SCALE = (0.80, 1.25)
+
+SEARCH_BATCH = 1024  # candidates scored per vectorized step
+MAX_CANDIDATES = 200_000
+SEARCH_TIME_LIMIT_MS = 2000.0  # server-side cap; the CLI has none
+MIN_SET_DISTANCE = 0.03  # Oklab; winners closer than this count as the same palette
+
+
+@dataclass
+class Candidates:
+    """A batch of palette parameters and their scores (one row per candidate)."""
+
+    hue_offset: np.ndarray
+    lightness_shift: np.ndarray
+    chroma_scale: np.ndarray
+    rotate: np.ndarray
+    score: np.ndarray
+
+    def take(self, idx: np.ndarray) -> 'Candidates':
+        return Candidates(*(getattr(self, f)[idx] for f in self.__dataclass_fields__))
+
+    @staticmethod
+    def concat(parts: Sequence['Candidates']) -> 'Candidates':
+        return Candidates(*(
+            np.concatenate([getattr(p, f) for p in parts]) for f in Candidates.__dataclass_fields__
+        ))
+
+
+def sample_params(rng: np.random.Generator, size: int, n_colors: int) -> Candidates:
+    return Candidates(
+        hue_offset=rng.uniform(*HUE_OFFSET, size),
+        lightness_shift=rng.uniform(*LIGHTNESS_SHIFT, size),
+        chroma_scale=rng.uniform(*CHROMA_SCALE, size),
+        rotate=rng.integers(0, n_colors, size),
+        score=np.zeros(size),
+    )
+
+
+def palettes_linear(accent: str, mode: str, n_colors: int, c: Candidates) -> np.ndarray:
+    """(B, n, 3) linear sRGB palettes: _generate_cycle_from_accent over a whole batch.
+
+    The scalar version's 3° hue nudges between too-similar neighbours are left
+    out; the score already punishes close pairs, so the search steers away.
+    """
+    L0, C0, h0 = srgb_hex_to_oklch(accent)
+    if mode == 'light':
+        L_base = min(0.82, max(0.58, L0))
+    else:
+        L_base = min(0.72, max(0.46, L0))
+    L_base = np.clip(L_base + c.lightness_shift, 0.2, 0.95)
+    C_base = np.clip(min(0.15, max(0.06, C0)) * c.chroma_scale, 0.04, 0.20)
+
+    i = np.arange(n_colors)
+    hue = (h0 + c.hue_offset[:, None] + 360.0 * i / n_colors) % 360.0
+    L = np.clip(L_base[:, None] + (i % 2) * 0.06 - 0.03, 0.2, 0.95)
+    C = C_base[:, None] * (1.0 - 0.05 * (i % 3))
+    lin = gamut_map_oklch(L.ravel(), C.ravel(), hue.ravel())
+    return lin.reshape(len(c.score), n_colors, 3)
+
+
+def score_batch(accent: str, mode: str, n_colors: int, bg: str, c: Candidates) -> np.ndarray:
+    lin = palettes_linear(accent, mode, n_colors, c)
+    valid = np.ones(lin.shape[:2], dtype=bool)
+    bg_lin = np.broadcast_to(srgb_to_linear_array(hex_to_rgb01(bg)), (len(lin), 3))
+    return palette_metrics(lin, valid, bg_lin)[-1]
+
+
+def to_hex_palettes(accent: str, mode: str, n_colors: int, c: Candidates) -> List[List[str]]:
+    rgb8 = np.round(linear_to_srgb_array(palettes_linear(accent, mode, n_colors, c)) * 255).astype(int)
+    out = []
+    for row, k in zip(rgb8, c.rotate):
+        pal = ['#%02X%02X%02X' % tuple(px) for px in row]
+        out.append(pal[k:] + pal[:k])
+    return out
+
+
+# -------------------------
+# Budgeted search
+# -------------------------
+
+
+@dataclass
+class SearchStats:
+    evaluated: int = 0
+    batches: int = 0
+    elapsed_ms: float = 0.0
+    stopped_by: str = 'candidates'  # or 'time'
+
+    def to_dict(self) -> dict:
+        return {
+            'evaluated': self.evaluated,
+            'batches': self.batches,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'candidates_per_s': round(self.evaluated / max(self.elapsed_ms, 1e-6) * 1e3),
+            'stopped_by': self.stopped_by,
+        }
+
+
+@dataclass
+class Ranked:
+    palette: List[str]
+    score: float
+    params: Dict[str, float] = field(default_factory=dict)
+
+
+def search_palettes(
+    accent: str,
+    bg: str,
+    mode: str,
+    n_colors: int = 8,
+    top_k: int = 3,
+    candidates: int = 4096,
+    time_budget_ms: Optional[float] = None,
+    seed: int = 0,
+    batch: int = SEARCH_BATCH,
+) -> Tuple[List[Ranked], SearchStats]:
+    """Score random palette variants in vectorized batches and keep the best `top_k`.
+
+    Stops after `candidates` evaluations or `time_budget_ms`, whichever comes
+    first (at least one batch always runs). Nothing is rendered: the score is
+    analysis.palette_metrics' (worst-vision min ΔE x background contrast).
+    Near-copies of a better winner are skipped (see diverse_top).
+    """
+    rng = np.random.default_rng(seed)
+    stats = SearchStats()
+    t0 = time.perf_counter()
+    keep = max(16 * top_k, 64)  # headroom for near-duplicates
+    best: Optional[Candidates] = None
+    while stats.evaluated < candidates:
+        c = sample_params(rng, min(batch, candidates - stats.evaluated), n_colors)
+        c.score = score_batch(accent, mode, n_colors, bg, c)
+        merged = c if best is None else Candidates.concat([best, c])
+        if len(merged.score) > keep:
+            merged = merged.take(np.argpartition(-merged.score, keep - 1)[:keep])
+        best = merged
+        stats.evaluated += len(c.score)
+        stats.batches += 1
+        stats.elapsed_ms = (time.perf_counter() - t0) * 1e3
+        if time_budget_ms is not None and stats.elapsed_ms >= time_budget_ms:
+            stats.stopped_by = 'time'
+            break
+
+    best = best.take(np.argsort(-best.score))
+    picked = diverse_top(linear_to_oklab_array(palettes_linear(accent, mode, n_colors, best)), top_k)
+    ranked: List[Ranked] = []
+    for i, pal in zip(picked, to_hex_palettes(accent, mode, n_colors, best.take(picked))):
+        ranked.append(Ranked(pal, float(best.score[i]), {
+            'hue_offset': round(float(best.hue_offset[i]), 2),
+            'lightness_shift': round(float(best.lightness_shift[i]), 4),
+            'chroma_scale': round(float(best.chroma_scale[i]), 4),
+            'rotate': int(best.rotate[i]),
+        }))
+    return ranked, stats
+
+
+def diverse_top(lab: np.ndarray, k: int, min_distance: float = MIN_SET_DISTANCE) -> np.ndarray:
+    """Greedy pick of k rows from score-sorted (B, n, 3) Oklab palettes, skipping near-copies.
+
+    Palette distance is the mean distance from each colour to its nearest
+    colour in the other palette, so rotations of one palette count as copies.
+    Falls back to the best skipped rows when fewer than k are far enough apart.
+    """
+    d = np.sqrt(((lab[:, None, :, None, :] - lab[None, :, None, :, :]) ** 2).sum(-1))  # (B, B, n, n)
+    dist = d.min(-1).mean(-1)
+    dist = np.maximum(dist, dist.T)
+    picked: List[int] = []
+    for i in range(len(lab)):
+        if all(dist[i, j] >= min_distance for j in picked):
+            picked.append(i)
+            if len(picked) == k:
+                return np.array(picked)
+    rest = [i for i in range(len(lab)) if i not in picked]
+    return np.array(picked + rest[:k - len(picked)])
+
+
+def search_theme_set(
+    fg: str,
+    bg: str,
+    accent: str,
+    dpi: int,
+    user_style_bytes: Optional[bytes],
+    seed: int,
+    candidates: int = 4096,
+    time_budget_ms: Optional[float] = None,
+    top_k: int = 3,
+    modes: Sequence[str] = ('light', 'dark'),
+    n_colors: int = 8,
+) -> Tuple[List[Theme], List[Ranked], Dict[str, dict]]:
+    """Like make_theme_set, but each mode's themes are the search winners (top_k per mode).
+
+    The candidate and time budgets are split evenly across modes. Returns the
+    themes, their Ranked entries (same order) and per-mode search stats.
+    """
+    style_name, style_text = load_base_style_text(user_style_bytes)
+    base_rc = parse_style_text(style_text)
+    r = random.Random(seed)
+    themes: List[Theme] = []
+    ranked_all: List[Ranked] = []
+    stats: Dict[str, dict] = {}
+    for m, mode in enumerate(modes):
+        ranked, st = search_palettes(
+            accent, bg, mode, n_colors=n_colors, top_k=top_k,
+            candidates=max(1, candidates // len(modes)),
+            time_budget_ms=None if time_budget_ms is None else time_budget_ms / len(modes),
+            seed=seed * 31 + m,
+        )
+        stats[mode] = st.to_dict()
+        names = THEME_NAMES_LIGHT if mode == 'light' else THEME_NAMES_DARK
+        for rank, entry in enumerate(ranked):
+            name = names[rank % len(names)] + ('' if rank < len(names) else f' {rank // len(names) + 1}')
+            themes.append(build_theme(
+                name, mode, fg, bg, accent, entry.palette, dpi,
+                base_rc, style_name, style_text, seed=r.randint(0, 2**31 - 1),
+            ))
+            ranked_all.append(entry)
+    return themes, ranked_all, stats
+
+
+# -------------------------
+# CLI
+# -------------------------
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+    from pathlib import Path
+
+    from .utils import norm_hex
+
+    parser = argparse.ArgumentParser(
+        description='Search thousands of palette variants per accent and keep the best themes.',
+    )
+    parser.add_argument('--accent', default='#2E7FE8')
+    parser.add_argument('--fg', default='#111111')
+    parser.add_argument('--bg', default='#FAFAF7')
+    parser.add_argument('--mode', choices=['light', 'dark', 'both'], default='both')
+    parser.add_argument('--colors', type=int, default=8, help='palette size (3-10)')
+    parser.add_argument('--candidates', type=int, default=20_000)
+    parser.add_argument('--time-budget-ms', type=float, default=None)
+    parser.add_argument('--top', type=int, default=3, help='themes kept per mode')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument(
+        '--render', type=Path, default=None,
+        help='render the winners (full-size PNGs) into this directory, one folder per theme',
+    )
+    parser.add_argument(
+        '--figures', default=None, help='comma-separated figure filenames to render (default: all)'
+    )
+    args = parser.parse_args(argv)
+    if not 3 <= args.colors <= 10:
+        parser.error('--colors must be between 3 and 10')
+
+    modes = ('light', 'dark') if args.mode == 'both' else (args.mode,)
+    themes, ranked, stats = search_theme_set(
+        norm_hex(args.fg), norm_hex(args.bg), norm_hex(args.accent), args.dpi, None, args.seed,
+        candidates=min(args.candidates, MAX_CANDIDATES), time_budget_ms=args.time_budget_ms,
+        top_k=args.top, modes=modes, n_colors=args.colors,
+    )
+    for mode, st in stats.items():
+        print(f"{mode}: {st['evaluated']} candidates in {st['elapsed_ms']:.0f} ms "
+              f"({st['candidates_per_s']}/s, stopped by {st['stopped_by']})")
+    for theme, entry in zip(themes, ranked):
+        print(f"  {theme.name:<14}{entry.score:>8.4f}  {' '.join(entry.palette)}")
+
+    if args.render is not None:
+        from .figures import render_levels
+        from .theming import register_fonts
+
+        register_fonts()
+        only = args.figures.split(',') if args.figures else None
+        for theme in themes:
+            out = args.render / theme.slug
+            out.mkdir(parents=True, exist_ok=True)
+            t0 = time.perf_counter()
+            rendered = render_levels(theme.rc_global, theme.seed, ('full',), only=only, codec='png-opt')
+            for fn, by_level in rendered.items():
+                (out / fn).write_bytes(by_level['full'])
+            (out / 'theme.json').write_text(theme.to_json(), encoding='utf-8')
+            print(f"rendered {theme.slug}: {len(rendered)} figures in {time.perf_counter() - t0:.1f} s -> {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .encoding import PREVIEW_CODEC, VIEW_LEVELS
+from .figures import FigureSpec, build_figure_specs, figure_cache_key, render_levels
+
+# -------------------------
+# Live-edit session state
+# -------------------------
+
+RcDecoder = Callable[[Dict[str, object]], Dict[str, object]]
+
+
+class PatchError(ValueError):
+    """Raised for malformed rc patch operations."""
+
+
+def _decode_pointer(path: str) -> str:
+    """Decode a single-segment JSON Pointer ('/axes.facecolor') into an rc key."""
+    if not isinstance(path, str) or not path.startswith('/') or path.count('/') != 1:
+        raise PatchError(f"Patch path must look like '/<rc key>', got {path!r}")
+    return path[1:].replace('~1', '/').replace('~0', '~')
+
+
+class LiveSession:
+    """Server-side copy of one client's theme for incremental re-rendering.
+
+    Clients send JSON-patch style ops against rc_global; the session applies
+    them and re-renders only figures whose effective rc (theme rc layered with
+    the figure's rc_mod) actually changed since the last push.
+    """
+
+    def __init__(
+        self,
+        rc_global: Dict[str, object],
+        seed: int,
+        codec: str = PREVIEW_CODEC,
+        levels: Iterable[str] = VIEW_LEVELS,
+    ) -> None:
+        self.rc_global: Dict[str, object] = dict(rc_global)
+        self.seed = seed
+        self.codec = codec
+        self.levels = tuple(levels)
+        self.rev = 0
+        self._specs: List[FigureSpec] = build_figure_specs()
+        self._pushed: Dict[str, Tuple[str, str, int, str]] = {}
+
+    def apply_patch(self, ops: List[dict], decode: Optional[RcDecoder] = None) -> List[str]:
+        """Apply add/replace/remove ops atomically; returns the touched rc keys.
+
+        `decode` turns JSON-shaped values (e.g. axes.prop_cycle dicts) back into
+        Matplotlib objects.
+        """
+        if not isinstance(ops, list):
+            raise PatchError('ops must be a list')
+        rc = dict(self.rc_global)
+        touched: List[str] = []
+        for op in ops:
+            if not isinstance(op, dict):
+                raise PatchError(f"Patch op must be an object, got {op!r}")
+            kind = op.get('op')
+            key = _decode_pointer(op.get('path'))
+            if kind in ('add', 'replace'):
+                if 'value' not in op:
+                    raise PatchError(f"Op {kind!r} on {key!r} is missing 'value'")
+                if kind == 'replace' and key not in rc:
+                    raise PatchError(f"Cannot replace missing key {key!r}")
+                value = op['value']
+                if decode is not None:
+                    value = decode({key: value})[key]
+                rc[key] = value
+            elif kind == 'remove':
+                if key not in rc:
+                    raise PatchError(f"Cannot remove missing key {key!r}")
+                del rc[key]
+            else:
+                raise PatchError(f"Unsupported patch op {kind!r}")
+            touched.append(key)
+        self.rc_global = rc
+        self.rev += 1
+        return touched
+
+    def _stale(self) -> Dict[str, Tuple[str, str, int, str]]:
+        stale: Dict[str, Tuple[str, str, int, str]] = {}
+        for spec in self._specs:
+            key = figure_cache_key(spec, self.rc_global, self.seed, self.codec)
+            if self._pushed.get(spec.filename) != key:
+                stale[spec.filename] = key
+        return stale
+
+    def stale_figures(self) -> List[str]:
+        """Filenames whose effective rc differs from what the client last received."""
+        return list(self._stale())
+
+    def render_changed(self) -> List[Tuple[str, Dict[str, bytes]]]:
+        """Render (or fetch from cache) stale figures and mark them as pushed.
+
+        Returns (filename, {pyramid level: encoded bytes}) per changed figure.
+        """
+        stale = self._stale()
+        if not stale:
+            return []
+        rendered = render_levels(
+            self.rc_global, self.seed, self.levels, only=stale, codec=self.codec
+        )
+        self._pushed.update(stale)
+        return sorted(rendered.items())
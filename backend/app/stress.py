@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, replace
+from typing import List, Tuple
+
+import matplotlib as mpl
+import matplotlib.axes
+import matplotlib.colors
+import numpy as np
+
+from .figures import FigureSpec, _apply_ax_style, build_figure_specs
+
+MAX_DENSITY_BINS = 1024
+
+
+@dataclass(frozen=True)
+class StressOptions:
+    """Data size and the opt-in large-data modes of the stress figures."""
+
+    n: int = 100_000  # points per series (line, time-series), points (scatter), samples (hist, box), cells (heatmap)
+    decimate: bool = False  # lines: keep first/min/max/last per pixel column
+    density: bool = False  # scatter: a 2-D histogram image instead of one marker per point
+    rasterize: bool = False  # rasterized=True on the data artists; only changes vector (SVG/PDF) output
+
+
+# -------------------------
+# Large-data helpers
+# -------------------------
+
+
+def axes_columns(ax: mpl.axes.Axes) -> Tuple[int, int]:
+    """Pixel (columns, rows) of the axes at savefig resolution, before any layout engine shrinks it."""
+    fig = ax.figure
+    dpi = mpl.rcParams['savefig.dpi']
+    dpi = fig.dpi if dpi == 'figure' else dpi
+    pos = ax.get_position()
+    return (max(1, math.ceil(pos.width * fig.get_figwidth() * dpi)),
+            max(1, math.ceil(pos.height * fig.get_figheight() * dpi)))
+
+
+def decimate_minmax(x: np.ndarray, y: np.ndarray, columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a line with sorted x to the first, min, max and last point of each of `columns` bins.
+
+    Drawn at `columns` pixels wide, the result covers the same pixels as the
+    full line (M4 aggregation), at no more than 4 points per column. Lines with
+    NaN gaps, unsorted x or too few points to gain from it are returned as-is.
+    """
+    n = len(x)
+    if n <= 4 * columns:
+        return x, y
+    xs = np.asarray(x)
+    xs = xs.view('int64') if xs.dtype.kind == 'M' else xs
+    xs = xs.astype(np.float64, copy=False)
+    ys = np.asarray(y, dtype=np.float64)
+    if np.isnan(ys).any() or np.any(np.diff(xs) < 0):
+        return x, y
+    span = xs[-1] - xs[0]
+    if span <= 0:
+        return x, y
+    bins = np.minimum(((xs - xs[0]) * (columns / span)).astype(np.int64), columns - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    counts = ends - starts + 1
+
+    def first_where(mask: np.ndarray) -> np.ndarray:
+        # Each bin holds at least one True; take the first at or after its start
+        hits = np.flatnonzero(mask)
+        return hits[np.searchsorted(hits, starts)]
+
+    imin = first_where(ys == np.repeat(np.minimum.reduceat(ys, starts), counts))
+    imax = first_where(ys == np.repeat(np.maximum.reduceat(ys, starts), counts))
+    keep = np.sort(np.stack([starts, imin, imax, ends], axis=1), axis=1).ravel()
+    keep = keep[np.r_[True, keep[1:] != keep[:-1]]]
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+
+def plot_line(ax: mpl.axes.Axes, x: np.ndarray, y: np.ndarray, opts: StressOptions, **kwargs) -> mpl.lines.Line2D:
+    if opts.decimate:
+        x, y = decimate_minmax(x, y, axes_columns(ax)[0])
+    ln, = ax.plot(x, y, rasterized=opts.rasterize, **kwargs)
+    return ln
+
+
+def density_image(ax: mpl.axes.Axes, x: np.ndarray, y: np.ndarray) -> mpl.image.AxesImage:
+    """Points binned to (at most) one cell per axes pixel and drawn as a log-scaled image in the theme colormap."""
+    cols, rows = axes_columns(ax)
+    counts, xe, ye = np.histogram2d(x, y, bins=(min(cols, MAX_DENSITY_BINS), min(rows, MAX_DENSITY_BINS)))
+    return ax.imshow(
+        np.ma.masked_equal(counts.T, 0), origin='lower', extent=(xe[0], xe[-1], ye[0], ye[-1]),
+        aspect='auto', interpolation='nearest', norm=mpl.colors.LogNorm(vmin=1),
+    )
+
+
+# -------------------------
+# Stress generators
+# -------------------------
+
+
+def stress_line(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    x = np.linspace(0, 10, opts.n)
+    for k in range(3):
+        y = np.sin(x + k) + 0.15 * rng.standard_normal(size=x.size)
+        plot_line(ax, x, y, opts, label=f"Series {k+1}")
+    ax.set_title(f"Line: {opts.n:,} points per series")
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.legend(["Sig 1", "Sig 2", "Sig 3"])
+    _apply_ax_style(ax)
+
+
+def stress_scatter(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    cov = np.array([[1.0, 0.75], [0.75, 1.5]])
+    pts = rng.multivariate_normal(np.zeros(2), cov, size=opts.n)
+    if opts.density:
+        im = density_image(ax, pts[:, 0], pts[:, 1])
+        ax.figure.colorbar(im, ax=ax, fraction=0.046, pad=0.04).ax.set_ylabel('points')
+    else:
+        ax.scatter(pts[:, 0], pts[:, 1], s=18, alpha=0.8, edgecolor='none', rasterized=opts.rasterize)
+    ax.set_title(f"Scatter: {opts.n:,} points")
+    ax.set_xlabel("feature 1")
+    ax.set_ylabel("feature 2")
+    _apply_ax_style(ax)
+
+
+def stress_hist(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    a = rng.normal(loc=0.0, scale=1.0, size=opts.n)
+    b = rng.normal(loc=1.5, scale=0.75, size=opts.n)
+    ax.hist(a, bins=30, alpha=0.6, density=True, rasterized=opts.rasterize)
+    ax.hist(b, bins=30, alpha=0.6, density=True, rasterized=opts.rasterize)
+    ax.set_title(f"Histogram: {opts.n:,} samples each")
+    ax.set_xlabel("value")
+    _apply_ax_style(ax)
+
+
+def stress_heatmap(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    from .figures import _diverging_cmap
+
+    side = max(2, math.isqrt(opts.n))
+    x = np.linspace(-3, 3, side)
+    X, Y = np.meshgrid(x, x)
+    Z = np.exp(-(X**2 + Y**2)) * np.cos(2*X) * np.sin(2*Y) + 0.02 * rng.standard_normal(size=X.shape)
+    vmax = float(np.abs(Z).max())
+    im = ax.imshow(Z, origin='lower', extent=[-3, 3, -3, 3], cmap=_diverging_cmap(), vmin=-vmax, vmax=vmax)
+    ax.figure.colorbar(im, ax=ax, fraction=0.046, pad=0.04).ax.set_ylabel('intensity')
+    ax.set_title(f"Heatmap: {side:,} x {side:,}")
+    _apply_ax_style(ax)
+
+
+def stress_box(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    size = max(1, opts.n // 4)
+    data = [rng.normal(loc=m, scale=0.5 + 0.2*i, size=size) for i, m in enumerate([0.0, 0.2, 0.6, 1.0])]
+    parts = ax.boxplot(data, notch=True, vert=True, widths=0.65, patch_artist=True)
+    for flier in parts['fliers']:  # ~0.7% of samples land outside the whiskers, one marker each
+        flier.set_rasterized(opts.rasterize)
+    ax.set_xticks([1, 2, 3, 4], ['S1', 'S2', 'S3', 'S4'])
+    ax.set_title(f"Box: {size:,} samples per group")
+    _apply_ax_style(ax)
+
+
+def stress_timeseries(ax: mpl.axes.Axes, rng: np.random.Generator, opts: StressOptions) -> None:
+    t = np.datetime64('2020-01-01T00:00') + np.arange(opts.n).astype('timedelta64[m]')
+    y = np.cumsum(rng.normal(0, 1, size=t.size))
+    ln = plot_line(ax, t, y, opts, lw=1.4)
+    ax.axvspan(t[int(0.25*len(t))], t[int(0.35*len(t))], color=ln.get_color(), alpha=0.08)
+    ax.set_title(f"Time-series: {opts.n:,} minutes")
+    ax.set_xlabel("date")
+    _apply_ax_style(ax)
+
+
+# The demo figures whose cost grows with the data; the rest draw a fixed handful of artists
+STRESS_GENERATORS = {
+    '01_line.png': stress_line,
+    '02_scatter.png': stress_scatter,
+    '04_hist.png': stress_hist,
+    '05_heatmap.png': stress_heatmap,
+    '08_box.png': stress_box,
+    '09_timeseries.png': stress_timeseries,
+}
+
+
+def build_stress_specs(opts: StressOptions = StressOptions()) -> List[Tuple[int, FigureSpec]]:
+    """(index, spec) for the data-heavy demo figures, regenerated at `opts.n` points.
+
+    Each spec keeps the filename and rc_mod of its demo figure, and `index` is
+    the demo figure's position, so `figure_rng(seed, index)` and
+    `render_figure_levels` treat it like the original.
+    """
+    out: List[Tuple[int, FigureSpec]] = []
+    for i, spec in enumerate(build_figure_specs()):
+        gen = STRESS_GENERATORS.get(spec.filename)
+        if gen is not None:
+            out.append((i, replace(
+                spec, name=f'{spec.name} (n={opts.n:,})',
+                generator=lambda ax, rng, gen=gen: gen(ax, rng, opts),
+            )))
+    return out
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import math
 import os
+import tempfile
+import threading
 import uuid
+import warnings
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import matplotlib as mpl
+import numpy as np
 from fastapi import HTTPException
 
+from .fonts import install_font_warning_filters, resolve_font_chain
 from .utils import json_pretty, norm_hex, validate_hex_list
 
 # -------------------------
@@ -33,6 +40,8 @@ def register_fonts() -> None:
         if font_files:
             for f in font_files:
                 font_manager.fontManager.addfont(str(f))
+            resolve_font_chain.cache_clear()  # new families may now resolve
+        install_font_warning_filters()
         # Prefer Inter; fallback to DejaVu Sans
         mpl.rcParams.update({
             'font.family': ['cmr10', 'Inter',],
@@ -137,6 +146,219 @@ def oklab_delta_e(c1: Tuple[float, float, float], c2: Tuple[float, float, float]
     return math.sqrt((L1 - L2) ** 2 + (a1 - a2) ** 2 + (b1 - b2) ** 2)
 
 
+# Vectorized counterparts (same coefficients) for bulk palette / image analysis.
+# Arrays are (..., 3) with channels last.
+
+_LMS_FROM_LINEAR = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+])
+_OKLAB_FROM_LMS = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+])
+_LMS_FROM_OKLAB = np.array([
+    [1.0, 0.3963377774, 0.2158037573],
+    [1.0, -0.1055613458, -0.0638541728],
+    [1.0, -0.0894841775, -1.2914855480],
+])
+_LINEAR_FROM_LMS = np.array([
+    [4.0767416621, -3.3077115913, 0.2309699292],
+    [-1.2684380046, 2.6097574011, -0.3413193965],
+    [-0.0041960863, -0.7034186147, 1.7076147010],
+])
+
+
+def srgb_to_linear_array(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.asarray(rgb, dtype=np.float64)
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb_array(lin: np.ndarray) -> np.ndarray:
+    lin = np.clip(lin, 0.0, 1.0)
+    return np.where(lin <= 0.0031308, 12.92 * lin, 1.055 * lin ** (1 / 2.4) - 0.055)
+
+
+def linear_to_oklab_array(lin: np.ndarray) -> np.ndarray:
+    lms = np.cbrt(lin @ _LMS_FROM_LINEAR.T)
+    return lms @ _OKLAB_FROM_LMS.T
+
+
+def oklab_to_linear_array(lab: np.ndarray) -> np.ndarray:
+    """Oklab -> linear sRGB (unclipped; out-of-gamut values fall outside [0, 1])."""
+    return ((lab @ _LMS_FROM_OKLAB.T) ** 3) @ _LINEAR_FROM_LMS.T
+
+
+def srgb_to_oklab_array(rgb: np.ndarray) -> np.ndarray:
+    """sRGB in [0, 1] -> Oklab, elementwise over the leading axes."""
+    return linear_to_oklab_array(srgb_to_linear_array(rgb))
+
+
+# uint8 sRGB -> linear lookup table, for pixel data
+SRGB8_TO_LINEAR = srgb_to_linear_array(np.arange(256) / 255.0)
+
+
+def oklch_to_oklab_array(L: np.ndarray, C: np.ndarray, h_deg: np.ndarray) -> np.ndarray:
+    h = np.radians(h_deg)
+    return np.stack([L, C * np.cos(h), C * np.sin(h)], -1)
+
+
+def gamut_map_oklch(
+    L: np.ndarray, C: np.ndarray, h_deg: np.ndarray, iters: int = 8
+) -> np.ndarray:
+    """OKLCH -> linear sRGB, bisecting chroma down until each sample is in gamut.
+
+    Lightness and hue are kept, so ramps stay monotonic in L after mapping.
+    """
+    L = np.clip(np.asarray(L, dtype=np.float64), 0.0, 1.0)
+    h = np.radians(h_deg)
+    # LMS' is affine in chroma along a fixed hue: base + C * direction
+    base = L[:, None] * _LMS_FROM_OKLAB[:, 0]
+    direction = np.cos(h)[:, None] * _LMS_FROM_OKLAB[:, 1] + np.sin(h)[:, None] * _LMS_FROM_OKLAB[:, 2]
+
+    M = _LINEAR_FROM_LMS.T
+
+    def linear(b: np.ndarray, d: np.ndarray, c: np.ndarray) -> np.ndarray:
+        lms = b + c[:, None] * d
+        return (lms * lms * lms) @ M
+
+    def inside(lin: np.ndarray) -> np.ndarray:
+        fits = np.abs(lin - 0.5) <= 0.5 + 1e-6
+        return fits[:, 0] & fits[:, 1] & fits[:, 2]  # cheaper than .all(-1) on 3 columns
+
+    C = np.broadcast_to(np.asarray(C, dtype=np.float64), L.shape)
+    lin = linear(base, direction, C)
+    out = np.flatnonzero(~inside(lin))
+    if len(out):
+        # Bisect only the out-of-gamut samples
+        b, d = base[out], direction[out]
+        lo, hi = np.zeros(len(out)), C[out]
+        for _ in range(iters):
+            mid = 0.5 * (lo + hi)
+            fits = inside(linear(b, d, mid))
+            lo = np.where(fits, mid, lo)
+            hi = np.where(fits, hi, mid)
+        lin[out] = linear(b, d, lo)
+    return np.clip(lin, 0.0, 1.0)
+
+
+# -------------------------
+# Colormaps (Oklab ramps, registered on demand)
+# -------------------------
+
+CMAP_PREFIX = 'themelab_'
+CMAP_LUT_SIZE = 256
+CMAP_REGISTRY_SIZE = int(os.getenv('THEMELAB_CMAP_REGISTRY', '64'))
+_CMAP_KINDS = {'seq': 2, 'div': 3}  # kind -> number of hex anchors in the name
+
+_registered_cmaps: "OrderedDict[str, None]" = OrderedDict()
+_cmap_lock = threading.Lock()
+
+
+def _lut_rgba(lin: np.ndarray) -> np.ndarray:
+    rgba = np.ones((len(lin), 4))
+    rgba[:, :3] = linear_to_srgb_array(lin)
+    return rgba
+
+
+def sequential_lut(anchor: str, bg: str, n: int = CMAP_LUT_SIZE) -> np.ndarray:
+    """(n, 4) RGBA ramp from near-`bg` to deep, passing through `anchor`'s hue.
+
+    Lightness is linear in Oklab L (perceptually even steps); chroma swells
+    towards the middle and the hue twists ±25° around the anchor, like magma
+    and cubehelix, so neighbouring values stay distinguishable.
+    """
+    _, C0, h0 = srgb_hex_to_oklch(anchor)
+    light_bg = srgb_hex_to_oklch(bg)[0] > 0.5
+    t = np.linspace(0.0, 1.0, n)
+    L = 0.96 - 0.70 * t if light_bg else 0.20 + 0.74 * t
+    C = max(C0, 0.12) * (0.15 + 0.85 * np.sin(np.pi * t) ** 0.8)
+    h = h0 + 50.0 * (t - 0.5) * (1 if light_bg else -1)
+    return _lut_rgba(gamut_map_oklch(L, C, h))
+
+
+def diverging_lut(low: str, high: str, bg: str, n: int = CMAP_LUT_SIZE) -> np.ndarray:
+    """(n, 4) RGBA ramp `low` -> neutral (background-like) -> `high`.
+
+    Both arms share one lightness profile, so equal distances from the centre
+    read as equal contrast whichever side they fall on.
+    """
+    (_, C_lo, h_lo), (_, C_hi, h_hi) = srgb_hex_to_oklch(low), srgb_hex_to_oklch(high)
+    light_bg = srgb_hex_to_oklch(bg)[0] > 0.5
+    t = np.linspace(-1.0, 1.0, n)
+    r = np.abs(t)
+    L = 0.96 - 0.52 * r if light_bg else 0.24 + 0.52 * r
+    C = np.where(t < 0, max(C_lo, 0.12), max(C_hi, 0.12)) * r ** 0.9
+    h = np.where(t < 0, h_lo, h_hi)
+    return _lut_rgba(gamut_map_oklch(L, C, h))
+
+
+def colormap_name(kind: str, *anchors: str) -> str:
+    """Registry name that encodes the colormap's inputs, so any process can rebuild it."""
+    return CMAP_PREFIX + kind + '_' + '_'.join(norm_hex(a)[1:].lower() for a in anchors)
+
+
+def build_colormap(name: str, n: int = CMAP_LUT_SIZE) -> mpl.colors.ListedColormap:
+    _, kind, *anchors = name.split('_')
+    if _CMAP_KINDS.get(kind) != len(anchors) or not all(len(a) == 6 for a in anchors):
+        raise ValueError(f'not a theme colormap name: {name!r}')
+    hexes = ['#' + a for a in anchors]
+    lut = sequential_lut(*hexes, n=n) if kind == 'seq' else diverging_lut(*hexes, n=n)
+    return mpl.colors.ListedColormap(lut, name=name)
+
+
+def ensure_colormap(name: object) -> None:
+    """Register a theme colormap (by name) if it isn't already; other names are left alone.
+
+    Registrations are kept in an LRU of CMAP_REGISTRY_SIZE entries; the oldest
+    are unregistered from Matplotlib so the registry doesn't grow without bound.
+    """
+    if not isinstance(name, str) or not name.startswith(CMAP_PREFIX):
+        return
+    with _cmap_lock:
+        if name in _registered_cmaps and name in mpl.colormaps:
+            _registered_cmaps.move_to_end(name)
+            return
+        mpl.colormaps.register(build_colormap(name), name=name, force=True)
+        _registered_cmaps[name] = None
+        while len(_registered_cmaps) > CMAP_REGISTRY_SIZE:
+            old, _ = _registered_cmaps.popitem(last=False)
+            mpl.colormaps.unregister(old)
+
+
+def _hue_distance(h1: float, h2: float) -> float:
+    return abs((h1 - h2 + 180.0) % 360.0 - 180.0)
+
+
+def theme_colormaps(palette: List[str], bg: str, accent: Optional[str] = None) -> Dict[str, str]:
+    """Names of a theme's sequential (accent) and diverging (palette) colormaps.
+
+    The diverging arms are the first palette colour and the palette colour
+    whose hue is farthest from it (its complement when the palette is one hue).
+    """
+    first = palette[0]
+    h0 = srgb_hex_to_oklch(first)[2]
+    other = max(palette[1:], key=lambda c: _hue_distance(h0, srgb_hex_to_oklch(c)[2]), default=first)
+    if _hue_distance(h0, srgb_hex_to_oklch(other)[2]) < 60.0:
+        L, C, h = srgb_hex_to_oklch(first)
+        other = oklch_to_srgb_hex(L, C, (h + 180.0) % 360.0)
+    return {
+        'sequential': colormap_name('seq', accent or first, bg),
+        'diverging': colormap_name('div', first, other, bg),
+    }
+
+
+def colormap_export(names: List[str], n: int = CMAP_LUT_SIZE) -> Dict[str, List[str]]:
+    """Theme colormaps as hex lists (for bundles: `ListedColormap(colors, name)` restores them)."""
+    out: Dict[str, List[str]] = {}
+    for name in names:
+        if isinstance(name, str) and name.startswith(CMAP_PREFIX):
+            out[name] = [mpl.colors.to_hex(c) for c in build_colormap(name, n).colors]
+    return out
+
+
 # -------------------------
 # Theme & palette
 # -------------------------
@@ -154,6 +376,7 @@ class Theme:
     base_style_name: str
     base_style_text: str
     seed: int
+    colormaps: Dict[str, str] = field(default_factory=dict)  # role -> registry name
 
     def to_json(self) -> str:
         return json_pretty({
@@ -167,6 +390,7 @@ class Theme:
             'rc_global': self.rc_global,
             'base_style_name': self.base_style_name,
             'seed': self.seed,
+            'colormaps': self.colormaps,
         })
 
 
@@ -235,10 +459,60 @@ def load_base_style_text(user_style_bytes: Optional[bytes]) -> Tuple[str, str]:
     return ("computermodern", DEFAULT_STYLE_PATH.read_text(encoding='utf-8'))
 
 
-def build_global_rc(fg: str, bg: str, palette: List[str], dpi: int, mode: str) -> Dict[str, object]:
+_STYLE_CACHE_SIZE = 64
+_style_cache: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+_style_cache_lock = threading.Lock()
+
+
+def _style_blacklist() -> frozenset:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # style.core is deprecated in newer Matplotlib
+        from matplotlib.style.core import STYLE_BLACKLIST
+    return frozenset(STYLE_BLACKLIST)
+
+
+def parse_style_text(style_text: str) -> Dict[str, object]:
+    """Parse .mplstyle text into a validated rc dict, cached by content hash.
+
+    Uses Matplotlib's own rc file parser and mirrors `plt.style.use`: bad keys
+    or values are logged and skipped, and style-blacklisted keys are dropped.
+    """
+    key = hashlib.blake2b(style_text.encode('utf-8'), digest_size=16).hexdigest()
+    with _style_cache_lock:
+        cached = _style_cache.get(key)
+        if cached is not None:
+            _style_cache.move_to_end(key)
+            return cached
+
+    with tempfile.NamedTemporaryFile(
+        'w', suffix='.mplstyle', delete=False, encoding='utf-8'
+    ) as fh:
+        fh.write(style_text)
+    try:
+        parsed = mpl.rc_params_from_file(
+            fh.name, fail_on_error=False, use_default_template=False
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse .mplstyle: {e}")
+    finally:
+        os.unlink(fh.name)
+
+    blacklist = _style_blacklist()
+    rc = {k: v for k, v in parsed.items() if k not in blacklist}
+    with _style_cache_lock:
+        _style_cache[key] = rc
+        while len(_style_cache) > _STYLE_CACHE_SIZE:
+            _style_cache.popitem(last=False)
+    return rc
+
+
+def build_global_rc(
+    fg: str, bg: str, palette: List[str], dpi: int, mode: str, accent: Optional[str] = None
+) -> Dict[str, object]:
     """Construct global rcParams consistent with our aesthetic.
 
-    Modern thin strokes, minimal spines, STIX mathtext, Inter UI font.
+    Modern thin strokes, minimal spines, STIX mathtext, Inter UI font, and a
+    sequential colormap ramped from the accent (or first palette colour).
     """
     is_dark = (mode == 'dark')
     grid_color = '#FFFFFF' if is_dark else '#000000'
@@ -304,7 +578,7 @@ def build_global_rc(fg: str, bg: str, palette: List[str], dpi: int, mode: str) -
         'legend.edgecolor': fg,
 
         # Image defaults
-        'image.cmap': 'viridis' if not is_dark else 'magma',
+        'image.cmap': theme_colormaps(palette, bg, accent)['sequential'],
         'image.interpolation': 'nearest',
 
         # Savefig
@@ -335,6 +609,7 @@ def make_theme_set(
     random.seed(seed)
 
     style_name, style_text = load_base_style_text(user_style_bytes)
+    base_rc = parse_style_text(style_text)
     themes: List[Theme] = []
 
     # Deterministic but visually distinct knobs per theme
@@ -370,24 +645,43 @@ def make_theme_set(
                         chroma_scale=cscale)
             palette = _rotate(pal, v['rotate'] + (i % max(1, n_colors-1)))
 
-        rc_global = build_global_rc(
-            fg=fg, bg=bg, palette=palette, dpi=dpi, mode=mode
-        )
-        rc_global.update({'grid.alpha': 0.12 if mode == 'light' else 0.16})
-
-        theme = Theme(
-            slug=f"{name.lower()}",
-            name=name,
-            mode=mode,
-            fg=fg,
-            bg=bg,
-            accent=accent,
-            palette=palette,
-            rc_global=rc_global,
-            base_style_name=style_name,
-            base_style_text=style_text,
-            seed=random.randint(0, 2**31 - 1),
-        )
-        themes.append(theme)
+        themes.append(build_theme(
+            name, mode, fg, bg, accent, palette, dpi,
+            base_rc, style_name, style_text, seed=random.randint(0, 2**31 - 1),
+        ))
 
     return themes
+
+
+def build_theme(
+    name: str,
+    mode: str,
+    fg: str,
+    bg: str,
+    accent: str,
+    palette: List[str],
+    dpi: int,
+    base_rc: Dict[str, object],
+    style_name: str,
+    style_text: str,
+    seed: int,
+) -> Theme:
+    """One Theme from a finished palette; the base .mplstyle sits underneath our aesthetic."""
+    rc_global = base_rc | build_global_rc(
+        fg=fg, bg=bg, palette=palette, dpi=dpi, mode=mode, accent=accent
+    )
+    rc_global.update({'grid.alpha': 0.12 if mode == 'light' else 0.16})
+    return Theme(
+        slug=name.lower().replace(' ', '-'),
+        name=name,
+        mode=mode,
+        fg=fg,
+        bg=bg,
+        accent=accent,
+        palette=palette,
+        rc_global=rc_global,
+        base_style_name=style_name,
+        base_style_text=style_text,
+        seed=seed,
+        colormaps=theme_colormaps(palette, bg, accent),
+    )
@@ -5,16 +5,20 @@ from __future__ import annotations
 
 import base64
 import io
-import json
 import os
 import re
 import tempfile
 import zipfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
-from fastapi import HTTPException
+import orjson
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from .metrics import span
 
 HEX_RE = re.compile(r"^#?[0-9A-Fa-f]{6}$")
 
@@ -47,8 +51,74 @@ def norm_hex(hex_str: str) -> str:
     return hex_str.upper() if hex_str.startswith('#') else '#' + hex_str.upper()
 
 
+# -------------------------
+# JSON (orjson everywhere)
+# -------------------------
+
+def orjson_default(obj: Any) -> Any:
+    """orjson `default` hook for rc values: Cyclers, NumPy values, sets, paths."""
+    by_key = getattr(obj, 'by_key', None)
+    if callable(by_key):  # cycler.Cycler
+        by = by_key()
+        if len(by) == 1 and 'color' in by:
+            return {'key': 'color', 'values': list(by['color'])}
+        n = len(next(iter(by.values()))) if by else 0
+        return {'multi': [{kk: vv[i] for kk, vv in by.items()} for i in range(n)]}
+    if hasattr(obj, 'tolist'):  # NumPy scalars and arrays
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=orjson_default, option=_ORJSON_OPTS)
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data)
+
+
 def json_pretty(data: dict) -> str:
-    return json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True)
+    return orjson.dumps(
+        data,
+        default=orjson_default,
+        option=_ORJSON_OPTS | orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS,
+    ).decode('utf-8')
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson and our rc-aware default hook."""
+
+    def render(self, content: Any) -> bytes:
+        with span('serialize'):
+            return dumps(content)
+
+
+class ORJSONRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, '_json'):
+            body = await self.body()
+            with span('parse'):
+                self._json = loads(body)
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """APIRoute that decodes JSON request bodies with orjson."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request) -> Response:
+            return await handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
 
 
 def b64_png(buf: bytes) -> str:
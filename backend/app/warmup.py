@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Dict
+
+# -------------------------
+# Worker warm-up
+# -------------------------
+
+# Tiny canvases: we only want the one-off costs (font lookup and FT2Font loading,
+# mathtext/STIX setup, Agg init, lazy imports), not real pixels.
+WARMUP_RC: Dict[str, object] = {
+    'figure.dpi': 20,
+    'savefig.dpi': 20,
+    'figure.figsize': (2.0, 1.5),
+}
+
+
+@dataclass
+class WarmupReport:
+    fonts_s: float = 0.0
+    imports_s: float = 0.0
+    figures_s: Dict[str, float] = field(default_factory=dict)
+    total_s: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'fonts_s': round(self.fonts_s, 4),
+            'imports_s': round(self.imports_s, 4),
+            'figures_s': {k: round(v, 4) for k, v in self.figures_s.items()},
+            'total_s': round(self.total_s, 4),
+        }
+
+
+def warm_up(render: bool = True) -> WarmupReport:
+    """Pay first-render costs up front: fonts, imports, and one tiny figure per generator.
+
+    Renders go through `render_figure` directly so nothing lands in the render cache.
+    """
+    report = WarmupReport()
+    t_start = time.perf_counter()
+
+    from .theming import build_global_rc, register_fonts
+
+    t0 = time.perf_counter()
+    register_fonts()  # loads (or rebuilds) the font cache
+    report.fonts_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    from .figures import build_figure_specs, render_figure
+    report.imports_s = time.perf_counter() - t0
+
+    if render:
+        rc = build_global_rc(
+            fg='#111111', bg='#FAFAF7', palette=['#2E7FE8', '#E8572E', '#2EE88F'],
+            dpi=20, mode='light',
+        )
+        rc.update(WARMUP_RC)
+        for i, spec in enumerate(build_figure_specs()):
+            t0 = time.perf_counter()
+            render_figure(spec, i, rc, seed=0)
+            report.figures_s[spec.filename] = time.perf_counter() - t0
+        _warm_mathtext()
+
+    report.total_s = time.perf_counter() - t_start
+    return report
+
+
+def _warm_mathtext() -> None:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(1, 1), dpi=20)
+    FigureCanvasAgg(fig)
+    fig.text(0.1, 0.5, r'$\alpha_i^2 \sum \sqrt{x}$')
+    fig.canvas.draw()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Warm a worker (or a container image build): fonts, imports, first renders.'
+    )
+    parser.add_argument('--fonts-only', action='store_true',
+                        help='Only build/load the font cache (e.g. in a Dockerfile RUN step).')
+    args = parser.parse_args()
+
+    import matplotlib as mpl
+    mpl.use('agg', force=True)
+    report = warm_up(render=not args.fonts_only)
+    for k, v in report.to_dict().items():
+        print(f'{k}: {v}')
+
+
+if __name__ == '__main__':
+    main()
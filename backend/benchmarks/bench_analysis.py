@@ -0,0 +1,86 @@
+"""Palette accessibility analysis: vectorized batch vs. a per-colour scalar loop.
+
+"scalar" walks every theme, vision and colour pair with the scalar Oklab helpers
+in app.theming (the way the palette generator checks ΔE today); "vectorized" is
+app.analysis.analyze_palettes over all themes in one call. Both compute the same
+min pairwise ΔE per vision and the WCAG contrast of each colour.
+
+    cd backend && python -m benchmarks.bench_analysis [--themes 6] [--colors 8] [--repeat 50]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from app.analysis import CVD_MATRICES, VISIONS, analyze_palettes
+from app.theming import (
+    _linear_to_srgb,
+    _srgb_to_linear,
+    oklab_delta_e,
+    rgb01_to_hex,
+    srgb_to_oklab,
+)
+
+
+def scalar(palettes, bg):
+    """Reference implementation: plain Python over every colour and pair."""
+    out = []
+    bg_y = sum(w * _srgb_to_linear(c) for w, c in zip((0.2126, 0.7152, 0.0722), bg))
+    for pal in palettes:
+        lin = [[_srgb_to_linear(c) for c in rgb] for rgb in pal]
+        contrast = []
+        for rgb in lin:
+            y = 0.2126 * rgb[0] + 0.7152 * rgb[1] + 0.0722 * rgb[2]
+            contrast.append((max(y, bg_y) + 0.05) / (min(y, bg_y) + 0.05))
+        min_de = {}
+        for v in VISIONS:
+            m = CVD_MATRICES[v]
+            labs = []
+            for rgb in lin:
+                sim = [min(1.0, max(0.0, sum(m[i][j] * rgb[j] for j in range(3)))) for i in range(3)]
+                labs.append(srgb_to_oklab(*[_linear_to_srgb(c) for c in sim]))
+            min_de[v] = min(oklab_delta_e(a, b) for a, b in itertools.combinations(labs, 2))
+        out.append((contrast, min_de))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--themes", type=int, default=6)
+    parser.add_argument("--colors", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rgb = rng.random((args.themes, args.colors, 3))
+    bg = (0.98, 0.98, 0.97)
+    hex_palettes = [[rgb01_to_hex(tuple(c)) for c in pal] for pal in rgb]
+    snapped = [[tuple(int(h[i:i + 2], 16) / 255 for i in (1, 3, 5)) for h in pal] for pal in hex_palettes]
+
+    ref = scalar(snapped, bg)
+    got = analyze_palettes(hex_palettes, [rgb01_to_hex(bg)] * args.themes, ["#111111"] * args.themes)
+    err = max(abs(r[1][v] - g.min_delta_e[v]) for r, g in zip(ref, got) for v in VISIONS)
+
+    timings = {}
+    for name, fn in (
+        ("scalar", lambda: scalar(snapped, bg)),
+        ("vectorized", lambda: analyze_palettes(
+            hex_palettes, [rgb01_to_hex(bg)] * args.themes, ["#111111"] * args.themes)),
+    ):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        timings[name] = (time.perf_counter() - t0) / args.repeat
+
+    print(f"{args.themes} themes x {args.colors} colours x {len(VISIONS)} visions "
+          f"(max |ΔE diff| vs scalar: {err:.2e})")
+    for name, s in timings.items():
+        print(f"{name:<12}{s * 1e3:>10.3f} ms/call")
+    print(f"speed-up    {timings['scalar'] / timings['vectorized']:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
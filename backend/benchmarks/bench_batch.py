@@ -0,0 +1,83 @@
+"""Carousel preview: six sequential single-theme renders vs. one batch job.
+
+"sequential" is what the UI did before: one in-process render per theme, all
+ten figures each. "batch" runs app.batch.render_batch over the render worker
+pool (THEMELAB_RENDER_WORKERS, default one per CPU up to 8), scheduled
+figure-major. Reported: time until every theme has its first thumbnail
+(what the carousel needs) and time until all 60 cells are done.
+
+    cd backend && python -m benchmarks.bench_batch [--dpi 100] [--levels thumb]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+import matplotlib as mpl
+
+mpl.use("agg", force=True)
+
+from app.batch import DEFAULT_WORKERS, render_batch, shutdown_pool  # noqa: E402
+from app.cache import RENDER_CACHE  # noqa: E402
+from app.encoding import PREVIEW_CODEC, parse_levels  # noqa: E402
+from app.figures import render_levels  # noqa: E402
+from app.theming import make_theme_set, register_fonts  # noqa: E402
+
+
+def sequential(themes: List[Tuple[dict, int]], levels: Tuple[str, ...]) -> Tuple[float, float]:
+    # Each theme's thumbnails only arrive when its whole render returns, so the
+    # carousel is ready when the last theme finishes
+    t0 = time.perf_counter()
+    for rc, seed in themes:
+        render_levels(rc, seed, levels, codec=PREVIEW_CODEC)
+    total = time.perf_counter() - t0
+    return total, total
+
+
+async def batch(themes: List[Tuple[dict, int]], levels: Tuple[str, ...]) -> Tuple[float, float]:
+    t0 = time.perf_counter()
+    first: Dict[int, float] = {}
+    async for cell in render_batch(themes, levels, PREVIEW_CODEC):
+        first.setdefault(cell["theme"], time.perf_counter() - t0)
+    return max(first.values()), time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--levels", default="thumb")
+    args = parser.parse_args()
+    levels = parse_levels(args.levels.split(","))
+
+    register_fonts()
+    themes = [
+        (t.rc_global, t.seed)
+        for t in make_theme_set(
+            fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+            dpi=args.dpi, user_style_bytes=None, seed=42,
+        )
+    ]
+
+    # Pay one-off costs (fonts, imports, pool start-up) outside the timings
+    render_levels(themes[0][0], themes[0][1], levels, only=["01_line.png"])
+    asyncio.run(batch(themes[:1], levels))
+    RENDER_CACHE.clear()
+
+    seq_first, seq_total = sequential(themes, levels)
+    RENDER_CACHE.clear()
+    try:
+        b_first, b_total = asyncio.run(batch(themes, levels))
+    finally:
+        shutdown_pool()
+
+    print(f"{len(themes)} themes x 10 figures @ {args.dpi} dpi, levels={','.join(levels)}, "
+          f"{DEFAULT_WORKERS} worker(s)")
+    print(f"{'mode':<12}{'carousel ready s':>18}{'all cells s':>14}")
+    print(f"{'sequential':<12}{seq_first:>18.2f}{seq_total:>14.2f}")
+    print(f"{'batch':<12}{b_first:>18.2f}{b_total:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
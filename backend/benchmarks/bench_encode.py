@@ -0,0 +1,83 @@
+"""Encoded size vs. encode time for every codec across all ten figures.
+
+Each figure is drawn once; its raw Agg raster is then encoded with every codec
+in app.encoding.CODECS. The baseline is Matplotlib's own `savefig(format='png')`
+on the same figure (which re-draws, so draw time is reported separately).
+
+    cd backend && python -m benchmarks.bench_encode [--dpi 200] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import matplotlib as mpl
+
+mpl.use("agg", force=True)
+import matplotlib.pyplot as plt  # noqa: E402
+
+from app.encoding import CODECS, encode_image, figure_image  # noqa: E402
+from app.figures import build_figure_specs, figure_rng  # noqa: E402
+from app.fonts import apply_font_chain  # noqa: E402
+from app.theming import ensure_colormap, make_theme_set, register_fonts  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    register_fonts()
+    theme = make_theme_set(
+        fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+        dpi=args.dpi, user_style_bytes=None, seed=42,
+    )[0]
+
+    times: Dict[str, float] = defaultdict(float)
+    sizes: Dict[str, int] = defaultdict(int)
+    per_figure: List[str] = []
+    for i, spec in enumerate(build_figure_specs()):
+        rc = theme.rc_global | spec.rc_mod
+        ensure_colormap(rc.get("image.cmap"))
+        with mpl.rc_context(apply_font_chain(rc)):
+            fig, ax = plt.subplots()
+            try:
+                spec.generator(ax, figure_rng(theme.seed, i))
+                t0 = time.perf_counter()
+                im, dpi = figure_image(fig)
+                times["draw (raw raster)"] += time.perf_counter() - t0
+                for name, codec in CODECS.items():
+                    best = float("inf")
+                    for _ in range(args.repeat):
+                        t0 = time.perf_counter()
+                        data = encode_image(im, codec, dpi)
+                        best = min(best, time.perf_counter() - t0)
+                    times[name] += best
+                    sizes[name] += len(data)
+                buf = io.BytesIO()
+                t0 = time.perf_counter()
+                fig.savefig(buf, format="png")
+                times["savefig png (draw+encode)"] += time.perf_counter() - t0
+                sizes["savefig png (draw+encode)"] += buf.tell()
+                w, h = im.size
+                per_figure.append(f"{spec.filename:<20}{w}x{h}")
+            finally:
+                plt.close(fig)
+
+    print(f"{len(per_figure)} figures @ {args.dpi} dpi")
+    for line in per_figure:
+        print("  " + line)
+    print(f"{'variant':<28}{'total ms':>10}{'total KB':>11}{'vs savefig':>12}")
+    ref = sizes["savefig png (draw+encode)"]
+    for name in ["draw (raw raster)", "savefig png (draw+encode)", *CODECS]:
+        kb = f"{sizes[name] / 1024:>11.0f}" if name in sizes else f"{'-':>11}"
+        rel = f"{sizes[name] / ref:>11.2f}x" if name in sizes else f"{'-':>12}"
+        print(f"{name:<28}{times[name] * 1e3:>10.1f}{kb}{rel}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Font resolution cost on text-heavy figures (fig_mixed_gridspec: 6 titles + suptitle).
+
+"before" renders with the raw font.family list and Matplotlib's default warning
+behaviour; "after" goes through render_figure, which resolves the family list
+once to an explicit installed chain and preloads its FT2Font objects. Each mode
+runs in a fresh interpreter so per-process font caches start cold.
+
+    cd backend && python -m benchmarks.bench_fonts [--renders 16] [--dpi 100]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+FAMILY_SETS = {
+    "theme default": ["cmr10", "Inter"],
+    "with a missing family": ["Helvetica Neue", "cmr10", "Inter"],
+}
+
+_CHILD = r"""
+import io, json, logging, sys, time, warnings
+import matplotlib as mpl
+mpl.use("agg", force=True)
+import matplotlib.pyplot as plt
+from app.figures import build_figure_specs, figure_rng, render_figure
+from app.theming import build_global_rc, register_fonts
+
+mode, families, renders, dpi = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+noise = {"n": 0}
+class Count(logging.Handler):
+    def emit(self, record): noise["n"] += 1
+logging.getLogger("matplotlib").addHandler(Count())
+logging.getLogger("matplotlib").propagate = False
+def _count_warning(*a, **k): noise["n"] += 1
+warnings.showwarning = _count_warning
+
+if mode == "after":
+    register_fonts()
+else:  # baseline registration without the resolution layer
+    from matplotlib import font_manager
+    from app.theming import FONTS_DIR
+    for f in FONTS_DIR.rglob("*.ttf"):
+        font_manager.fontManager.addfont(str(f))
+
+spec = build_figure_specs()[9]
+assert spec.generator.__name__ == "fig_mixed_gridspec"
+rc = build_global_rc("#111111", "#FAFAF7", ["#2E7FE8", "#E8572E", "#2EE88F"], dpi, "light")
+rc["font.family"] = families
+
+def legacy(rc):
+    with mpl.rc_context(rc | spec.rc_mod):
+        fig, ax = plt.subplots()
+        try:
+            spec.generator(ax, figure_rng(0, 9))
+            fig.canvas.draw()
+            buf = io.BytesIO(); fig.savefig(buf, format="png")
+        finally:
+            plt.close(fig)
+
+times = []
+for i in range(renders):
+    rc["font.size"] = 10.0 + 0.25 * i  # new sizes defeat findfont's per-size LRU
+    t0 = time.perf_counter()
+    legacy(rc) if mode == "before" else render_figure(spec, 9, rc, 0)
+    times.append(time.perf_counter() - t0)
+steady = sorted(times[1:])
+print(json.dumps({"first": times[0], "steady": steady[len(steady) // 2], "noise": noise["n"]}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=16)
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'families':<24}{'mode':<8}{'first ms':>10}{'median ms':>11}{'log/warn lines':>16}")
+    for label, families in FAMILY_SETS.items():
+        for mode in ("before", "after"):
+            out = subprocess.run(
+                [sys.executable, "-c", _CHILD, mode, json.dumps(families), str(args.renders), str(args.dpi)],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{label:<24}{mode:<8}{r['first'] * 1e3:>10.1f}{r['steady'] * 1e3:>11.1f}{r['noise']:>16}")
+
+
+if __name__ == "__main__":
+    main()
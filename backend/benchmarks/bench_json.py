@@ -0,0 +1,97 @@
+"""Serialization cost of /api/render and /api/themes/generate responses.
+
+Compares the previous stdlib path (`_rc_serialize` + `json.dumps`) with the
+orjson `dumps` used by the API today.
+
+    cd backend && python -m benchmarks.bench_json [--dpi 200] [--repeat 50]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable
+
+import matplotlib as mpl
+
+from app.figures import render_all
+from app.theming import make_theme_set
+from app.utils import b64_png, dumps, loads
+
+
+def _legacy_rc_serialize(rc: dict) -> dict:
+    out: dict = {}
+    for k, v in rc.items():
+        if k == "axes.prop_cycle" and hasattr(v, "by_key"):
+            by = v.by_key()
+            if len(by) == 1 and "color" in by:
+                out[k] = {"key": "color", "values": list(by["color"])}
+            else:
+                n = len(next(iter(by.values())))
+                out[k] = {"multi": [{kk: vv[i] for kk, vv in by.items()} for i in range(n)]}
+        else:
+            out[k] = v
+    return out
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    mpl.use("agg", force=True)
+    themes = make_theme_set(
+        fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+        dpi=args.dpi, user_style_bytes=None, seed=42,
+    )
+    theme = themes[0]
+    png_map = render_all(theme_rc=theme.rc_global, seed=theme.seed)
+
+    def legacy_render() -> bytes:
+        body = {
+            "images": [{"filename": fn, "b64png": b64_png(b)} for fn, b in sorted(png_map.items())],
+            "rc_diff_theme": _legacy_rc_serialize(theme.rc_global),
+        }
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def orjson_render() -> bytes:
+        body = {
+            "images": [{"filename": fn, "b64png": b64_png(b)} for fn, b in sorted(png_map.items())],
+            "rc_diff_theme": theme.rc_global,
+        }
+        return dumps(body)
+
+    gen = [{"slug": t.slug, "rc_global": t.rc_global, "palette": t.palette} for t in themes]
+
+    def legacy_generate() -> bytes:
+        return json.dumps(
+            [dict(g, rc_global=_legacy_rc_serialize(g["rc_global"])) for g in gen]
+        ).encode("utf-8")
+
+    def orjson_generate() -> bytes:
+        return dumps(gen)
+
+    payload = orjson_render()
+    rows = [
+        ("render: encode", _time(legacy_render, args.repeat), _time(orjson_render, args.repeat)),
+        ("render: decode", _time(lambda: json.loads(payload), args.repeat), _time(lambda: loads(payload), args.repeat)),
+        ("generate: encode", _time(legacy_generate, args.repeat), _time(orjson_generate, args.repeat)),
+    ]
+    print(f"render payload: {len(payload) / 1e6:.2f} MB ({len(png_map)} figures @ {args.dpi} dpi)")
+    print(f"{'stage':<20}{'stdlib ms':>12}{'orjson ms':>12}{'speedup':>10}")
+    for name, before, after in rows:
+        print(f"{name:<20}{before * 1e3:>12.3f}{after * 1e3:>12.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Theme library at scale: bulk insert, index load and query latency over N stored themes.
+
+Themes are synthetic (random 3-10 colour palettes, two modes, a handful of
+accents and tags) and written to a throwaway SQLite file. Nearest-neighbour
+recall is checked by querying with a shuffled, slightly jittered copy of a
+stored palette and expecting that theme back first.
+
+    cd backend && python -m benchmarks.bench_library [--themes 100000] [--queries 200]
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from app.library import ThemeLibrary
+from app.theming import gamut_map_oklch, linear_to_srgb_array
+
+ACCENTS = ["#2E7FE8", "#E8572E", "#2EE88F", "#8F2EE8", "#E8C72E"]
+TAGS = ["print", "slides", "web", "dark-ui", "paper"]
+
+
+def random_palettes(rng: np.random.Generator, count: int):
+    n = rng.integers(3, 11, count)
+    L = rng.uniform(0.35, 0.85, (count, 10))
+    C = rng.uniform(0.03, 0.18, (count, 10))
+    h = rng.uniform(0, 360, (count, 10))
+    rgb = linear_to_srgb_array(gamut_map_oklch(L.ravel(), C.ravel(), h.ravel())).reshape(count, 10, 3)
+    rgb8 = np.round(rgb * 255).astype(int)
+    return [["#%02X%02X%02X" % tuple(px) for px in rgb8[i, :n[i]]] for i in range(count)]
+
+
+def theme(rng: np.random.Generator, palette):
+    mode = "light" if rng.random() < 0.5 else "dark"
+    return {
+        "name": f"t{rng.integers(1 << 30)}",
+        "mode": mode,
+        "accent": ACCENTS[rng.integers(len(ACCENTS))],
+        "seed": int(rng.integers(1 << 30)),
+        "rc_global": {
+            "axes.prop_cycle": {"key": "color", "values": palette},
+            "axes.facecolor": "#FAFAF7" if mode == "light" else "#111318",
+            "text.color": "#111111" if mode == "light" else "#EEEEEE",
+        },
+    }
+
+
+def pct(xs, q):
+    return float(np.percentile(np.asarray(xs) * 1e3, q))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--themes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lib = ThemeLibrary(Path(tmp) / "library.sqlite3")
+        palettes = random_palettes(rng, args.themes)
+        t0 = time.perf_counter()
+        for s in range(0, args.themes, 5000):
+            lib.save_many([
+                (theme(rng, p), uuid.uuid4().hex, [TAGS[rng.integers(len(TAGS))]])
+                for p in palettes[s:s + 5000]
+            ])
+        dt = time.perf_counter() - t0
+        size_mb = (Path(tmp) / "library.sqlite3").stat().st_size / 1e6
+        print(f"insert     {args.themes} themes in {dt:.1f} s ({args.themes / dt:,.0f}/s), {size_mb:.0f} MB on disk")
+
+        lib = ThemeLibrary(Path(tmp) / "library.sqlite3")  # cold: index not loaded yet
+        t0 = time.perf_counter()
+        lib.nearest(palettes[0], k=10)
+        print(f"index load + first query {(time.perf_counter() - t0) * 1e3:.0f} ms")
+
+        picks = rng.integers(0, args.themes, args.queries)
+        timings = {"nearest k=10": [], "nearest k=10 mode=dark": [], "list accent": [],
+                   "list tag": [], "list mode+accent": []}
+        hits = 0
+        for i in picks:
+            q = list(palettes[i])
+            rng.shuffle(q)
+            jitter = rng.integers(-3, 4, (len(q), 3))
+            q = ["#%02X%02X%02X" % tuple(np.clip([int(c[j:j + 2], 16) for j in (1, 3, 5)] + d, 0, 255))
+                 for c, d in zip(q, jitter)]
+            t0 = time.perf_counter()
+            res = lib.nearest(q, k=10)
+            timings["nearest k=10"].append(time.perf_counter() - t0)
+            hits += res[0]["palette"] == palettes[i]
+            t0 = time.perf_counter()
+            lib.nearest(q, k=10, mode="dark")
+            timings["nearest k=10 mode=dark"].append(time.perf_counter() - t0)
+            accent = ACCENTS[i % len(ACCENTS)]
+            for label, kw in (("list accent", {"accent": accent}), ("list tag", {"tag": TAGS[i % len(TAGS)]}),
+                              ("list mode+accent", {"mode": "light", "accent": accent})):
+                t0 = time.perf_counter()
+                lib.list(limit=50, **kw)
+                timings[label].append(time.perf_counter() - t0)
+
+        print(f"{'query':<26}{'p50 ms':>8}{'p95 ms':>8}")
+        for label, xs in timings.items():
+            print(f"{label:<26}{pct(xs, 50):>8.2f}{pct(xs, 95):>8.2f}")
+        print(f"recall@1 (shuffled + jittered stored palette): {hits / len(picks):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Palette extraction from a large reference image: full decode vs. bounded decode.
+
+"full" decodes every source pixel and subsamples afterwards; "bounded" is
+load_samples (header check, JPEG draft decode, box reduction to 256 px).
+Both feed the same Oklab mini-batch k-means and ranking. Each run happens in
+a fresh interpreter so peak RSS is per mode.
+
+    cd backend && python -m benchmarks.bench_palette [--megapixels 24]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_CHILD = r"""
+import json, sys, time
+import numpy as np
+from PIL import Image
+from app import palette_extract as pe
+
+mode, path = sys.argv[1], sys.argv[2]
+data = open(path, "rb").read()
+t0 = time.perf_counter()
+if mode == "full":
+    Image.MAX_IMAGE_PIXELS = None
+    px = np.asarray(Image.open(path).convert("RGB")).reshape(-1, 3)
+    px = px[:: max(1, len(px) // (pe.SAMPLE_EDGE ** 2))]
+    pe.load_samples = lambda data, edge=pe.SAMPLE_EDGE: (px, (0, 0))
+decode = time.perf_counter() - t0
+t1 = time.perf_counter()
+result = pe.extract_palettes(data)
+total = decode + time.perf_counter() - t1
+# VmHWM, not ru_maxrss: the latter survives exec and would report the parent's peak
+rss = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM")) / 1024
+print(json.dumps({"total": total, "rss": rss, "best": result.palettes[0]["colors"]}))
+"""
+
+
+def synthetic_image(megapixels: float, seed: int = 0) -> Image.Image:
+    """Smooth colour fields with noise: photo-like enough for JPEG and PNG to do real work."""
+    rng = np.random.default_rng(seed)
+    w = int((megapixels * 1e6 * 1.5) ** 0.5)
+    h = int(w / 1.5)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.empty((h, w, 3), np.float32)
+    for c, (fx, fy) in enumerate(((3.0, 1.0), (1.0, 2.5), (2.0, 3.5))):
+        img[..., c] = 127 + 90 * np.sin(fx * x / w * np.pi) * np.cos(fy * y / h * np.pi)
+    img += rng.normal(0, 6, size=(h, w, 1)).astype(np.float32)
+    return Image.fromarray(np.clip(img, 0, 255).astype(np.uint8), "RGB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    args = parser.parse_args()
+
+    im = synthetic_image(args.megapixels)
+    print(f"source: {im.width}x{im.height} ({im.width * im.height / 1e6:.1f} MP)")
+    print(f"{'format':<8}{'bytes':>12}{'mode':>9}{'total ms':>10}{'peak RSS MB':>13}  best palette")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("JPEG", "PNG"):
+            path = Path(tmp) / f"src.{fmt.lower()}"
+            buf = io.BytesIO()
+            im.save(buf, format=fmt, **({"quality": 90} if fmt == "JPEG" else {"compress_level": 1}))
+            path.write_bytes(buf.getvalue())
+            for mode in ("full", "bounded"):
+                out = subprocess.run(
+                    [sys.executable, "-c", _CHILD, mode, str(path)],
+                    cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+                )
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{fmt:<8}{path.stat().st_size:>12,}{mode:>9}{r['total'] * 1e3:>10.0f}"
+                      f"{r['rss']:>13.0f}  {' '.join(r['best'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Theme search throughput: one candidate at a time vs. vectorized batches.
+
+"per-candidate" builds each palette with the scalar generator
+(_generate_cycle_from_accent) and scores it with analyze_palettes, the way a
+loop around make_theme_set would; "batched" is app.search.search_palettes.
+Both report the best score found for the same number of candidates.
+
+    cd backend && python -m benchmarks.bench_search [--candidates 2000] [--batch 1024]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.analysis import analyze_palettes
+from app.search import CHROMA_SCALE, HUE_OFFSET, LIGHTNESS_SHIFT, search_palettes
+from app.theming import _generate_cycle_from_accent
+
+ACCENT, BG, FG = "#2E7FE8", "#FAFAF7", "#111111"
+
+
+def per_candidate(n: int, n_colors: int) -> float:
+    rng = np.random.default_rng(0)
+    best = 0.0
+    for _ in range(n):
+        pal = _generate_cycle_from_accent(
+            ACCENT, n_colors, "light",
+            hue_offset_deg=rng.uniform(*HUE_OFFSET),
+            lightness_shift=rng.uniform(*LIGHTNESS_SHIFT),
+            chroma_scale=rng.uniform(*CHROMA_SCALE),
+        )
+        best = max(best, analyze_palettes([pal], [BG], [FG])[0].score)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--colors", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1024)
+    args = parser.parse_args()
+
+    print(f"{'mode':<16}{'candidates':>11}{'ms':>9}{'cand/s':>10}{'best score':>12}")
+    t0 = time.perf_counter()
+    best = per_candidate(args.candidates, args.colors)
+    dt = time.perf_counter() - t0
+    print(f"{'per-candidate':<16}{args.candidates:>11}{dt * 1e3:>9.0f}{args.candidates / dt:>10.0f}{best:>12.4f}")
+
+    for n in (args.candidates, args.candidates * 10):
+        ranked, stats = search_palettes(ACCENT, BG, "light", args.colors, top_k=1, candidates=n, batch=args.batch)
+        print(f"{'batched':<16}{n:>11}{stats.elapsed_ms:>9.0f}"
+              f"{n / stats.elapsed_ms * 1e3:>10.0f}{ranked[0].score:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
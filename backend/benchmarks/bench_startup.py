@@ -0,0 +1,67 @@
+"""Cold-start and first-request latency of a fresh worker process.
+
+Each trial spawns a new interpreter that imports `app.main`, runs the lifespan
+(font registration + warm-up) and then times the first and second /api/render
+calls, with THEMELAB_WARMUP on and off.
+
+    cd backend && python -m benchmarks.bench_startup [--trials 3] [--dpi 200]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_CHILD = r"""
+import json, time, warnings, logging
+warnings.simplefilter("ignore"); logging.disable(logging.WARNING)
+t0 = time.perf_counter()
+import app.main
+t_import = time.perf_counter() - t0
+from fastapi.testclient import TestClient
+t0 = time.perf_counter()
+with TestClient(app.main.app) as c:
+    t_ready = time.perf_counter() - t0
+    themes = c.post("/api/json/themes/generate", json={"dpi": DPI}).json()
+    t0 = time.perf_counter(); c.post("/api/json/render", json=themes[0]).raise_for_status()
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter(); c.post("/api/json/render", json=themes[1]).raise_for_status()
+    t_second = time.perf_counter() - t0
+print(json.dumps({"import_s": t_import, "startup_s": t_ready,
+                  "first_render_s": t_first, "second_render_s": t_second}))
+"""
+
+
+def run_trial(warmup: bool, dpi: int) -> Dict[str, float]:
+    env = dict(os.environ, THEMELAB_WARMUP="1" if warmup else "0")
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD.replace("DPI", str(dpi))],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    cols = ["import_s", "startup_s", "first_render_s", "second_render_s"]
+    print(f"{'warm-up':<10}" + "".join(f"{c:>18}" for c in cols) + f"{'ready+first':>14}")
+    for warmup in (False, True):
+        trials: List[Dict[str, float]] = [run_trial(warmup, args.dpi) for _ in range(args.trials)]
+        med = {c: statistics.median(t[c] for t in trials) for c in cols}
+        total = med["import_s"] + med["startup_s"] + med["first_render_s"]
+        print(f"{'on' if warmup else 'off':<10}" + "".join(f"{med[c]:>18.3f}" for c in cols) + f"{total:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
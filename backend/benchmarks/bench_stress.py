@@ -0,0 +1,155 @@
+"""Large-data stress figures: render time (and vector output size) versus N for each theme.
+
+Renders the data-heavy demo figures (app.stress) at each --sizes N for every
+theme of a make_theme_set draw, in each --modes mode:
+  plain      one artist vertex/marker per data point
+  decimate   lines reduced to first/min/max/last per pixel column (line, time-series)
+  density    scatter drawn as a 2-D histogram image
+  rasterize  rasterized=True on the data artists; measured for vector --formats only
+PNG goes through the production path (render_figure_levels, 'preview' level);
+SVG and PDF through savefig. Modes that do not change a figure are skipped.
+Each cell is the median of --repeat renders. Themes differ in stroke width,
+alpha and markers, which is where large data hurts most.
+
+    cd backend && python -m benchmarks.bench_stress
+    cd backend && python -m benchmarks.bench_stress --sizes 1e4,1e5,1e6 --formats png,svg --figures 01_line.png 02_scatter.png
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import matplotlib as mpl
+
+mpl.use("agg", force=True)
+
+from app.figures import FigureSpec, figure_rng, new_figure, release_figure, render_figure_levels  # noqa: E402
+from app.fonts import apply_font_chain  # noqa: E402
+from app.stress import StressOptions, build_stress_specs  # noqa: E402
+from app.theming import ensure_colormap, make_theme_set, register_fonts  # noqa: E402
+
+MODES = ("plain", "decimate", "density", "rasterize")
+FORMATS = ("png", "svg", "pdf")
+# The figures each mode changes (rasterize: everything but the heatmap, which is an image anyway)
+AFFECTS = {
+    "decimate": {"01_line.png", "09_timeseries.png"},
+    "density": {"02_scatter.png"},
+    "rasterize": {"01_line.png", "02_scatter.png", "04_hist.png", "08_box.png", "09_timeseries.png"},
+}
+
+
+def render_once(spec: FigureSpec, index: int, theme_rc: dict, seed: int, fmt: str) -> Tuple[float, int]:
+    """(seconds, output bytes) for one render of `spec`."""
+    t0 = time.perf_counter()
+    if fmt == "png":
+        out = render_figure_levels(spec, index, theme_rc, seed, "png", ("preview",))
+        return time.perf_counter() - t0, sum(len(b) for b in out.values())
+    rc = theme_rc | spec.rc_mod
+    ensure_colormap(rc.get("image.cmap"))
+    with mpl.rc_context(apply_font_chain(rc)):
+        fig = new_figure()
+        try:
+            spec.generator(fig.add_subplot(), figure_rng(seed, index))
+            buf = io.BytesIO()
+            fig.savefig(buf, format=fmt)
+        finally:
+            release_figure(fig)
+    return time.perf_counter() - t0, buf.tell()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1e3,1e4,1e5,1e6", help="comma-separated N")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--formats", default="png", help=f"comma-separated, from {', '.join(FORMATS)}")
+    parser.add_argument("--figures", nargs="*", help="only these filenames (default: every stress figure)")
+    parser.add_argument("--themes", type=int, default=6, help="first N themes of the set")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    modes = [m for m in args.modes.split(",") if m]
+    formats = [f for f in args.formats.split(",") if f]
+    for name, given, allowed in (("mode", modes, MODES), ("format", formats, FORMATS)):
+        bad = set(given) - set(allowed)
+        if bad:
+            parser.error(f"unknown {name}(s) {sorted(bad)}; choose from {', '.join(allowed)}")
+
+    register_fonts()
+    themes = make_theme_set(
+        fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+        dpi=args.dpi, user_style_bytes=None, seed=args.seed,
+    )[: args.themes]
+    # Pay one-off costs (fonts, mathtext, colormaps) outside the timings
+    for i, spec in build_stress_specs(StressOptions(n=100)):
+        render_once(spec, i, themes[0].rc_global, themes[0].seed, "png")
+
+    # (theme, figure, mode, format) -> {N: (median seconds, bytes)}
+    results: Dict[Tuple[str, str, str, str], Dict[int, Tuple[float, int]]] = {}
+    for theme in themes:
+        for n in sizes:
+            for mode in modes:
+                opts = StressOptions(n=n, decimate=mode == "decimate", density=mode == "density",
+                                     rasterize=mode == "rasterize")
+                for i, spec in build_stress_specs(opts):
+                    if args.figures and spec.filename not in args.figures:
+                        continue
+                    if mode != "plain" and spec.filename not in AFFECTS[mode]:
+                        continue
+                    for fmt in formats:
+                        if mode == "rasterize" and fmt == "png":
+                            continue  # identical to plain
+                        runs = [render_once(spec, i, theme.rc_global, theme.seed, fmt) for _ in range(args.repeat)]
+                        results.setdefault((theme.name, spec.filename, mode, fmt), {})[n] = (
+                            statistics.median(r[0] for r in runs), runs[-1][1],
+                        )
+                        print(f"  {theme.name[:24]:<24} {spec.filename:<18} {mode:<10} {fmt:<4} n={n:<9,} "
+                              f"{runs[-1][0] * 1e3:9.0f} ms", flush=True)
+
+    header = "".join(f"{f'n={n:.0e}':>15}" for n in sizes)
+    print(f"\n{args.dpi} dpi, median of {args.repeat}; ms (KB for SVG/PDF)")
+    print(f"{'theme':<26}{'figure':<19}{'mode':<11}{'fmt':<5}{header}")
+    for (theme, fn, mode, fmt), by_n in results.items():
+        cells = ""
+        for n in sizes:
+            if n not in by_n:
+                cells += f"{'-':>15}"
+                continue
+            s, nbytes = by_n[n]
+            cells += f"{s * 1e3:>15.0f}" if fmt == "png" else f"{f'{s * 1e3:.0f} ({nbytes / 1024:.0f})':>15}"
+        print(f"{theme[:25]:<26}{fn:<19}{mode:<11}{fmt:<5}{cells}")
+
+    # Across themes: how much each mode saves over plain at the largest N
+    top = max(sizes)
+    print(f"\nspeed-up over plain at n={top:,} (median across themes)")
+    for (theme, fn, mode, fmt), by_n in results.items():
+        if mode == "plain" or theme != themes[0].name:
+            continue
+        ratios = [
+            results[(t.name, fn, "plain", fmt)][top][0] / results[(t.name, fn, mode, fmt)][top][0]
+            for t in themes
+            if (t.name, fn, "plain", fmt) in results and top in results[(t.name, fn, mode, fmt)]
+        ]
+        if ratios:
+            print(f"  {fn:<18} {mode:<10} {fmt:<4} {statistics.median(ratios):6.1f}x")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "options": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "results": [
+                {"theme": theme, "figure": fn, "mode": mode, "format": fmt, "n": n,
+                 "seconds": round(s, 4), "bytes": nbytes}
+                for (theme, fn, mode, fmt), by_n in results.items() for n, (s, nbytes) in by_n.items()
+            ],
+        }, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
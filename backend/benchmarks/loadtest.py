@@ -0,0 +1,319 @@
+"""Load generator: replay a generate/render/download mix against a local app.main:app.
+
+Starts `uvicorn app.main:app` on a free port (with --workers N) unless --url
+points at a running instance. Virtual users then loop for --duration seconds:
+pick an endpoint by --mix weight, send it, and wait an exponentially
+distributed think time. Render and download bodies come from a pool of
+--themes themes built with make_theme_set under varied seeds and accents. A
+small pool means mostly render-cache hits, a large one mostly cold renders.
+The report gives throughput and p50/p95/p99 latency per endpoint, plus the
+resident memory of the whole server process tree (uvicorn workers and render
+pool).
+
+    cd backend && python -m benchmarks.loadtest --concurrency 8 --duration 60
+    cd backend && python -m benchmarks.loadtest --workers 2 --mix render=8,download=1,generate=1 --themes 24
+    cd backend && python -m benchmarks.loadtest --url http://127.0.0.1:8000 --server-pid 1234 --json out.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ENDPOINTS = {
+    "generate": "/api/json/themes/generate",
+    "render": "/api/json/render",
+    "download": "/api/json/download",
+}
+ACCENTS = ["#2E7FE8", "#E8562E", "#2EB67D", "#9B5DE5", "#F2A900", "#D7263D", "#1B998B", "#3D5A80"]
+
+
+# -------------------------
+# Traffic
+# -------------------------
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'render=6,generate=1,download=1' -> endpoint weights."""
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {name!r} in --mix; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def build_themes(n: int, dpi: int, seed: int) -> List[dict]:
+    """`n` serialized themes from make_theme_set, six per (seed, accent) draw."""
+    from app.theming import make_theme_set
+    from app.utils import loads
+
+    rng = random.Random(seed)
+    themes: List[dict] = []
+    while len(themes) < n:
+        batch = make_theme_set(
+            fg="#111111", bg="#FAFAF7", accent=rng.choice(ACCENTS), base_palette=None,
+            dpi=dpi, user_style_bytes=None, seed=rng.randrange(2**31),
+        )
+        themes += [loads(t.to_json()) for t in batch]
+    return themes[:n]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    started: float  # seconds since the run began
+    latency: float
+    status: int  # 0 = transport error / timeout
+    nbytes: int
+
+
+async def virtual_user(
+    user: str,
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    themes: List[dict],
+    args: argparse.Namespace,
+    rng: random.Random,
+    t_start: float,
+    deadline: float,
+    samples: List[Sample],
+) -> None:
+    names, weights = list(mix), list(mix.values())
+    headers = {"X-Themelab-Client": user}  # each virtual user is its own client to the fair scheduler
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(names, weights)[0]
+        if endpoint == "generate":
+            body: object = {"dpi": args.dpi, "seed": rng.randrange(2**31), "accent": rng.choice(ACCENTS)}
+        else:
+            body = rng.choice(themes)
+        t0 = time.perf_counter()
+        try:
+            res = await client.post(ENDPOINTS[endpoint], json=body, headers=headers)
+            status, nbytes = res.status_code, len(res.content)
+        except httpx.HTTPError:
+            status, nbytes = 0, 0
+        samples.append(Sample(endpoint, t0 - t_start, time.perf_counter() - t0, status, nbytes))
+        if args.think_ms > 0:
+            await asyncio.sleep(rng.expovariate(1e3 / args.think_ms))
+
+
+async def run_load(
+    base_url: str, mix: Dict[str, float], themes: List[dict], args: argparse.Namespace
+) -> Tuple[List[Sample], float]:
+    samples: List[Sample] = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        t_start = time.perf_counter()
+        deadline = t_start + args.warmup + args.duration
+        await asyncio.gather(*(
+            virtual_user(f"vu{i}", client, mix, themes, args, random.Random(args.seed * 1000 + i), t_start, deadline, samples)
+            for i in range(args.concurrency)
+        ))
+        wall = time.perf_counter() - t_start
+    return samples, wall
+
+
+# -------------------------
+# Server process & memory
+# -------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=dict(os.environ))
+
+
+def wait_ready(base_url: str, proc: Optional[subprocess.Popen], timeout: float = 180.0) -> float:
+    """Seconds until /api/health answers (the lifespan warm-up runs first)."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(base_url + "/api/health", timeout=5).status_code == 200:
+                return time.perf_counter() - t0
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"server not ready after {timeout:.0f} s")
+
+
+def tree_rss_bytes(root: int) -> int:
+    """Resident memory of `root` and all its descendants (Linux /proc)."""
+    children: Dict[int, List[int]] = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        stack += children.get(pid, [])
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.5) -> None:
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.samples: List[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.samples.append(tree_rss_bytes(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+# -------------------------
+# Report
+# -------------------------
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))]
+
+
+def summarize(samples: List[Sample], window: float) -> Dict[str, dict]:
+    by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+    for s in samples:
+        by_endpoint[s.endpoint].append(s)
+        by_endpoint["all"].append(s)
+    out: Dict[str, dict] = {}
+    for name, group in sorted(by_endpoint.items(), key=lambda kv: (kv[0] == "all", kv[0])):
+        ok = sorted(s.latency * 1e3 for s in group if 200 <= s.status < 400)
+        out[name] = {
+            "requests": len(group),
+            "errors": sum(1 for s in group if not 200 <= s.status < 400),
+            "rps": round(len(ok) / window, 3),
+            "p50_ms": round(percentile(ok, 50), 1),
+            "p95_ms": round(percentile(ok, 95), 1),
+            "p99_ms": round(percentile(ok, 99), 1),
+            "max_ms": round(ok[-1], 1) if ok else float("nan"),
+            "mean_kb": round(sum(s.nbytes for s in group) / max(1, len(group)) / 1024, 1),
+        }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="with --url: pid whose process tree RSS to report")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the local server")
+    parser.add_argument("--concurrency", type=int, default=4, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=0.0, help="seconds of load before measuring starts")
+    parser.add_argument("--think-ms", type=float, default=250.0, help="mean think time between a user's requests")
+    parser.add_argument("--mix", default="render=6,generate=2,download=1")
+    parser.add_argument("--themes", type=int, default=12, help="distinct themes rendered/downloaded")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    themes = build_themes(args.themes, args.dpi, args.seed)
+
+    proc: Optional[subprocess.Popen] = None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.server_pid
+    else:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = start_server(args.workers, port)
+        pid = proc.pid
+    try:
+        ready_s = wait_ready(base_url, proc)
+        rss = RssSampler(pid) if pid else None
+        rss_idle = tree_rss_bytes(pid) if pid else None
+        if rss:
+            rss.start()
+        samples, wall = asyncio.run(run_load(base_url, mix, themes, args))
+        if rss:
+            rss.stop()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    measured = [s for s in samples if s.started >= args.warmup]
+    window = max(1e-9, wall - args.warmup)
+    stats = summarize(measured, window)
+    memory = None
+    if rss and rss.samples:
+        memory = {
+            "idle_mb": round(rss_idle / 2**20, 1),
+            "peak_mb": round(max(rss.samples) / 2**20, 1),
+            "end_mb": round(rss.samples[-1] / 2**20, 1),
+        }
+
+    print(f"{base_url}  workers={args.workers if proc else '?'}  users={args.concurrency}  "
+          f"think={args.think_ms:.0f} ms  themes={args.themes}  window={window:.1f} s  ready in {ready_s:.1f} s")
+    print(f"{'endpoint':<10}{'reqs':>6}{'err':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'KB':>8}")
+    for name, r in stats.items():
+        print(f"{name:<10}{r['requests']:>6}{r['errors']:>5}{r['rps']:>8.2f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}{r['mean_kb']:>8.1f}")
+    if memory:
+        print(f"server RSS (process tree): idle {memory['idle_mb']} MB, peak {memory['peak_mb']} MB, "
+              f"end {memory['end_mb']} MB")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "options": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "ready_s": round(ready_s, 2),
+            "window_s": round(window, 2),
+            "endpoints": stats,
+            "memory": memory,
+        }, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
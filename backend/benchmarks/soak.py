@@ -0,0 +1,114 @@
+"""Soak test: render many themes in one process and assert that memory stays flat.
+
+Each iteration renders every figure of one theme through the production path
+(render_all -> render_figure_levels) under a fresh seed and accent, then
+clears the render cache so the cache's own growth is not mistaken for a leak.
+RSS, live figures and pyplot-registered figures are sampled after each theme.
+After --warmup themes (font, glyph, colormap and mathtext caches filling up),
+the RSS trend must stay under --max-growth-mb over the run and under
+--max-slope-kb per theme, gc-tracked Python objects may not grow by more than
+--max-object-growth, and no figure may outlive its render. Exits 1 otherwise.
+Short runs overstate the RSS slope: allocator and FreeType caches keep
+settling for a few hundred themes after the warm-up.
+
+    cd backend && python -m benchmarks.soak                       # 10k themes, several hours on one core
+    cd backend && python -m benchmarks.soak --themes 300 --figures 01_line.png 06_polar.png 10_gridspec.png
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import matplotlib as mpl
+
+mpl.use("agg", force=True)
+
+from app.cache import RENDER_CACHE  # noqa: E402
+from app.figures import render_all  # noqa: E402
+from app.memguard import GUARD, current_rss  # noqa: E402
+from app.theming import make_theme_set, register_fonts  # noqa: E402
+
+ACCENTS = ["#2E7FE8", "#E8562E", "#2EB67D", "#9B5DE5", "#F2A900", "#D7263D", "#1B998B", "#3D5A80"]
+
+
+def slope(xs: List[float], ys: List[float]) -> float:
+    """Least-squares slope of ys over xs."""
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--themes", type=int, default=10_000)
+    parser.add_argument("--warmup", type=int, default=200, help="themes excluded from the trend")
+    parser.add_argument("--dpi", type=int, default=40)
+    parser.add_argument("--figures", nargs="*", help="render only these filenames (default: all ten)")
+    parser.add_argument("--max-growth-mb", type=float, default=16.0, help="allowed RSS trend over the run")
+    parser.add_argument("--max-slope-kb", type=float, default=2.0, help="allowed RSS trend per theme")
+    parser.add_argument("--max-object-growth", type=int, default=2000, help="allowed growth in gc-tracked objects")
+    parser.add_argument("--report-every", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the RSS series and verdict here")
+    args = parser.parse_args()
+    if args.themes <= args.warmup + 10:
+        parser.error("--themes must exceed --warmup by at least 10")
+
+    register_fonts()
+    rng = random.Random(args.seed)
+    themes: List = []
+    rss: List[float] = []  # MB after each theme
+    worst_live = 0
+    objects_after_warmup = 0
+    t0 = time.perf_counter()
+    for n in range(args.themes):
+        if not themes:
+            themes = make_theme_set(
+                fg="#111111", bg="#FAFAF7", accent=rng.choice(ACCENTS), base_palette=None,
+                dpi=args.dpi, user_style_bytes=None, seed=rng.randrange(2**31),
+            )
+        theme = themes.pop()
+        render_all(theme.rc_global, theme.seed, only=args.figures)
+        RENDER_CACHE.clear()
+        gc.collect()  # figures sit in reference cycles; only one surviving a full collection is leaked
+        rss.append(current_rss() / 2**20)
+        stats = GUARD.stats()
+        worst_live = max(worst_live, stats["live_figures"] + stats["pyplot_figures"])
+        if n + 1 == max(args.warmup, 1):
+            objects_after_warmup = len(gc.get_objects())
+        if (n + 1) % args.report_every == 0 or n + 1 == args.themes:
+            rate = (n + 1) / (time.perf_counter() - t0)
+            print(f"{n + 1:>7} themes  {rate:6.1f}/s  rss {rss[-1]:7.1f} MB  "
+                  f"live figures {stats['live_figures']}  pyplot {stats['pyplot_figures']}", flush=True)
+
+    object_growth = len(gc.get_objects()) - objects_after_warmup
+    xs = list(range(args.warmup, args.themes))
+    trend = slope(xs, rss[args.warmup:])
+    growth = trend * len(xs)
+    checks: Dict[str, bool] = {
+        f"RSS trend {growth:+.1f} MB over {len(xs)} themes <= {args.max_growth_mb} MB": growth <= args.max_growth_mb,
+        f"RSS slope {trend * 1024:+.2f} KB/theme <= {args.max_slope_kb} KB": trend * 1024 <= args.max_slope_kb,
+        f"gc-tracked objects {object_growth:+d} <= {args.max_object_growth}": object_growth <= args.max_object_growth,
+        f"no figure outlived its render (worst {worst_live})": worst_live == 0,
+    }
+    print(f"rss after warm-up {rss[args.warmup]:.1f} MB, end {rss[-1]:.1f} MB, peak {max(rss):.1f} MB")
+    for label, ok in checks.items():
+        print(f"{'PASS' if ok else 'FAIL'}  {label}")
+    if args.json:
+        args.json.write_text(json.dumps({
+            "options": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "rss_mb": [round(v, 2) for v in rss],
+            "checks": checks,
+        }, indent=2) + "\n")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
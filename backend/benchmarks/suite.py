@@ -0,0 +1,368 @@
+"""Offline benchmark suite: every pipeline stage timed separately, compared against a baseline.
+
+Stages: theme generation, Oklab helpers, rc (de)serialization, span overhead, each of the ten
+figures (build, draw and encode timed separately), bundle assembly with
+ZipBuilder, and the JSON endpoints end to end through an in-process ASGI
+client. Results are written as JSON; when a baseline exists, each case's median
+is compared with it and the exit status is 1 if any case regressed by more than
+--threshold (relative) and --min-delta-ms (absolute).
+
+    cd backend && python -m benchmarks.suite                  # run, compare with benchmarks/baseline.json
+    cd backend && python -m benchmarks.suite --save-baseline  # run and make this the new baseline
+    cd backend && python -m benchmarks.suite --only figures --repeat 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import matplotlib as mpl
+
+mpl.use("agg", force=True)
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUT = BENCH_DIR / "results" / "latest.json"
+GROUPS = ("theming", "color", "rc", "metrics", "figures", "bundle", "api")
+
+Samples = Dict[str, List[float]]  # case name -> wall times in seconds
+
+
+# -------------------------
+# Timing
+# -------------------------
+
+
+def _time(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """`repeat` timed calls after one untimed warm-up call; `setup` runs untimed before each."""
+    out: List[float] = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        if i:
+            out.append(time.perf_counter() - t0)
+    return out
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ms = sorted(s * 1e3 for s in samples)
+    return {
+        "median_ms": round(statistics.median(ms), 4),
+        "min_ms": round(ms[0], 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(0.95 * len(ms)))], 4),
+        "n": len(ms),
+    }
+
+
+# -------------------------
+# Cases
+# -------------------------
+
+
+def _theme(dpi: int):
+    from app.theming import make_theme_set
+
+    return make_theme_set(
+        fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+        dpi=dpi, user_style_bytes=None, seed=42,
+    )[0]
+
+
+def bench_theming(repeat: int, dpi: int) -> Samples:
+    from app.theming import make_theme_set
+
+    return {
+        "theming.make_theme_set": _time(lambda: make_theme_set(
+            fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+            dpi=dpi, user_style_bytes=None, seed=42,
+        ), repeat),
+    }
+
+
+def bench_color(repeat: int, dpi: int) -> Samples:
+    from app.theming import (
+        linear_to_oklab_array,
+        oklab_to_linear_array,
+        oklch_to_srgb_hex,
+        sequential_lut,
+        srgb_hex_to_oklch,
+        srgb_to_linear_array,
+    )
+
+    palette = _theme(dpi).palette
+    pixels = np.random.default_rng(0).random((256 * 256, 3))
+
+    def scalar_roundtrip() -> None:
+        for h in palette:
+            oklch_to_srgb_hex(*srgb_hex_to_oklch(h))
+
+    return {
+        "color.oklch_roundtrip_scalar": _time(scalar_roundtrip, repeat),
+        "color.srgb_to_oklab_array_64k": _time(
+            lambda: linear_to_oklab_array(srgb_to_linear_array(pixels)), repeat),
+        "color.oklab_to_linear_array_64k": _time(lambda: oklab_to_linear_array(pixels), repeat),
+        "color.sequential_lut": _time(lambda: sequential_lut("#2E7FE8", "#FAFAF7"), repeat),
+    }
+
+
+def bench_rc(repeat: int, dpi: int) -> Samples:
+    from app.rcnorm import normalize_rc, rc_deserialize, rc_digest, validate_rc
+    from app.rcvalidate import RcValidator
+    from app.utils import dumps, loads
+
+    rc = _theme(dpi).rc_global
+    blob = dumps(rc)
+    raw = loads(blob)
+    return {
+        "rc.serialize": _time(lambda: dumps(rc), repeat),
+        "rc.deserialize": _time(lambda: rc_deserialize(loads(blob)), repeat),
+        "rc.validate": _time(lambda: validate_rc(raw), repeat),
+        "rc.validate_cold": _time(lambda: RcValidator().validate(raw), repeat),
+        "rc.digest": _time(lambda: rc_digest(rc), repeat),
+        "rc.normalize_memo_hit": _time(lambda: normalize_rc(raw), repeat),
+    }
+
+
+def bench_metrics(repeat: int, dpi: int) -> Samples:
+    """Instrumentation overhead: 1000 spans (a cold ten-figure render opens about 50)."""
+    from app.metrics import render_prometheus, span
+
+    def spans() -> None:
+        for _ in range(1000):
+            with span("bench"):
+                pass
+
+    return {
+        "metrics.span_x1000": _time(spans, repeat),
+        "metrics.render_prometheus": _time(render_prometheus, repeat),
+    }
+
+
+def bench_figures(repeat: int, dpi: int) -> Samples:
+    from app.encoding import DOWNLOAD_CODEC, PREVIEW_CODEC, encode_image, figure_image, get_codec
+    from app.figures import build_figure_specs, figure_rng
+    from app.fonts import apply_font_chain
+    from app.theming import ensure_colormap
+
+    theme = _theme(dpi)
+    codecs = {name: get_codec(name) for name in (PREVIEW_CODEC, DOWNLOAD_CODEC)}
+    out: Samples = {}
+    for i, spec in enumerate(build_figure_specs()):
+        stem = spec.filename.rsplit(".", 1)[0]
+        rc = theme.rc_global | spec.rc_mod
+        ensure_colormap(rc.get("image.cmap"))
+        build: List[float] = []
+        draw: List[float] = []
+        encode: Dict[str, List[float]] = {name: [] for name in codecs}
+        with mpl.rc_context(apply_font_chain(rc)):
+            for r in range(repeat + 1):
+                t0 = time.perf_counter()
+                fig, ax = plt.subplots()
+                spec.generator(ax, figure_rng(theme.seed, i))
+                t1 = time.perf_counter()
+                try:
+                    im, dpi = figure_image(fig)
+                    t2 = time.perf_counter()
+                    for name, codec in codecs.items():
+                        t3 = time.perf_counter()
+                        encode_image(im, codec, dpi)
+                        if r:
+                            encode[name].append(time.perf_counter() - t3)
+                finally:
+                    plt.close(fig)
+                if r:  # the first pass warms fonts, colormaps and caches
+                    build.append(t1 - t0)
+                    draw.append(t2 - t1)
+        out[f"figures.{stem}.build"] = build
+        out[f"figures.{stem}.draw"] = draw
+        for name, samples in encode.items():
+            out[f"figures.{stem}.encode_{name}"] = samples
+    return out
+
+
+def bench_bundle(repeat: int, dpi: int) -> Samples:
+    """Zip assembly alone: pre-rendered figures + theme files, as /download writes them."""
+    from app.encoding import DOWNLOAD_CODEC
+    from app.figures import render_all
+    from app.utils import ZipBuilder
+
+    theme = _theme(dpi)
+    figures = render_all(theme.rc_global, theme.seed, codec=DOWNLOAD_CODEC)
+    theme_json = theme.to_json()
+
+    def bundle() -> bytes:
+        zb = ZipBuilder()
+        for fn, data in sorted(figures.items()):
+            zb.write_bytes(f"figures/{fn}", data)
+        zb.write_text("theme.json", theme_json)
+        zb.write_text(f"themes/{theme.slug}.mplstyle", theme.base_style_text)
+        return zb.close()
+
+    return {"bundle.zip": _time(bundle, repeat)}
+
+
+def bench_api(repeat: int, dpi: int) -> Samples:
+    os.environ.setdefault("THEMELAB_WARMUP", "0")
+    from fastapi.testclient import TestClient
+
+    from app.cache import RENDER_CACHE
+    from app.main import app
+
+    out: Samples = {}
+    with TestClient(app) as client:
+        def post(path: str, body: object) -> object:
+            res = client.post(path, json=body)
+            res.raise_for_status()
+            return res
+
+        gen = {"dpi": dpi, "seed": 42}
+        theme = post("/api/json/themes/generate", gen).json()[0]
+        out["api.generate"] = _time(lambda: post("/api/json/themes/generate", gen), repeat)
+        out["api.render.cold"] = _time(
+            lambda: post("/api/json/render", theme), repeat, setup=RENDER_CACHE.clear)
+        out["api.render.cached"] = _time(lambda: post("/api/json/render", theme), repeat)
+        out["api.download.cold"] = _time(
+            lambda: post("/api/json/download", theme), repeat, setup=RENDER_CACHE.clear)
+        out["api.download.cached"] = _time(lambda: post("/api/json/download", theme), repeat)
+    return out
+
+
+BENCHES: Dict[str, Callable[[int, int], Samples]] = {
+    "theming": bench_theming,
+    "color": bench_color,
+    "rc": bench_rc,
+    "metrics": bench_metrics,
+    "figures": bench_figures,
+    "bundle": bench_bundle,
+    "api": bench_api,
+}
+
+
+# -------------------------
+# Results & baseline comparison
+# -------------------------
+
+
+def environment() -> Dict[str, object]:
+    import fastapi
+    import PIL
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "matplotlib": mpl.__version__,
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "fastapi": fastapi.__version__,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    min_delta_ms: float,
+) -> List[Dict[str, object]]:
+    """One row per case: status is ok, regressed, improved, new or missing (baseline only)."""
+    rows: List[Dict[str, object]] = []
+    for name in sorted(set(results) | set(baseline)):
+        cur, ref = results.get(name), baseline.get(name)
+        if cur is None or ref is None:
+            rows.append({"case": name, "status": "missing" if cur is None else "new",
+                         "median_ms": cur and cur["median_ms"], "baseline_ms": ref and ref["median_ms"]})
+            continue
+        delta = cur["median_ms"] - ref["median_ms"]
+        ratio = cur["median_ms"] / ref["median_ms"] if ref["median_ms"] > 0 else float("inf")
+        status = "ok"
+        if abs(delta) >= min_delta_ms:
+            if ratio > 1 + threshold:
+                status = "regressed"
+            elif ratio < 1 / (1 + threshold):
+                status = "improved"
+        rows.append({"case": name, "status": status, "median_ms": cur["median_ms"],
+                     "baseline_ms": ref["median_ms"], "ratio": round(ratio, 3)})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (after one warm-up)")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--only", nargs="*", choices=GROUPS, help="run these groups only")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help="where to write this run's JSON")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="also write this run to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slow-down that counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore differences smaller than this, whatever the ratio")
+    args = parser.parse_args(argv)
+
+    from app.theming import register_fonts
+
+    register_fonts()
+    results: Dict[str, Dict[str, float]] = {}
+    for group in args.only or GROUPS:
+        t0 = time.perf_counter()
+        for name, samples in BENCHES[group](args.repeat, args.dpi).items():
+            results[name] = summarize(samples)
+        print(f"{group:<10}{len([n for n in results if n.startswith(group + '.')]):>4} cases "
+              f"in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+    run = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "options": {"repeat": args.repeat, "dpi": args.dpi, "groups": list(args.only or GROUPS)},
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(run, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+
+    if args.save_baseline or not args.baseline.exists():
+        print(f"{'case':<40}{'median ms':>11}{'p95 ms':>10}")
+        for name, r in results.items():
+            print(f"{name:<40}{r['median_ms']:>11.2f}{r['p95_ms']:>10.2f}")
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}; rerun with --save-baseline to create one")
+        return 0
+
+    base = json.loads(args.baseline.read_text())
+    for key, ref in base.get("environment", {}).items():
+        cur = run["environment"].get(key)
+        if cur != ref:
+            print(f"note: {key} {ref} -> {cur}")
+    wanted = set(results) if args.only else None  # a partial run only compares what it ran
+    baseline = {k: v for k, v in base["results"].items() if wanted is None or k in wanted}
+    rows = compare(results, baseline, args.threshold, args.min_delta_ms)
+    print(f"{'case':<40}{'median ms':>11}{'baseline':>10}{'ratio':>8}  status")
+    for row in rows:
+        cur = f"{row['median_ms']:>11.2f}" if row["median_ms"] is not None else f"{'-':>11}"
+        ref = f"{row['baseline_ms']:>10.2f}" if row["baseline_ms"] is not None else f"{'-':>10}"
+        ratio = f"{row['ratio']:>8.2f}" if "ratio" in row else f"{'-':>8}"
+        print(f"{row['case']:<40}{cur}{ref}{ratio}  {row['status']}")
+    regressed = [r["case"] for r in rows if r["status"] == "regressed"]
+    if regressed:
+        print(f"{len(regressed)} regression(s) over {args.threshold:.0%} and {args.min_delta_ms} ms: "
+              + ", ".join(regressed))
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import os
+
+# Before any app import: no warm-up renders, no shared store, no rc cache file under ~/.cache
+os.environ["MPLBACKEND"] = "agg"
+os.environ["THEMELAB_WARMUP"] = "0"
+os.environ["THEMELAB_RC_CACHE"] = "0"
+os.environ.pop("THEMELAB_STORE_DIR", None)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def themes():
+    """One make_theme_set draw at a small dpi: three light and three dark themes."""
+    from app.theming import make_theme_set, register_fonts
+
+    register_fonts()
+    return make_theme_set(
+        fg="#111111", bg="#FAFAF7", accent="#2E7FE8", base_palette=None,
+        dpi=40, user_style_bytes=None, seed=7,
+    )
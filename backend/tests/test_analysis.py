@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import analysis
+from app.analysis import analyze_image, simulate_image
+from app.main import app
+
+
+def test_analyze_image_matches_simulate_image():
+    rgba = np.random.default_rng(0).integers(0, 256, (40, 60, 4), dtype=np.uint8)
+    sims, shift = analyze_image(rgba)
+    assert set(sims) == set(shift) == {"protan", "deutan", "tritan"}
+    for v, px in sims.items():
+        assert np.array_equal(px, simulate_image(rgba, v))
+        assert shift[v] > 0
+    assert analyze_image(np.full((4, 4, 4), 128, np.uint8))[1]["protan"] < 0.1
+
+
+def test_figure_analysis_runs_off_the_event_loop(themes, monkeypatch):
+    on_loop = []
+
+    def record(rgba):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return analyze_image(rgba)
+
+    monkeypatch.setattr(analysis, "analyze_image", record)
+    rc = {k: v for k, v in themes[0].rc_global.items() if k != "axes.prop_cycle"}  # a cycler, not JSON
+    resp = TestClient(app).post(
+        "/api/json/analyze/figure", params={"filename": "01_line.png", "level": "thumb"},
+        json={"rc_global": rc, "seed": 7},
+    )
+    assert resp.status_code == 200, resp.text
+    assert set(resp.json()["simulations"]) == {"protan", "deutan", "tritan"}
+    assert on_loop == [False]
+
+
+def test_generated_theme_sets_are_built_off_the_event_loop(monkeypatch):
+    from app import main
+
+    on_loop = []
+    generate = main._generate
+
+    def record(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return generate(*args)
+
+    monkeypatch.setattr(main, "_generate", record)
+    client = TestClient(app)
+    resp = client.post("/api/json/analyze", json={"generate": {"dpi": 40, "search": 4}})
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()["reports"]) == len(resp.json()["themes"])
+    assert on_loop == [False]
+    assert client.post("/api/json/analyze", json={}).status_code == 400
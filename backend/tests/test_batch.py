@@ -0,0 +1,36 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from app import batch
+from app.cache import RENDER_CACHE
+
+
+class BreakingPool:
+    """Resolves each cell at once: figure 0 breaks the pool, figure 1 never finishes."""
+
+    def submit(self, fn, index, theme_rc, seed, codec, levels):
+        fut = Future()
+        if index == 0:
+            fut.set_exception(BrokenProcessPool("worker killed"))
+        elif index != 1:
+            fut.set_result({lv: b"png" for lv in levels})
+        return fut
+
+
+async def _collect(themes):
+    return [cell async for cell in batch.render_batch(themes, ("thumb",), "png")]
+
+
+def test_broken_pool_keeps_finished_cells(themes, monkeypatch):
+    RENDER_CACHE.clear()
+    monkeypatch.setattr(batch, "get_pool", BreakingPool)
+    monkeypatch.setattr(batch, "shutdown_pool", lambda: None)
+    cells = asyncio.run(_collect([(themes[0].rc_global, 11), (themes[1].rc_global, 11)]))
+    RENDER_CACHE.clear()
+
+    errors = sorted((c["theme"], c["filename"]) for c in cells if c["type"] == "error")
+    ok = [c for c in cells if c["type"] == "cell"]
+    assert errors == [(0, "01_line.png"), (0, "02_scatter.png"), (1, "01_line.png"), (1, "02_scatter.png")]
+    assert len(ok) == 2 * 8
+    assert all(c["levels"] == {"thumb": b"png"} for c in ok)
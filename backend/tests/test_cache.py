@@ -0,0 +1,70 @@
+import os
+import threading
+
+import pytest
+
+from app.cache import RenderStore
+
+
+def _key(i, level="full"):
+    return ("01_line.png", f"digest{i}", 7, "png", level)
+
+
+def _on_disk(store):
+    return sum(
+        entry.stat().st_size
+        for sub in os.scandir(store.root) if sub.is_dir() and len(sub.name) == 2
+        for entry in os.scandir(sub)
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RenderStore(tmp_path, max_bytes=10_000)
+
+
+def test_put_get_roundtrip(store):
+    name = store.put(_key(0), b"abc")
+    assert store.get(_key(0)) == b"abc"
+    assert store.path(name).read_bytes() == b"abc"
+    assert store.get(_key(1)) is None
+    assert os.listdir(store.root / "tmp") == []
+
+
+def test_repeated_put_counts_once(store):
+    store.put(_key(0), b"x" * 100)
+    store.put(_key(0), b"x" * 100)
+    assert store.usage_bytes() == 100
+    assert store.writes == 1
+
+
+def test_concurrent_puts_of_one_key_count_once(tmp_path):
+    # One store per thread, like one per worker process, all writing the same entries
+    stores = [RenderStore(tmp_path, max_bytes=1_000_000) for _ in range(8)]
+    barrier = threading.Barrier(len(stores))
+
+    def write(store):
+        barrier.wait()
+        for i in range(50):
+            store.put(_key(i), b"y" * 100)
+
+    threads = [threading.Thread(target=write, args=(s,)) for s in stores]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(s.writes for s in stores) == 50
+    assert stores[0].usage_bytes() == _on_disk(stores[0]) == 50 * 100
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_eviction_drops_least_recent_to_low_water(store):
+    for i in range(10):
+        name = store.put(_key(i), b"z" * 1000)
+        os.utime(store.path(name), (i, i))  # entry i used at time i
+    assert store.usage_bytes() == 10_000
+    store.put(_key(10), b"z" * 1000)  # 11 000 > max_bytes
+    assert store.usage_bytes() == _on_disk(store) <= store.max_bytes * store.LOW_WATER
+    assert store.evictions == 2
+    assert store.get(_key(0)) is None and store.get(_key(1)) is None
+    assert store.get(_key(2)) is not None and store.get(_key(10)) is not None
@@ -0,0 +1,50 @@
+import io
+
+import matplotlib as mpl
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.encoding import figure_image
+from app.figures import build_figure_specs, figure_rng, new_figure, release_figure
+from app.fonts import apply_font_chain
+from app.theming import ensure_colormap
+
+SPECS = list(enumerate(build_figure_specs()))
+
+
+def _savefig_pixels(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    with Image.open(buf) as im:
+        return np.asarray(im.convert("RGBA"))
+
+
+def _compare(theme, index, spec, extra_rc=None):
+    rc = theme.rc_global | spec.rc_mod | (extra_rc or {})
+    ensure_colormap(rc.get("image.cmap"))
+    with mpl.rc_context(apply_font_chain(rc)):
+        figs = []
+        for _ in range(2):
+            fig = new_figure()
+            spec.generator(fig.add_subplot(), figure_rng(theme.seed, index))
+            figs.append(fig)
+        expected = _savefig_pixels(figs[0])
+        im, _ = figure_image(figs[1])
+        got = np.asarray(im.convert("RGBA"))
+        for fig in figs:
+            release_figure(fig)
+    assert got.shape == expected.shape
+    assert np.array_equal(got, expected), f"{spec.filename}: {(got != expected).any(axis=2).mean():.2%} pixels differ"
+
+
+@pytest.mark.parametrize("index,spec", SPECS, ids=[s.filename for _, s in SPECS])
+def test_raster_matches_savefig(themes, index, spec):
+    for theme in (themes[0], themes[-1]):
+        _compare(theme, index, spec)
+
+
+def test_raster_matches_savefig_transparent(themes):
+    index, spec = SPECS[0]
+    _compare(themes[0], index, spec, {"savefig.transparent": True})
@@ -0,0 +1,42 @@
+import threading
+
+import matplotlib as mpl
+
+from app.figures import build_figure_specs, render_figure_levels
+
+
+def _render_all(theme, rounds=1):
+    specs = build_figure_specs()
+    return [
+        render_figure_levels(spec, i, theme.rc_global, theme.seed, "png", ("thumb",))["thumb"]
+        for _ in range(rounds)
+        for i, spec in enumerate(specs)
+    ]
+
+
+def test_concurrent_renders_match_serial(themes):
+    light, dark = themes[0], themes[-1]
+    assert light.mode != dark.mode
+    facecolor = mpl.rcParams["axes.facecolor"]
+    expected = {light.slug: _render_all(light, 2), dark.slug: _render_all(dark, 2)}
+
+    got = {}
+    errors = []
+
+    def worker(theme):
+        try:
+            got[theme.slug] = _render_all(theme, 2)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in (light, dark, light, dark)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    for slug, images in expected.items():
+        differing = [i for i, (a, b) in enumerate(zip(images, got[slug])) if a != b]
+        assert not differing, f"{slug}: figures {differing} differ from the serial render"
+    assert mpl.rcParams["axes.facecolor"] == facecolor
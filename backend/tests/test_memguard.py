@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app import memguard
+from app.memguard import GUARD, RecycleMiddleware
+
+
+@pytest.fixture
+def limit_hit(monkeypatch):
+    kills = []
+    monkeypatch.setattr(GUARD, "recycle_reason", "test limit")
+    monkeypatch.setattr(memguard.os, "kill", lambda pid, sig: kills.append((pid, sig)))
+    return kills
+
+
+async def _noop(scope, receive, send):
+    pass
+
+
+def test_unsupervised_worker_is_not_killed(limit_hit, monkeypatch):
+    monkeypatch.setenv("THEMELAB_SUPERVISED", "0")
+    asyncio.run(RecycleMiddleware(_noop)({"type": "http"}, None, None))
+    assert limit_hit == []
+
+
+def test_supervised_worker_recycles_once(limit_hit, monkeypatch):
+    monkeypatch.setenv("THEMELAB_SUPERVISED", "1")
+    mw = RecycleMiddleware(_noop)
+    asyncio.run(mw({"type": "http"}, None, None))
+    asyncio.run(mw({"type": "http"}, None, None))
+    assert len(limit_hit) == 1
+
+
+def test_supervision_is_detected(monkeypatch):
+    monkeypatch.delenv("THEMELAB_SUPERVISED", raising=False)
+    assert memguard.supervised() is False  # pytest is nobody's worker
+
+
+@pytest.mark.parametrize("args, expected", [
+    (["/usr/bin/python3", "/usr/local/bin/uvicorn", "app.main:app", "--workers", "4"], True),
+    (["uvicorn", "app.main:app", "--workers=2"], True),
+    (["python", "-m", "uvicorn", "app.main:app", "--workers", "1"], False),
+    (["uvicorn", "app.main:app"], False),
+    (["uvicorn", "app.main:app", "--reload", "--workers", "4"], False),
+    (["python", "-m", "app.main"], False),  # __main__: uvicorn.run(..., reload=True)
+    (["gunicorn: master [app.main:app]"], True),
+    (["/usr/bin/python3", "/usr/local/bin/gunicorn", "-k", "uvicorn.workers.UvicornWorker", "app.main:app"], True),
+    (["-bash"], False),
+])
+def test_supervisor_command_lines(args, expected, monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert memguard._supervisor_cmdline(args) is expected
+
+
+def test_web_concurrency_counts_as_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert memguard._supervisor_cmdline(["uvicorn", "app.main:app"]) is True
+    assert memguard._supervisor_cmdline(["uvicorn", "app.main:app", "--workers", "1"]) is False
@@ -0,0 +1,30 @@
+from app import figures
+from app.cache import RENDER_CACHE
+from app.profiling import profile_render
+
+
+def test_requested_profile_without_samples_gives_a_reason():
+    with profile_render("digest", 1, "sample") as prof:
+        pass  # finishes well inside one sampling interval
+    assert prof.profile is None
+    assert prof.reason.startswith("no samples")
+
+
+def test_unrequested_profile_has_no_reason():
+    with profile_render("digest", 1, None, slow_ms=0) as prof:
+        pass
+    assert prof.profile is None and prof.reason is None
+
+
+def test_refresh_renders_past_the_cache(themes, monkeypatch):
+    RENDER_CACHE.clear()
+    rc = themes[0].rc_global
+    only = ["01_line.png"]
+    first = figures.render_levels(rc, 7, ("preview",), only)
+    calls = []
+    real = figures.render_figure_levels
+    monkeypatch.setattr(figures, "render_figure_levels", lambda *a: calls.append(a) or real(*a))
+    assert figures.render_levels(rc, 7, ("preview",), only) == first
+    assert calls == []
+    assert figures.render_levels(rc, 7, ("preview",), only, refresh=True) == first
+    assert len(calls) == 1
@@ -0,0 +1,54 @@
+import pytest
+from cycler import Cycler, cycler
+
+from app.rcnorm import RcValidationError, normalize_rc, rc_deserialize, rc_digest, validate_rc
+
+RC = {
+    "axes.facecolor": "#fafaf7",
+    "lines.linewidth": 2,
+    "figure.figsize": [6.4, 4.8],
+    "axes.prop_cycle": {"key": "color", "values": ["#2e7fe8", "#e8572e"]},
+}
+
+
+def test_equivalent_shapes_share_a_digest():
+    same = {
+        "axes.prop_cycle": cycler("color", ["#2E7FE8", "#E8572E"]),
+        "figure.figsize": (6.4, 4.8),
+        "lines.linewidth": 2.0,
+        "axes.facecolor": "#FAFAF7",
+    }
+    assert rc_digest(rc_deserialize(RC)) == rc_digest(same)
+    assert normalize_rc(RC).digest == normalize_rc(same).digest
+
+
+@pytest.mark.parametrize("key, value", [
+    ("axes.facecolor", "#fafaf8"),
+    ("lines.linewidth", 2.5),
+    ("figure.figsize", [4.8, 6.4]),
+    ("axes.prop_cycle", {"key": "color", "values": ["#e8572e", "#2e7fe8"]}),
+])
+def test_different_values_change_the_digest(key, value):
+    assert rc_digest(RC | {key: value}) != rc_digest(RC)
+
+
+def test_normalize_returns_matplotlib_values_and_memoizes():
+    norm = normalize_rc(dict(RC))
+    assert isinstance(norm.rc["axes.prop_cycle"], Cycler)
+    assert norm.rc["lines.linewidth"] == 2.0
+    assert normalize_rc(dict(RC)) is norm
+
+
+def test_multi_prop_cycle_shape():
+    rc = rc_deserialize({"axes.prop_cycle": {"multi": [{"color": "r", "ls": "-"}, {"color": "b", "ls": "--"}]}})
+    assert rc["axes.prop_cycle"] == cycler(color=["r", "b"], ls=["-", "--"])
+
+
+def test_validation_reports_every_bad_entry():
+    with pytest.raises(RcValidationError) as exc:
+        validate_rc(RC | {"lines.linewidth": "wide", "no.such.key": 1})
+    keys = [k for k, _ in exc.value.errors]
+    assert keys == ["lines.linewidth", "no.such.key"]
+    assert "lines.linewidth: " in str(exc.value) and "no.such.key: unknown rcParam" in str(exc.value)
+    with pytest.raises(ValueError):  # what the API's error handling catches
+        normalize_rc({"lines.linewidth": "wide"})
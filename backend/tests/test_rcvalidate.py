@@ -0,0 +1,104 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+from cycler import cycler
+
+from app import rcvalidate
+from app.rcvalidate import RcValidator, cache_key, deserialize_prop_cycle
+
+RC = {"lines.linewidth": 2.0, "axes.facecolor": "#fafaf7", "lines.linestyle": "wavy", "no.such.key": 1}
+
+
+def test_cache_key_shapes():
+    assert cache_key("figure.figsize", [6.4, 4.8]) == cache_key("figure.figsize", (6.4, 4.8))
+    keys = {cache_key("lines.linewidth", v) for v in (1, 1.0, True, "1")}
+    assert len(keys) == 4
+
+
+def test_prop_cycle_shapes():
+    assert deserialize_prop_cycle({"key": "color", "values": ["r", "b"]}) == cycler("color", ["r", "b"])
+    assert deserialize_prop_cycle({"multi": [{"color": "r", "lw": 1}, {"color": "b", "lw": 2}]}) == cycler(
+        color=["r", "b"], lw=[1, 2]
+    )
+    assert deserialize_prop_cycle("cycler('color', 'rb')") == "cycler('color', 'rb')"
+    with pytest.raises(ValueError):
+        deserialize_prop_cycle({"multi": []})
+    with pytest.raises(ValueError):
+        deserialize_prop_cycle({"multi": [{"color": "r"}, {"lw": 1}]})
+
+
+def test_errors_and_validate_agree_and_memoize():
+    v = RcValidator()
+    out, errs = v.validate(RC)
+    assert out == {"lines.linewidth": 2.0, "axes.facecolor": "#fafaf7"}
+    assert [k for k, _ in errs] == ["lines.linestyle", "no.such.key"]
+    assert dict(errs)["no.such.key"] == "unknown rcParam"
+    assert v.misses == 4 and v.hits == 0
+    assert v.errors(RC) == errs
+    assert v.hits == 4
+
+
+def test_verdicts_persist_across_validators(tmp_path, monkeypatch):
+    path = tmp_path / "rc.json"
+    first = RcValidator(path)
+    errs = first.errors(RC)
+    assert first.save() == 4
+    assert first.save() == 0  # nothing new
+
+    second = RcValidator(path)
+    monkeypatch.setattr(second, "_run", lambda key, value: pytest.fail("verdict should come from disk"))
+    assert second.errors(RC) == errs
+    assert second.hits == 4
+    # validate() needs converted values, which are not persisted: valid entries rerun once
+    monkeypatch.undo()
+    out, _ = second.validate(RC)
+    assert out["lines.linewidth"] == 2.0
+    assert second.misses == 2
+
+
+def test_cache_from_another_matplotlib_is_ignored(tmp_path):
+    path = tmp_path / "rc.json"
+    path.write_text(json.dumps({"matplotlib": "0.0", "verdicts": {cache_key("lines.linewidth", 2.0): "stale"}}))
+    v = RcValidator(path)
+    assert v.load() == 0
+    assert v.errors({"lines.linewidth": 2.0}) == []
+
+
+def test_merged_verdicts_are_saved(tmp_path):
+    worker, parent = RcValidator(), RcValidator(tmp_path / "rc.json")
+    worker.errors(RC)
+    parent.merge(worker.drain_new())
+    assert worker.drain_new() == {}
+    assert parent.save() == 4
+    assert RcValidator(tmp_path / "rc.json").load() == 4
+
+
+# -------------------------
+# json2mplstyle.py shares the validator
+# -------------------------
+
+
+@pytest.fixture(scope="module")
+def json2mplstyle():
+    path = Path(__file__).resolve().parents[2] / "json2mplstyle.py"
+    spec = importlib.util.spec_from_file_location("json2mplstyle", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_cli_uses_the_backend_verdicts(json2mplstyle):
+    validator = json2mplstyle._rc_validator()
+    assert type(validator).__name__ == "RcValidator" and validator is not rcvalidate.RC_VALIDATOR
+    valid, invalid = json2mplstyle._validate_rc_items(RC)
+    assert valid == {"lines.linewidth": 2.0, "axes.facecolor": "#fafaf7"}
+    assert [(k, reason) for k, _, reason in invalid] == RcValidator().errors(RC)
+
+
+def test_cli_lists_invalid_entries(json2mplstyle):
+    text, warnings = json2mplstyle.convert_json_to_mplstyle(RC)
+    assert "lines.linewidth: 2.0" in text
+    assert "# lines.linestyle: wavy" in text and "# no.such.key: 1" in text
+    assert len(warnings) == 2
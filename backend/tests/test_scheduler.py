@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+
+from app.scheduler import FairScheduler, WorkTag, _current
+
+
+def _depth(sched):
+    return sum(sched.queue_depths().values())
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def grant_order(sched, jobs):
+    """Queue `jobs` ((tag, figure, label), in order) behind a held slot; return labels in grant order."""
+    order = []
+    token = _current.set(WorkTag("holder", "interactive"))
+    holder = sched.slot()
+    holder.__enter__()
+    _current.reset(token)
+
+    threads = []
+    for n, (tag, figure, label) in enumerate(jobs):
+        def run(tag=tag, figure=figure, label=label):
+            _current.set(tag)
+            with sched.slot(figure):
+                order.append(label)
+
+        t = threading.Thread(target=run)
+        t.start()
+        threads.append(t)
+        _wait_for(lambda n=n: _depth(sched) == n + 1)
+
+    holder.__exit__(None, None, None)
+    for t in threads:
+        t.join(5)
+    assert sched.busy == 0 and _depth(sched) == 0
+    return order
+
+
+def test_clients_take_turns_within_a_class():
+    sched = FairScheduler(1, {"interactive": 4, "bulk": 1})
+    a, b = WorkTag("a", "bulk"), WorkTag("b", "bulk")
+    jobs = [(a, "x", "a1"), (a, "x", "a2"), (a, "x", "a3"), (b, "x", "b1"), (b, "x", "b2")]
+    assert grant_order(sched, jobs) == ["a1", "b1", "a2", "b2", "a3"]
+
+
+def test_focused_figure_goes_first():
+    sched = FairScheduler(1, {"interactive": 4, "bulk": 1})
+    jobs = [
+        (WorkTag("a", "bulk"), "01_line.png", "bulk"),
+        (WorkTag("b", "interactive", "06_polar.png"), "01_line.png", "other"),
+        (WorkTag("b", "interactive", "06_polar.png"), "06_polar.png", "focus"),
+    ]
+    assert grant_order(sched, jobs)[0] == "focus"
+
+
+def test_weighted_share_between_classes():
+    sched = FairScheduler(1, {"interactive": 4, "bulk": 1})
+    jobs = [(WorkTag("bulk", "bulk"), "x", "B") for _ in range(6)]
+    jobs += [(WorkTag("ui", "interactive"), "x", "I") for _ in range(12)]
+    order = grant_order(sched, jobs)
+    assert order[:10].count("I") == 8
+    assert order.count("B") == 6  # bulk is never starved
+
+
+def test_untagged_work_is_not_scheduled():
+    sched = FairScheduler(1, {"interactive": 4, "bulk": 1})
+    with sched.slot("x"):
+        assert sched.busy == 0
+
+
+def test_cancelled_waiters_release_their_slot():
+    sched = FairScheduler(1, {"interactive": 4, "bulk": 1})
+    tag = WorkTag("a", "bulk")
+
+    async def enter():
+        async with sched.slot_async(tag):
+            await asyncio.sleep(1)
+
+    async def main():
+        # Cancelled while queued: leaves the queue
+        async with sched.slot_async(tag):
+            queued = asyncio.ensure_future(enter())
+            await asyncio.sleep(0)
+            assert _depth(sched) == 1
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            assert _depth(sched) == 0
+        assert sched.busy == 0
+
+        # Cancelled after the grant was scheduled but before it ran: the slot is handed back
+        async with sched.slot_async(tag):
+            granted = asyncio.ensure_future(enter())
+            await asyncio.sleep(0)
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert sched.busy == 0 and _depth(sched) == 0
+
+        # Cancelled while holding the slot
+        holding = asyncio.ensure_future(enter())
+        await asyncio.sleep(0)
+        assert sched.busy == 1
+        holding.cancel()
+        await asyncio.gather(holding, return_exceptions=True)
+        assert sched.busy == 0
+
+    asyncio.run(main())
+
+
+def test_request_renders_take_the_single_draw_slot(themes):
+    from app.figures import build_figure_specs, render_figure_levels
+    from app.scheduler import DRAW_SCHEDULER, SCHEDULER
+
+    assert DRAW_SCHEDULER.slots == 1
+    spec = build_figure_specs()[0]
+    token = _current.set(WorkTag("holder", "interactive"))
+    holder = DRAW_SCHEDULER.slot()
+    holder.__enter__()
+    _current.reset(token)
+
+    out = []
+
+    def run(client):
+        _current.set(WorkTag(client, "interactive"))
+        out.append(render_figure_levels(spec, 0, themes[0].rc_global, 7, "png", ("thumb",)))
+
+    threads = [threading.Thread(target=run, args=(c,)) for c in "ab"]
+    for t in threads:
+        t.start()
+    _wait_for(lambda: _depth(DRAW_SCHEDULER) == 2)
+    assert SCHEDULER.busy == 0 and _depth(SCHEDULER) == 0  # the pool lane is untouched
+    holder.__exit__(None, None, None)
+    for t in threads:
+        t.join(30)
+    assert len(out) == 2 and out[0] == out[1]
+    assert DRAW_SCHEDULER.busy == 0
@@ -0,0 +1,80 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.session import LiveSession, PatchError
+
+
+@pytest.fixture
+def session(themes):
+    return LiveSession(themes[0].rc_global, 7, levels=("thumb",))
+
+
+def test_patch_applies_ops_in_order(session):
+    touched = session.apply_patch([
+        {"op": "replace", "path": "/lines.linewidth", "value": 3.0},
+        {"op": "add", "path": "/grid.alpha", "value": 0.5},
+        {"op": "remove", "path": "/grid.alpha"},
+    ])
+    assert touched == ["lines.linewidth", "grid.alpha", "grid.alpha"]
+    assert session.rc_global["lines.linewidth"] == 3.0
+    assert "grid.alpha" not in session.rc_global
+    assert session.rev == 1
+
+
+@pytest.mark.parametrize("ops", [
+    [{"op": "replace", "path": "/lines.linewidth", "value": 3.0}, {"op": "remove", "path": "/no.such.key"}],
+    [{"op": "replace", "path": "/lines.linewidth", "value": 3.0}, {"op": "move", "path": "/lines.linewidth"}],
+    [{"op": "replace", "path": "lines.linewidth", "value": 3.0}],
+    [{"op": "add", "path": "/lines.linewidth"}],
+    "not a list",
+])
+def test_bad_patch_changes_nothing(session, ops):
+    before = dict(session.rc_global)
+    with pytest.raises(PatchError):
+        session.apply_patch(ops)
+    assert session.rc_global == before
+    assert session.rev == 0
+
+
+def test_only_changed_figures_are_stale(session):
+    session.render_changed()
+    assert session.stale_figures() == []
+    session.apply_patch([{"op": "replace", "path": "/lines.linewidth", "value": 3.0}])
+    stale = session.stale_figures()
+    assert stale and len(stale) < 10
+
+
+def _until_done(ws):
+    """Skip figure frames; return the closing 'rendered' or 'error' message."""
+    while True:
+        msg = ws.receive_json()
+        if msg["type"] == "figure":
+            ws.receive_bytes()
+        else:
+            return msg
+
+
+def test_ws_rolls_back_rc_and_rev_after_a_failed_render(themes, monkeypatch):
+    render_changed = LiveSession.render_changed
+    fail = []
+
+    def flaky(self):
+        if fail:
+            raise ValueError(fail.pop())
+        return render_changed(self)
+
+    monkeypatch.setattr(LiveSession, "render_changed", flaky)
+    rc = {k: v for k, v in themes[0].rc_global.items() if k != "axes.prop_cycle"}  # a cycler, not JSON
+    with TestClient(app).websocket_connect("/api/session") as ws:
+        ws.send_json({"type": "init", "theme": {"rc_global": rc, "seed": 7}, "levels": ["thumb"]})
+        assert _until_done(ws)["rev"] == 0
+        fail.append("render failed")
+        ws.send_json({"type": "patch", "ops": [{"op": "replace", "path": "/lines.linewidth", "value": 5.0}]})
+        assert _until_done(ws) == {"type": "error", "detail": "render failed"}
+        ws.send_json({"type": "patch", "ops": [{"op": "replace", "path": "/grid.alpha", "value": 0.1}]})
+        done = _until_done(ws)
+    assert done["type"] == "rendered"
+    assert done["rev"] == 1
+    # The failed linewidth edit was rolled back
+    assert done["rc_diff_theme"].get("lines.linewidth") == rc.get("lines.linewidth")
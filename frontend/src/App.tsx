@@ -1,11 +1,33 @@
-import React, { useEffect, useState } from 'react'
-import { generateThemes, renderTheme, downloadAll } from './utils/api'
+import React, { useEffect, useRef, useState } from 'react'
+import {
+  generateThemes, renderTheme, renderBatch, downloadAll, openLiveSession, rcPatch, type Level, type LiveSession,
+} from './utils/api'
 import { ThemeCarousel } from './components/ThemeCarousel'
 import { RcEditor } from './components/RcEditor'
 import { PaletteEditor } from './components/PaletteEditor'
 import { CompareSlider } from './components/CompareSlider'
 
-type Img = { filename: string; b64png: string }
+type Img = { filename: string; media_type: string; levels: Partial<Record<Level, string>> }
+
+// Thumbnails use the 256 px level; Large Preview and CompareSlider the 1024 px one
+const CAROUSEL_FIGURE = '01_line.png'
+
+const imgSrc = (im: Img, level: Level = 'preview') =>
+  `data:${im.media_type};base64,${im.levels[level] ?? im.levels.preview ?? im.levels.full}`
+
+const blobBase64 = (blob: Blob) => new Promise<string>((resolve, reject) => {
+  const reader = new FileReader()
+  reader.onload = () => resolve((reader.result as string).split(',', 2)[1])
+  reader.onerror = () => reject(reader.error)
+  reader.readAsDataURL(blob)
+})
+
+function parseRc(text: string): Record<string, any> | null {
+  try {
+    const rc = JSON.parse(text)
+    return rc && typeof rc === 'object' && !Array.isArray(rc) ? rc : null
+  } catch { return null }
+}
 
 export default function App() {
   const [themes, setThemes] = useState<any[]>([])
@@ -14,6 +36,13 @@ export default function App() {
   const [images, setImages] = useState<Img[]>([])
   const [selected, setSelected] = useState<Img | null>(null)
   const [loading, setLoading] = useState(false)
+  const [carouselThumbs, setCarouselThumbs] = useState<(string | undefined)[]>([])
+  const [liveError, setLiveError] = useState<string | null>(null)
+  // Live session for the active theme: rc edits go out as patches, only the changed figures come back
+  const live = useRef<LiveSession | null>(null)
+  const sentRc = useRef<Record<string, any>>({}) // what the server has, once in-flight patches land
+  const inFlight = useRef<Record<string, any>[]>([])
+  const confirmedRc = useRef<Record<string, any>>({})
 
   const theme = themes[active]
 
@@ -26,8 +55,65 @@ export default function App() {
     const out = await generateThemes(fd)
     setThemes(out)
     setRcText(JSON.stringify(out[0].rc_global, null, 2))
+    // One batch job for all six themes; also warms the server cache for "Render Active"
+    await renderBatch({ themes: out }, (cell) => {
+      if (cell.filename !== CAROUSEL_FIGURE) return
+      setCarouselThumbs((prev) => {
+        const next = [...prev]
+        next[cell.theme] = imgSrc(cell, 'thumb')
+        return next
+      })
+    })
   })() }, [])
 
+  useEffect(() => {
+    if (!theme) return
+    sentRc.current = confirmedRc.current = theme.rc_global
+    inFlight.current = [theme.rc_global] // answered by the init render
+    setLiveError(null)
+    const session = openLiveSession(
+      theme,
+      async (filename, blob, _rev, level) => {
+        const b64 = await blobBase64(blob)
+        const update = (im: Img): Img => ({ ...im, media_type: blob.type, levels: { ...im.levels, [level]: b64 } })
+        setImages((prev) => {
+          const i = prev.findIndex((im) => im.filename === filename)
+          if (i < 0) {
+            const added = [...prev, update({ filename, media_type: blob.type, levels: {} })]
+            return added.sort((a, b) => a.filename.localeCompare(b.filename))
+          }
+          return prev.map((im, j) => (j === i ? update(im) : im))
+        })
+        setSelected((prev) => (prev?.filename === filename ? update(prev) : prev))
+      },
+      () => {
+        confirmedRc.current = inFlight.current.shift() ?? confirmedRc.current
+        setLiveError(null)
+      },
+      (detail) => {
+        // The server keeps its last good theme; diff the next edit against that
+        inFlight.current.shift()
+        sentRc.current = confirmedRc.current
+        setLiveError(detail)
+      },
+    )
+    live.current = session
+    return () => { session.close(); live.current = null }
+  }, [theme])
+
+  useEffect(() => {
+    const rc = parseRc(rcText)
+    if (!rc || !live.current) return
+    const timer = setTimeout(() => {
+      const ops = rcPatch(sentRc.current, rc)
+      if (ops.length && live.current?.patch(ops)) {
+        sentRc.current = rc
+        inFlight.current.push(rc)
+      }
+    }, 250)
+    return () => clearTimeout(timer)
+  }, [rcText])
+
   async function doRender(idx = active) {
     if (!themes[idx]) return
     setLoading(true)
@@ -58,6 +144,7 @@ export default function App() {
 
       <ThemeCarousel
         themes={themes}
+        thumbs={carouselThumbs}
         active={active}
         onSelect={(i) => { setActive(i); setRcText(JSON.stringify(themes[i].rc_global, null, 2)); setImages([]); setSelected(null) }}
       />
@@ -71,7 +158,7 @@ export default function App() {
         {selected ? (
           <div className="w-full h-[65vh] bg-white/70 border border-black/10 rounded-xl overflow-hidden flex items-center justify-center">
             <img
-              src={`data:image/png;base64,${selected.b64png}`}
+              src={imgSrc(selected)}
               className="max-h-full max-w-full object-contain"
               alt={selected.filename}
             />
@@ -93,7 +180,15 @@ export default function App() {
                 <span className="badge">FG {theme.fg}</span>
                 <span className="badge">BG {theme.bg}</span>
                 <span className="badge">Accent {theme.accent}</span>
+                {theme.search && <span className="badge">Search rank score {theme.search.score.toFixed(3)}</span>}
               </div>
+              {theme.analysis && (
+                <div className="text-xs opacity-80 mt-2">
+                  Text contrast {theme.analysis.fg_contrast.toFixed(1)}:1 {theme.analysis.fg_aa ? '(AA ✓)' : '(below AA)'}
+                  {' • '}{Math.round(theme.analysis.aa_fraction * 100)}% of palette ≥ 3:1 on bg
+                  {' • '}closest pair ΔE {theme.analysis.min_delta_e[theme.analysis.worst_vision].toFixed(3)} ({theme.analysis.worst_vision})
+                </div>
+              )}
             </div>
 
             <PaletteEditor palette={theme.palette} onChange={applyPalette} />
@@ -101,6 +196,7 @@ export default function App() {
             <div className="space-y-2">
               <div className="font-semibold">rcParams diff (editable)</div>
               <RcEditor value={rcText} onChange={setRcText} />
+              {liveError && <div className="text-xs text-red-700">{liveError}</div>}
             </div>
           </div>
 
@@ -125,7 +221,7 @@ export default function App() {
                     className="text-left border border-black/10 rounded-xl overflow-hidden hover:ring-2 hover:ring-accent/70 transition"
                     title="Click to view larger"
                   >
-                    <img src={`data:image/png;base64,${im.b64png}`} className="w-full h-[140px] object-contain bg-white" />
+                    <img src={imgSrc(im, 'thumb')} className="w-full h-[140px] object-contain bg-white" />
                     <div className="p-2 text-xs opacity-70 truncate">{im.filename}</div>
                   </button>
                 ))}
@@ -135,8 +231,8 @@ export default function App() {
             <div className="card p-3">
               <div className="font-semibold mb-2">Compare any two (drag)</div>
               <CompareSlider
-                left={images[0] && `data:image/png;base64,${images[0].b64png}`}
-                right={images[1] && `data:image/png;base64,${images[1].b64png}`}
+                left={images[0] && imgSrc(images[0])}
+                right={images[1] && imgSrc(images[1])}
               />
             </div>
           </div>
@@ -1,4 +1,5 @@
 import React, { useState } from 'react'
+import { extractPalette } from '../utils/api'
 
 function isHex(v: string) {
   return /^#?[0-9A-Fa-f]{6}$/.test(v)
@@ -6,6 +7,20 @@ function isHex(v: string) {
 
 export function PaletteEditor({ palette, onChange }: { palette: string[]; onChange: (p: string[]) => void }) {
   const [vals, setVals] = useState<string[]>(palette)
+  const [extracting, setExtracting] = useState(false)
+  async function fromImage(file: File | undefined) {
+    if (!file) return
+    setExtracting(true)
+    try {
+      const { palettes } = await extractPalette(file, Math.max(3, Math.min(10, vals.length)))
+      setVals(palettes[0].colors)
+      onChange(palettes[0].colors)
+    } catch (e) {
+      alert('Could not extract a palette from that image.')
+    } finally {
+      setExtracting(false)
+    }
+  }
   function set(i: number, v: string) {
     const next = [...vals]
     next[i] = v.startsWith('#') ? v.toUpperCase() : ('#' + v.toUpperCase())
@@ -26,6 +41,10 @@ export function PaletteEditor({ palette, onChange }: { palette: string[]; onChan
       <div className="mt-2 flex gap-2">
         <button className="btn" onClick={() => { if (vals.length < 10) { const next = [...vals, '#888888']; setVals(next); onChange(next) } }}>Add</button>
         <button className="btn" onClick={() => { if (vals.length > 3) { const next = vals.slice(0, -1); setVals(next); onChange(next) } }}>Remove</button>
+        <label className="btn cursor-pointer">
+          {extracting ? 'Extracting…' : 'From image…'}
+          <input type="file" accept="image/*" className="hidden" disabled={extracting} onChange={(e) => fromImage(e.target.files?.[0])} />
+        </label>
       </div>
     </div>
   )
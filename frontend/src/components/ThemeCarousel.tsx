@@ -1,7 +1,7 @@
 import React from 'react'
 import clsx from 'clsx'
 
-export function ThemeCarousel({ themes, active, onSelect }: { themes: any[]; active: number; onSelect: (idx: number) => void }) {
+export function ThemeCarousel({ themes, thumbs = [], active, onSelect }: { themes: any[]; thumbs?: (string | undefined)[]; active: number; onSelect: (idx: number) => void }) {
   return (
     <div className="flex gap-3 overflow-x-auto py-2">
       {themes.map((t, i) => (
@@ -10,6 +10,7 @@ export function ThemeCarousel({ themes, active, onSelect }: { themes: any[]; act
             <div className="font-semibold">{t.name}</div>
             <span className="badge">{t.mode}</span>
           </div>
+          {thumbs[i] && <img src={thumbs[i]} alt={`${t.name} preview`} className="w-full h-[110px] object-contain rounded-lg mb-2 bg-white" />}
           <div className="flex -space-x-1 mb-2">
             {t.palette.slice(0, 6).map((c: string, j: number) => (
               <span key={j} className="w-6 h-6 rounded-full border border-black/10" style={{ background: c }} />
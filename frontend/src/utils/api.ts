@@ -4,16 +4,57 @@ export async function generateThemes(payload: FormData) {
   return ky.post('/api/themes/generate', { body: payload }).json<any>()
 }
 
-export async function renderTheme(theme: any) {
-  const fd = new FormData()
-  fd.set('theme_json', JSON.stringify(theme))
-  return ky.post('/api/render', { body: fd }).json<any>()
+export type ExtractedPalette = { name: string; colors: string[]; score: number; analysis: any }
+
+// Ranked candidate palettes clustered from a reference image (best first)
+export async function extractPalette(image: File, nColors: number, bg?: string, fg?: string) {
+  const body = new FormData()
+  body.append('image', image)
+  body.append('n_colors', String(nColors))
+  if (bg) body.append('bg', bg)
+  if (fg) body.append('fg', fg)
+  return ky.post('/api/palette/extract', { body, timeout: 60000 }).json<{ palettes: ExtractedPalette[] }>()
+}
+
+// Pyramid levels served by the backend: 256 px, 1024 px and the full render
+export type Level = 'thumb' | 'preview' | 'full'
+
+export async function renderTheme(theme: any, levels: Level[] = ['thumb', 'preview']) {
+  return ky.post('/api/json/render', { json: theme, searchParams: { levels: levels.join(',') } }).json<any>()
+}
+
+export type BatchCell = { theme: number; filename: string; media_type: string; levels: Partial<Record<Level, string>> }
+
+// Streams NDJSON from /api/json/render/batch; onCell fires as each theme x figure cell finishes
+export async function renderBatch(
+  body: { themes?: any[]; generate?: any; figures?: string[] },
+  onCell: (cell: BatchCell) => void,
+  levels: Level[] = ['thumb'],
+) {
+  const res = await fetch(`/api/json/render/batch?levels=${levels.join(',')}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  })
+  if (!res.ok || !res.body) throw new Error(`batch render failed: ${res.status}`)
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+  let buf = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buf += value
+    const lines = buf.split('\n')
+    buf = lines.pop() ?? ''
+    for (const line of lines) {
+      if (!line) continue
+      const msg = JSON.parse(line)
+      if (msg.type === 'cell') onCell(msg)
+    }
+  }
 }
 
 export async function downloadAll(theme: any) {
-  const fd = new FormData()
-  fd.set('theme_json', JSON.stringify(theme))
-  const blob = await ky.post('/api/download', { body: fd }).blob()
+  const blob = await ky.post('/api/json/download', { json: theme }).blob()
   const url = URL.createObjectURL(blob)
   const a = document.createElement('a')
   a.href = url
@@ -22,3 +63,55 @@ export async function downloadAll(theme: any) {
   setTimeout(() => URL.revokeObjectURL(url), 5000)
 }
 
+
+export type RcPatchOp =
+  | { op: 'add' | 'replace'; path: string; value: any }
+  | { op: 'remove'; path: string }
+
+// The ops that turn rc `from` into rc `to` (top-level keys only; values compared as JSON)
+export function rcPatch(from: Record<string, any>, to: Record<string, any>): RcPatchOp[] {
+  const path = (key: string) => '/' + key.replace(/~/g, '~0').replace(/\//g, '~1')
+  const ops: RcPatchOp[] = []
+  for (const [key, value] of Object.entries(to)) {
+    if (!(key in from)) ops.push({ op: 'add', path: path(key), value })
+    else if (JSON.stringify(from[key]) !== JSON.stringify(value)) ops.push({ op: 'replace', path: path(key), value })
+  }
+  for (const key of Object.keys(from)) if (!(key in to)) ops.push({ op: 'remove', path: path(key) })
+  return ops
+}
+
+export type LiveSession = ReturnType<typeof openLiveSession>
+
+export function openLiveSession(
+  theme: any,
+  onFigure: (filename: string, image: Blob, rev: number, level: Level) => void,
+  onRendered?: (msg: { rev: number; changed: string[]; rc_diff_theme: any }) => void,
+  onError?: (detail: string) => void,
+  levels: Level[] = ['thumb', 'preview'],
+) {
+  const proto = location.protocol === 'https:' ? 'wss' : 'ws'
+  const ws = new WebSocket(`${proto}://${location.host}/api/session`)
+  ws.binaryType = 'blob'
+  let pending: { filename: string; rev: number; level: Level; media_type: string } | null = null
+  ws.onopen = () => ws.send(JSON.stringify({ type: 'init', theme, levels }))
+  ws.onmessage = (ev) => {
+    if (typeof ev.data !== 'string') {
+      if (pending) onFigure(pending.filename, new Blob([ev.data], { type: pending.media_type }), pending.rev, pending.level)
+      pending = null
+      return
+    }
+    const msg = JSON.parse(ev.data)
+    if (msg.type === 'figure') pending = { filename: msg.filename, rev: msg.rev, level: msg.level, media_type: msg.media_type }
+    else if (msg.type === 'rendered') onRendered?.(msg)
+    else if (msg.type === 'error') onError?.(msg.detail)
+  }
+  return {
+    // False when the socket is not open yet (or any more); nothing was sent
+    patch: (ops: RcPatchOp[]) => {
+      if (ws.readyState !== WebSocket.OPEN) return false
+      ws.send(JSON.stringify({ type: 'patch', ops }))
+      return true
+    },
+    close: () => ws.close(),
+  }
+}
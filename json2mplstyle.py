@@ -4,11 +4,18 @@
 # concise per-section change summaries, and validation against your local Matplotlib (if available).
 
 import argparse
+import functools
+import glob
+import hashlib
 import json
 import math
+import os
 import sys
+import time
 from collections import defaultdict
-from typing import Any, Dict, Iterable, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 # ---- Grouping & ordering -----------------------------------------------------
 
@@ -39,7 +46,12 @@ SECTION_ORDER = [k for k, _, _ in SECTION_SPECS]
 # ---- Optional validation with Matplotlib -------------------------------------
 
 
+@functools.lru_cache(maxsize=None)
 def _matplotlib_context():
+    """
+    Import Matplotlib on first use rather than at module load, so `--help`,
+    manifest checks and skipped files never pay for it.
+    """
     try:
         import matplotlib as mpl  # noqa
         from matplotlib import rcParams, rcParamsDefault
@@ -49,7 +61,40 @@ def _matplotlib_context():
         return False, None, None, None
 
 
-HAS_MPL, RCPARAMS, RCPARAMS_DEFAULT, MPL = _matplotlib_context()
+def __getattr__(name: str):
+    # HAS_MPL / RCPARAMS / RCPARAMS_DEFAULT / MPL stay importable, resolved lazily
+    lazy = ("HAS_MPL", "RCPARAMS", "RCPARAMS_DEFAULT", "MPL")
+    if name in lazy:
+        return _matplotlib_context()[lazy.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+RCVALIDATE_PATH = Path(__file__).resolve().parent / "backend" / "app" / "rcvalidate.py"
+
+
+@functools.lru_cache(maxsize=None)
+def _rc_validator():
+    """
+    The backend's shared RcValidator (backend/app/rcvalidate.py), loaded by path:
+    same verdicts, same messages and the same persisted cache as the API.
+    None without Matplotlib, or when this script is used outside the repo.
+    """
+    if not _matplotlib_context()[0] or not RCVALIDATE_PATH.exists():
+        return None
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location("themelab_rcvalidate", RCVALIDATE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.RC_VALIDATOR
+
+
+def _save_rc_cache() -> None:
+    if _rc_validator.cache_info().currsize:  # never loaded -> nothing new to save
+        validator = _rc_validator()
+        if validator is not None:
+            validator.save()
+
 
 # ---- Helpers -----------------------------------------------------------------
 
@@ -161,43 +206,58 @@ def _validate_rc_items(
     items: Dict[str, Any],
 ) -> Tuple[Dict[str, Any], List[Tuple[str, Any, str]]]:
     """
-    If Matplotlib is available, validate by attempting to set into a fresh RcParams.
+    If Matplotlib is available, validate through the shared, memoized rc validator,
+    so a key/value seen before (by this CLI or the backend) is a dict lookup.
     Returns (valid_items, invalid_items_with_reason)
     """
-    if not HAS_MPL:
+    validator = _rc_validator()
+    if validator is None:
         # Can’t validate without Matplotlib locally.
         return items, []
 
-    # Create a shallow copy of defaults as a clean validator target
-    from matplotlib import rcParams as live_rc
-    from matplotlib import RcParams  # type: ignore
+    errors = dict(validator.errors(items))
+    valid = {k: v for k, v in items.items() if k not in errors}
+    invalid = [(k, items[k], reason) for k, reason in errors.items()]
+    return valid, invalid
 
-    test_rc = RcParams(live_rc)
 
-    valid = {}
-    invalid: List[Tuple[str, Any, str]] = []
-    for k, v in items.items():
+def _cycler_literal(v: Any) -> str:
+    """
+    Python literal for a cycler() argument: strings quoted, sequences as lists/tuples.
+    Hex colors lose their '#': the rc file parser strips everything after one, quoted or not.
+    """
+    if isinstance(v, str) and len(v) in (4, 5, 7, 9) and v.startswith("#"):
         try:
-            # Attempt to assign; this will raise KeyError or ValueError if invalid.
-            test_rc[k] = v
-            valid[k] = v
-        except KeyError as e:
-            invalid.append((k, v, f"Unknown rcParam: {e}"))
-        except ValueError as e:
-            invalid.append((k, v, f"Invalid value: {e}"))
-        except Exception as e:
-            invalid.append((k, v, f"{type(e).__name__}: {e}"))
-    return valid, invalid
+            int(v[1:], 16)
+            return repr(v[1:])
+        except ValueError:
+            pass
+    if isinstance(v, list):
+        return "[" + ", ".join(_cycler_literal(x) for x in v) + "]"
+    if isinstance(v, tuple):
+        return "(" + ", ".join(_cycler_literal(x) for x in v) + ("," if len(v) == 1 else "") + ")"
+    return repr(v)
 
 
 def _normalize_axes_prop_cycle(value: Any) -> str | None:
     """
     If value is a list of colors, emit an rc-compatible cycler string:
       cycler('color', ['#a', '#b', ...])
+    Theme JSON shapes {"key": k, "values": [...]} and {"multi": [{k1: a, k2: b}, ...]}
+    become cycler(k, [...]) and cycler(k1=[...], k2=[...]).
     If it's already a string, return as-is. Otherwise None to let generic formatting handle it.
     """
     if isinstance(value, str):
         return value
+    if isinstance(value, dict):
+        if "key" in value and isinstance(value.get("values"), list):
+            return f"cycler({value['key']!r}, {_cycler_literal(value['values'])})"
+        rows = value.get("multi")
+        if isinstance(rows, list) and rows and all(isinstance(r, dict) for r in rows):
+            keys = list(rows[0])
+            args = ", ".join(f"{k}={_cycler_literal([r.get(k) for r in rows])}" for k in keys)
+            return f"cycler({args})"
+        return None
     if isinstance(value, (list, tuple)) and all(
         isinstance(c, (str, list, tuple)) for c in value
     ):
@@ -257,7 +317,7 @@ def convert_json_to_mplstyle(
     # Build output text
     lines: List[str] = []
     lines.append("# Generated by json2mplstyle.py\n#   github.com/temataro/gpt5-Matplotlib-Theme-Lab\n")
-    if HAS_MPL:
+    if _matplotlib_context()[0]:
         lines.append(
             "# Validation: Matplotlib detected; invalid keys/values were omitted and listed below."
         )
@@ -298,6 +358,215 @@ def convert_json_to_mplstyle(
     return "\n".join(lines).rstrip() + "\n", warnings
 
 
+# ---- Batch mode --------------------------------------------------------------
+
+MANIFEST_NAME = ".json2mplstyle-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _load_rc_global(raw: bytes) -> Dict[str, Any]:
+    data = json.loads(raw)
+    return data["rc_global"]
+
+
+def _glob_base(spec: str) -> Path:
+    """Leading directories of a glob pattern that contain no wildcards."""
+    parts = Path(spec).parts
+    base = parts[: next((i for i, part in enumerate(parts) if glob.has_magic(part)), len(parts))]
+    return Path(*base) if base else Path(".")
+
+
+def _expand_inputs(specs: List[str], pattern: str) -> List[Tuple[Path, Path]]:
+    """
+    Resolve files, directories (searched recursively for `pattern`) and globs
+    into (input_path, relative_output_stem) pairs. Stems keep the layout under
+    each directory or glob base, so many `theme.json` files don't collide.
+    """
+    found: Dict[Path, Path] = {}
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            matches, base = sorted(p.rglob(pattern)), p
+        elif p.is_file():
+            matches, base = [p], p.parent
+        else:
+            matches, base = sorted(Path(m) for m in glob.glob(spec, recursive=True)), _glob_base(spec)
+            if not matches:
+                print(f"Warning: no input matches {spec!r}", file=sys.stderr)
+        for f in matches:
+            if f.is_file():
+                found.setdefault(f.resolve(), f.relative_to(base).with_suffix(""))
+    return list(found.items())
+
+
+def _output_path(src: Path, stem: Path, out_dir: Optional[Path]) -> Path:
+    if out_dir is None:
+        return src.with_suffix(".mplstyle")  # next to the input
+    return out_dir / stem.with_suffix(".mplstyle")
+
+
+def _settings_key(write_invalid: bool) -> str:
+    """
+    Anything besides the input bytes that changes the output: the Matplotlib
+    version (validation results) and the CLI flags. A change reconverts all.
+    """
+    try:
+        from importlib.metadata import version
+
+        mpl_version = version("matplotlib")  # reads package metadata, no Matplotlib import
+    except Exception:
+        mpl_version = None
+    return json.dumps(
+        {
+            "version": MANIFEST_VERSION,
+            "matplotlib": mpl_version,
+            "write_invalid": write_invalid,
+        },
+        sort_keys=True,
+    )
+
+
+def _read_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)  # a crash mid-write leaves the previous manifest intact
+
+
+def _convert_file(job: Tuple[str, str, bytes, bool]) -> Dict[str, Any]:
+    """
+    Worker: convert one already-read JSON file and write its .mplstyle.
+    Never raises, so one bad file doesn't abort the batch.
+    """
+    src, dst, raw, write_invalid = job
+    t0 = time.perf_counter()
+    try:
+        text, warnings = convert_json_to_mplstyle(
+            _load_rc_global(raw), write_unknown_as_comments=write_invalid
+        )
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(text)
+        return {"src": src, "dst": dst, "warnings": warnings, "error": None,
+                "seconds": time.perf_counter() - t0, "verdicts": _new_verdicts()}
+    except Exception as e:
+        return {"src": src, "dst": dst, "warnings": [], "error": f"{type(e).__name__}: {e}",
+                "seconds": time.perf_counter() - t0, "verdicts": _new_verdicts()}
+
+
+def _new_verdicts() -> Dict[str, Optional[str]]:
+    # Handed back to the parent, which merges and saves them once
+    validator = _rc_validator() if _rc_validator.cache_info().currsize else None
+    return validator.drain_new() if validator is not None else {}
+
+
+def _warm_worker() -> None:
+    _rc_validator()
+
+
+def convert_batch(
+    specs: List[str],
+    out_dir: Optional[Path] = None,
+    manifest_path: Optional[Path] = None,
+    pattern: str = "theme.json",
+    jobs: int = 0,
+    force: bool = False,
+    write_invalid: bool = True,
+    verbose: bool = False,
+) -> int:
+    """
+    Convert every input in `specs`, skipping files whose content hash matches
+    the manifest from the previous run (and whose output still exists).
+    Conversion runs across `jobs` processes (0 = one per CPU). Prints a
+    summary to stderr and returns the number of failed files.
+    """
+    t0 = time.perf_counter()
+    if manifest_path is None:
+        manifest_path = (out_dir or Path(".")) / MANIFEST_NAME
+    inputs = [(src, stem) for src, stem in _expand_inputs(specs, pattern) if src != manifest_path.resolve()]
+    key = _settings_key(write_invalid)
+    manifest = _read_manifest(manifest_path)
+    previous = manifest.get("files", {}) if manifest.get("key") == key and not force else {}
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    todo: List[Tuple[str, str, bytes, bool]] = []
+    claimed: Dict[Path, Path] = {}
+    skipped = read_errors = 0
+    for src, stem in inputs:
+        dst = _output_path(src, stem, out_dir)
+        if dst in claimed:
+            print(f"- {src}: would overwrite the output of {claimed[dst]} ({dst}); skipped", file=sys.stderr)
+            read_errors += 1
+            continue
+        claimed[dst] = src
+        try:
+            raw = src.read_bytes()
+        except OSError as e:
+            print(f"- {src}: {e}", file=sys.stderr)
+            read_errors += 1
+            continue
+        digest = hashlib.sha256(raw).hexdigest()
+        entry = {"sha256": digest, "output": str(dst)}
+        old = previous.get(str(src))
+        if old and old.get("sha256") == digest and old.get("output") == str(dst) and dst.exists():
+            entries[str(src)] = old
+            skipped += 1
+            continue
+        entries[str(src)] = entry
+        todo.append((str(src), str(dst), raw, write_invalid))
+
+    workers = min(jobs or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        # Under fork the children inherit the imported Matplotlib and the validator.
+        _rc_validator()
+        chunksize = max(1, len(todo) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+            results = list(pool.map(_convert_file, todo, chunksize=chunksize))
+    else:
+        results = [_convert_file(job) for job in todo]
+
+    validator = _rc_validator() if results else None
+    failed, n_warnings, cpu = read_errors, 0, 0.0
+    for r in results:
+        cpu += r["seconds"]
+        if validator is not None:
+            validator.merge(r["verdicts"])
+        if r["error"] is not None:
+            failed += 1
+            entries.pop(r["src"], None)  # retried next run
+            print(f"- {r['src']}: {r['error']}", file=sys.stderr)
+            continue
+        entries[r["src"]]["warnings"] = len(r["warnings"])
+        n_warnings += len(r["warnings"])
+        if verbose:
+            print(f"{r['src']} -> {r['dst']} ({len(r['warnings'])} warnings)", file=sys.stderr)
+
+    # Keep entries for files outside this run, so partial runs don't forget them
+    kept = {k: v for k, v in previous.items() if k not in entries and Path(k).exists()}
+    _write_manifest(manifest_path, {"key": key, "files": {**kept, **entries}})
+    _save_rc_cache()
+
+    wall = time.perf_counter() - t0
+    converted = len(results) - (failed - read_errors)
+    rate = converted / wall if wall > 0 else 0.0
+    print(
+        f"[json2mplstyle] {len(inputs)} inputs: {converted} converted, {skipped} unchanged, "
+        f"{failed} failed, {n_warnings} validation warnings | {wall:.2f} s wall, "
+        f"{cpu:.2f} s in converters, {rate:.1f} files/s on {max(workers, 1)} process(es)",
+        file=sys.stderr,
+    )
+    return failed
+
+
 # ---- CLI ---------------------------------------------------------------------
 
 
@@ -305,6 +574,11 @@ def main():
     parser = argparse.ArgumentParser(
         description="Convert a JSON theme to a .mplstyle (matplotlibrc) with validation and grouped sections."
     )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Batch mode: JSON files, directories (searched recursively for --pattern) or globs.",
+    )
     parser.add_argument("-i", "--input", help="Path to input JSON file.")
     parser.add_argument(
         "-o",
@@ -317,12 +591,62 @@ def main():
         action="store_true",
         help="Do not write invalid/skipped keys as commented lines in the output.",
     )
+    parser.add_argument(
+        "--rc-cache",
+        help="Persisted rc validation cache shared with the backend "
+        "(default: $THEMELAB_RC_CACHE or ~/.cache/themelab/rc-validation-mpl<version>.json).",
+    )
+    parser.add_argument("--no-rc-cache", action="store_true", help="Validate without reading or writing that cache.")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument(
+        "--out-dir",
+        type=Path,
+        help="Write outputs here, mirroring each input directory's layout (default: next to each input).",
+    )
+    batch.add_argument(
+        "--pattern",
+        default="theme.json",
+        help="File name pattern searched for inside input directories (default: theme.json).",
+    )
+    batch.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="Worker processes (default: one per CPU; 1 converts in-process).",
+    )
+    batch.add_argument(
+        "--manifest",
+        type=Path,
+        help=f"Content-hash manifest used to skip unchanged inputs (default: <out-dir or .>/{MANIFEST_NAME}).",
+    )
+    batch.add_argument("--force", action="store_true", help="Ignore the manifest and convert everything.")
+    batch.add_argument("-v", "--verbose", action="store_true", help="List every converted file.")
     args = parser.parse_args()
+    if args.no_rc_cache or args.rc_cache:
+        # Read when the validator is first loaded, here and in worker processes
+        os.environ["THEMELAB_RC_CACHE"] = "" if args.no_rc_cache else args.rc_cache
+
+    if args.inputs:
+        if args.input or args.output:
+            parser.error("use either -i/-o or batch inputs, not both")
+        failed = convert_batch(
+            args.inputs,
+            out_dir=args.out_dir,
+            manifest_path=args.manifest,
+            pattern=args.pattern,
+            jobs=args.jobs,
+            force=args.force,
+            write_invalid=not args.no_write_invalid_comments,
+            verbose=args.verbose,
+        )
+        sys.exit(1 if failed else 0)
+    if not args.input:
+        parser.error("give -i/--input, or one or more batch inputs")
 
     try:
-        with open(args.input, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            data = data["rc_global"]
+        with open(args.input, "rb") as f:
+            data = _load_rc_global(f.read())
     except Exception as e:
         print(f"Error reading JSON: {e}", file=sys.stderr)
         sys.exit(1)
@@ -341,6 +665,7 @@ def main():
     else:
         print(text, end="")
 
+    _save_rc_cache()
     if warnings:
         print(f"\n[Validation warnings: {len(warnings)}]", file=sys.stderr)
         for w in warnings: